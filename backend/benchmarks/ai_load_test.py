@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+Load test for the /api/ai routes
+Drives every AI route concurrently and reports latency percentiles, outcomes
+and throughput per route. Meant to run against a backend pointed at
+benchmarks/stub_upstream.py (see its docstring), so results don't depend on
+OpenAI's latency or cost anything. The route mix and prompts come from a
+seeded RNG, so two runs with the same flags send the same requests.
+
+Run from the backend directory, with the stub and the backend already up:
+  python benchmarks/ai_load_test.py --concurrency 32 --requests 2000
+  python benchmarks/ai_load_test.py --routes narrator,names --distinct 5
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import time
+from collections import Counter, defaultdict
+
+import httpx
+
+RACES = ("Human", "Elf", "Dwarf", "Halfling", "Tiefling", "Dragonborn")
+CLASSES = ("Fighter", "Wizard", "Rogue", "Cleric", "Bard", "Paladin")
+NARRATORS = ("deadpan", "enthusiastic", "sarcastic")
+
+
+def chat_payload(n):
+    return {"prompt": f"Describe tavern number {n} in two sentences.", "max_tokens": 120}
+
+
+def image_payload(n):
+    race, class_type = RACES[n % len(RACES)], CLASSES[n // len(RACES) % len(CLASSES)]
+    return {"prompt": f"Fantasy portrait of a {race} {class_type}, variant {n}", "size": "1024x1024"}
+
+
+def narrator_payload(n):
+    return {
+        "choice": RACES[n % len(RACES)],
+        "question": "What is your race?",
+        "character_so_far": {"name": f"Hero {n}", "class": CLASSES[n % len(CLASSES)], "level": 1},
+        "narrator_id": NARRATORS[n % len(NARRATORS)],
+    }
+
+
+def names_payload(n):
+    return {"race": RACES[n % len(RACES)], "class_type": CLASSES[n // len(RACES) % len(CLASSES)], "count": 3}
+
+
+def backstory_payload(n):
+    return {"name": f"Hero {n}", "race": RACES[n % len(RACES)], "class_type": CLASSES[n % len(CLASSES)]}
+
+
+# name -> (path, payload(n), kind, relative weight); kind is how the response is consumed
+ROUTES = {
+    "chat": ("/chat/completion", chat_payload, "json", 2),
+    "chat_stream": ("/chat/completion/stream", chat_payload, "sse", 2),
+    "narrator": ("/narrator/comment", narrator_payload, "json", 6),
+    "names": ("/characters/names", names_payload, "json", 3),
+    "backstory": ("/characters/backstory", backstory_payload, "json", 1),
+    "backstory_stream": ("/characters/backstory/stream", backstory_payload, "sse", 1),
+    "image": ("/images/generate", image_payload, "json", 1),
+    "image_job": ("/images/jobs", image_payload, "job", 1),
+}
+
+
+def print_section(title):
+    print("\n" + "=" * 80)
+    print(f"⏱️  {title}")
+    print("=" * 80)
+
+
+async def read_sse(response):
+    """Consume a server-sent event stream; returns (first event time, last event name)."""
+    first = None
+    event = None
+    async for line in response.aiter_lines():
+        if first is None and line:
+            first = time.perf_counter()
+        if line.startswith("event:"):
+            event = line.split(":", 1)[1].strip()
+    return first, event
+
+
+async def call(client, route, n):
+    """Run one request; returns (outcome, seconds, seconds to first event or None)."""
+    path, payload, kind, _ = ROUTES[route]
+    started = time.perf_counter()
+    first = None
+
+    if kind == "sse":
+        async with client.stream("POST", path, json=payload(n)) as response:
+            if response.status_code != 200:
+                await response.aread()
+                return str(response.status_code), time.perf_counter() - started, None
+            first, event = await read_sse(response)
+        outcome = "200" if event == "done" else f"200/{event or 'cut'}"
+        return outcome, time.perf_counter() - started, (first - started) if first else None
+
+    response = await client.post(path, json=payload(n))
+    if kind == "json" or response.status_code != 202:
+        outcome = str(response.status_code)
+        # The narrator falls back to a canned comment instead of failing
+        if response.status_code == 200 and response.json().get("fallback"):
+            outcome = "200/fallback"
+        return outcome, time.perf_counter() - started, None
+
+    # Portrait job: time from submit until the job finishes
+    first = time.perf_counter()
+    async with client.stream("GET", response.json()["job"]["events_url"]) as events:
+        final = None
+        async for line in events.aiter_lines():
+            if line.startswith("data:"):
+                final = json.loads(line[5:])
+    outcome = f"202/{final['status'] if final else 'cut'}"
+    return outcome, time.perf_counter() - started, first - started
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))]
+
+
+async def run(args):
+    rng = random.Random(args.seed)
+    routes = [route.strip() for route in args.routes.split(",") if route.strip()]
+    weights = [ROUTES[route][3] for route in routes]
+    # The whole schedule is drawn up front, so it doesn't depend on timing
+    schedule = [(rng.choices(routes, weights)[0], rng.randrange(args.distinct)) for _ in range(args.requests)]
+
+    results = defaultdict(list)
+    queue = asyncio.Queue()
+    for item in schedule:
+        queue.put_nowait(item)
+
+    async def worker(client):
+        while not queue.empty():
+            route, n = queue.get_nowait()
+            try:
+                results[route].append(await call(client, route, n))
+            except httpx.HTTPError as e:
+                results[route].append((type(e).__name__, 0.0, None))
+
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    timeout = httpx.Timeout(args.timeout)
+    base_url = args.base_url.rstrip("/") + "/api/ai"
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=timeout) as client:
+        if args.stub_url:
+            await client.post(args.stub_url.rstrip("/") + "/_stub/reset")
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(client) for _ in range(args.concurrency)))
+        elapsed = time.perf_counter() - started
+        stub_stats = (await client.get(args.stub_url.rstrip("/") + "/_stub/stats")).json() if args.stub_url else None
+    return results, elapsed, stub_stats
+
+
+def report(results, elapsed, stub_stats, args):
+    print_section(f"{args.requests} requests, concurrency {args.concurrency}, seed {args.seed}")
+    print(f"   {'route':<17}{'n':>6}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'max ms':>9}{'first ms':>10}   outcomes")
+    for route in ROUTES:
+        if route not in results:
+            continue
+        rows = results[route]
+        times = [seconds * 1000 for _, seconds, _ in rows]
+        firsts = [first * 1000 for _, _, first in rows if first is not None]
+        outcomes = ", ".join(f"{outcome}×{count}" for outcome, count in Counter(o for o, _, _ in rows).most_common())
+        first_p50 = f"{percentile(firsts, 50):10.0f}" if firsts else f"{'-':>10}"
+        print(
+            f"   {route:<17}{len(rows):>6}{percentile(times, 50):9.0f}{percentile(times, 95):9.0f}"
+            f"{percentile(times, 99):9.0f}{max(times):9.0f}{first_p50}   {outcomes}"
+        )
+
+    every = [row for rows in results.values() for row in rows]
+    ok = sum(1 for outcome, _, _ in every if outcome in ("200", "202/succeeded"))
+    print(f"\n   {len(every) / elapsed:.1f} req/s over {elapsed:.1f} s, {ok} clean successes "
+          f"(mean {statistics.mean(t for _, t, _ in every) * 1000:.0f} ms)")
+    print("   'first ms' is the median time to the first streamed event, or until a job was accepted")
+    if stub_stats is not None:
+        print(f"   Upstream stub: {json.dumps(stub_stats)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test for the /api/ai routes")
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--stub-url", default="http://127.0.0.1:8765",
+                        help="Upstream stub to reset before and read stats from after (empty to skip)")
+    parser.add_argument("--routes", default=",".join(ROUTES), help=f"Comma-separated subset of: {', '.join(ROUTES)}")
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=16)
+    # Small values repeat prompts and exercise the caches, large ones defeat them
+    parser.add_argument("--distinct", type=int, default=50, help="Distinct payloads per route")
+    parser.add_argument("--timeout", type=float, default=120)
+    parser.add_argument("--seed", type=int, default=1234)
+    args = parser.parse_args()
+
+    unknown = set(args.routes.split(",")) - set(ROUTES)
+    if unknown:
+        parser.error(f"Unknown routes: {', '.join(sorted(unknown))}")
+
+    results, elapsed, stub_stats = asyncio.run(run(args))
+    report(results, elapsed, stub_stats, args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark for the AI route rate limiter
+Compares utils.rate_limit.MemoryRateLimiter with the old list-of-timestamps design.
+
+Run from the backend directory:
+  python benchmarks/rate_limit_bench.py
+"""
+
+import sys
+import time
+import tracemalloc
+from collections import defaultdict
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from utils.rate_limit import MemoryRateLimiter
+
+PER_MINUTE = 10**9  # Never reject, so every call does the full amount of work
+PER_DAY = 10**9
+
+
+class LegacyRateLimiter:
+    """The previous check_rate_limit: every timestamp kept for 24h, rebuilt twice per call."""
+
+    def __init__(self, per_minute, per_day):
+        self.per_minute = per_minute
+        self.per_day = per_day
+        self.store = defaultdict(list)
+
+    def hit(self, client_id, now):
+        self.store[client_id] = [t for t in self.store[client_id] if now - t < timedelta(days=1)]
+        recent = [t for t in self.store[client_id] if now - t < timedelta(minutes=1)]
+        if len(recent) >= self.per_minute:
+            return "minute"
+        if len(self.store[client_id]) >= self.per_day:
+            return "day"
+        self.store[client_id].append(now)
+        return None
+
+
+def print_section(title):
+    print("\n" + "=" * 80)
+    print(f"⏱️  {title}")
+    print("=" * 80)
+
+
+def run(make_limiter, clients, calls, clock):
+    """Drive `calls` requests round-robin across `clients`; returns (seconds, retained bytes)."""
+    ids = [f"10.0.{i // 256}.{i % 256}" for i in range(clients)]
+
+    limiter = make_limiter()
+    started = time.perf_counter()
+    for n in range(calls):
+        limiter.hit(ids[n % clients], clock(n))
+    elapsed = time.perf_counter() - started
+
+    # Second pass under tracemalloc (which slows things down) just to measure state size
+    tracemalloc.start()
+    limiter = make_limiter()
+    for n in range(calls):
+        limiter.hit(ids[n % clients], clock(n))
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, retained
+
+
+def report(name, elapsed, retained, calls):
+    print(f"   {name:<8} {elapsed / calls * 1e6:8.2f} µs/call   retained memory {retained / 1024:8.1f} KiB")
+
+
+def main():
+    epoch = time.time()
+    start = datetime.now()
+    # The legacy limiter's per-call cost grows with each client's history
+    calls_per_client = 100
+    for clients in (1, 100, 1000):
+        calls = clients * calls_per_client
+        print_section(f"{clients} client(s), {calls_per_client} requests each")
+        report("new", *run(lambda: MemoryRateLimiter(PER_MINUTE, PER_DAY), clients, calls,
+                           lambda n: epoch + n * 0.01), calls)
+        report("legacy", *run(lambda: LegacyRateLimiter(PER_MINUTE, PER_DAY), clients, calls,
+                              lambda n: start + timedelta(milliseconds=n * 10)), calls)
+
+
+if __name__ == "__main__":
+    main()
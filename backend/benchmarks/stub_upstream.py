@@ -0,0 +1,410 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for OpenAI and Cloudflare R2, for offline load tests
+
+Speaks just enough of the OpenAI chat completions (plain and streamed) and
+image generation APIs, and of the S3 object API boto3 uses for uploads
+(PutObject, multipart uploads, HeadObject, GetObject), to run every /api/ai
+route without network access or API spend. Latency, jitter and error
+injection are configurable, and all randomness comes from one seeded RNG, so
+benchmark runs are repeatable.
+
+Run from the backend directory:
+  python benchmarks/stub_upstream.py --port 8765 --latency-ms 400 --error-rate 0.02
+
+Then start the backend against it (any non-empty keys will do):
+  OPENAI_API_KEY=sk-stub OPENAI_BASE_URL=http://127.0.0.1:8765/v1 \\
+  R2_ENDPOINT_URL=http://127.0.0.1:8765/s3 R2_BUCKET_NAME=portraits \\
+  R2_ACCESS_KEY_ID=stub R2_SECRET_ACCESS_KEY=stub \\
+  MAX_REQUESTS_PER_USER_PER_MINUTE=100000 MAX_REQUESTS_PER_USER_PER_DAY=1000000 \\
+  uvicorn main:app --port 8000
+
+Settings can be changed while it runs:
+  curl -X POST localhost:8765/_stub/config -H 'Content-Type: application/json' -d '{"error_rate": 0.5}'
+  curl localhost:8765/_stub/stats
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import random
+import struct
+import time
+import uuid
+import zlib
+from collections import Counter
+from functools import lru_cache
+from dataclasses import asdict, dataclass, fields
+from typing import Dict, Optional, get_type_hints
+
+from fastapi import FastAPI, Request, Response
+from fastapi.responses import JSONResponse, StreamingResponse
+
+
+@dataclass
+class StubConfig:
+    # Delay before every chat response (and before the first streamed chunk)
+    latency_ms: float = 300.0
+    # Uniform random extra delay, 0 .. jitter_ms
+    jitter_ms: float = 100.0
+    # Delay between streamed chunks
+    token_delay_ms: float = 15.0
+    # DALL-E is much slower than chat
+    image_latency_ms: float = 3000.0
+    # Delay before every S3 call
+    s3_latency_ms: float = 20.0
+    # Fraction of requests to the targets below that fail with error_status
+    error_rate: float = 0.0
+    error_status: int = 500
+    # Comma-separated: chat, images, download, s3
+    error_targets: str = "chat,images"
+    # Size of the generated PNGs
+    image_bytes: int = 256 * 1024
+    seed: int = 1234
+
+
+config = StubConfig()
+# Field name -> annotated type, used to parse CLI flags and /_stub/config values
+FIELD_TYPES = get_type_hints(StubConfig)
+rng = random.Random(config.seed)
+stats: Counter = Counter()
+
+# S3 state: (bucket, key) -> (body, content type); upload id -> {part number: body}
+objects: Dict[tuple, tuple] = {}
+multipart_uploads: Dict[str, dict] = {}
+
+app = FastAPI(title="DandDy upstream stub")
+
+WORDS = (
+    "the bold adventurer steps forward with a grin and a sword that has seen "
+    "better days while the tavern keeper sighs and the dragon waits patiently "
+    "beyond the hills where legends are made and mostly forgotten"
+).split()
+NAME_PARTS = ("Ar", "Bel", "Cor", "Dra", "El", "Fen", "Gar", "Hal", "Isk", "Jor", "Kael", "Lir", "Mor", "Nym", "Or", "Quen", "Ryn", "Syl", "Tor", "Vex")
+NAME_ENDINGS = ("an", "eth", "ira", "os", "wyn", "ric", "ion", "ara", "ul", "is")
+
+
+# -- Helpers --------------------------------------------------------------------
+
+
+def digest(*parts) -> int:
+    """Stable integer from the request content, so the same request gets the same answer."""
+    return int.from_bytes(hashlib.sha256(repr(parts).encode()).digest()[:8], "big")
+
+
+async def delay(base_ms: float) -> None:
+    jitter = rng.uniform(0, config.jitter_ms) if config.jitter_ms else 0
+    await asyncio.sleep((base_ms + jitter) / 1000)
+
+
+def injected_error(target: str) -> Optional[Response]:
+    """A failure response for `target` (chat, images, download or s3), error_rate of the time."""
+    if target not in {t.strip() for t in config.error_targets.split(",")}:
+        return None
+    if not config.error_rate or rng.random() >= config.error_rate:
+        return None
+    stats[f"{target}_errors"] += 1
+    headers = {"Retry-After": "1"} if config.error_status in (429, 503) else {}
+    if target == "s3":
+        body = "<Error><Code>InternalError</Code><Message>Injected failure</Message></Error>"
+        return Response(body, status_code=config.error_status, media_type="application/xml", headers=headers)
+    return JSONResponse(
+        {"error": {"message": "Injected failure", "type": "server_error", "code": None}},
+        status_code=config.error_status,
+        headers=headers,
+    )
+
+
+def estimate_tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+def reply_text(messages: list, max_tokens: int) -> str:
+    prompt = " ".join(str(m.get("content", "")) for m in messages)
+    seed = digest(prompt)
+    if "character names" in prompt:
+        count = next((int(word) for word in prompt.split() if word.isdigit()), 5)
+        names = []
+        for i in range(count):
+            n = digest(seed, i)
+            names.append(NAME_PARTS[n % len(NAME_PARTS)] + NAME_ENDINGS[(n >> 8) % len(NAME_ENDINGS)])
+        return "\n".join(f"{i + 1}. {name}" for i, name in enumerate(names))
+    words = min(max_tokens // 2, 24 + seed % 40)
+    return " ".join(WORDS[(seed + i * 7) % len(WORDS)] for i in range(words)).capitalize() + "."
+
+
+def usage(prompt_tokens: int, completion_tokens: int) -> dict:
+    return {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "total_tokens": prompt_tokens + completion_tokens,
+    }
+
+
+@lru_cache(maxsize=64)
+def make_png(seed: int, size: int) -> bytes:
+    """A valid PNG of roughly `size` bytes whose pixels depend only on `seed`."""
+    side = max(8, int((size / 3) ** 0.5))
+    noise = random.Random(seed).randbytes(side * side * 3)
+    rows = b"".join(b"\x00" + noise[y * side * 3:(y + 1) * side * 3] for y in range(side))
+
+    def chunk(kind: bytes, data: bytes) -> bytes:
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+    header = struct.pack(">IIBBBBB", side, side, 8, 2, 0, 0, 0)
+    # Level 0: random pixels don't compress anyway, and this keeps the stub fast
+    return b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", header) + chunk(b"IDAT", zlib.compress(rows, 0)) + chunk(b"IEND", b"")
+
+
+# -- OpenAI ---------------------------------------------------------------------
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    stats["chat_requests"] += 1
+    await delay(config.latency_ms)
+    failure = injected_error("chat")
+    if failure is not None:
+        return failure
+
+    messages = body.get("messages", [])
+    text = reply_text(messages, body.get("max_tokens") or 300)
+    prompt_tokens = sum(estimate_tokens(str(m.get("content", ""))) for m in messages)
+    completion_tokens = estimate_tokens(text)
+    completion_id = f"chatcmpl-stub{digest(text) % 10**12}"
+    model = body.get("model", "gpt-4o-mini")
+    created = int(time.time())
+
+    if not body.get("stream"):
+        return {
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": created,
+            "model": model,
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": text},
+                "finish_reason": "stop",
+            }],
+            "usage": usage(prompt_tokens, completion_tokens),
+        }
+
+    stats["chat_streams"] += 1
+    include_usage = (body.get("stream_options") or {}).get("include_usage", False)
+
+    def event(choices: list, **extra) -> str:
+        chunk = {
+            "id": completion_id,
+            "object": "chat.completion.chunk",
+            "created": created,
+            "model": model,
+            "choices": choices,
+            **extra,
+        }
+        return f"data: {json.dumps(chunk)}\n\n"
+
+    def delta(content: dict, finish_reason=None) -> list:
+        return [{"index": 0, "delta": content, "finish_reason": finish_reason}]
+
+    async def stream():
+        yield event(delta({"role": "assistant", "content": ""}))
+        for i, word in enumerate(text.split(" ")):
+            await asyncio.sleep(config.token_delay_ms / 1000)
+            yield event(delta({"content": word if i == 0 else " " + word}))
+        yield event(delta({}, "stop"))
+        if include_usage:
+            # Like OpenAI: one last chunk with no choices, only usage
+            yield event([], usage=usage(prompt_tokens, completion_tokens))
+        yield "data: [DONE]\n\n"
+
+    return StreamingResponse(stream(), media_type="text/event-stream")
+
+
+@app.post("/v1/images/generations")
+async def image_generations(request: Request):
+    body = await request.json()
+    stats["image_requests"] += 1
+    await delay(config.image_latency_ms)
+    failure = injected_error("images")
+    if failure is not None:
+        return failure
+
+    prompt = body.get("prompt", "")
+    # Same prompt, size and quality -> same image bytes (what R2 dedupe keys on)
+    image_id = f"{digest(prompt, body.get('size'), body.get('quality')) % 10**16:016d}"
+    return {
+        "created": int(time.time()),
+        "data": [{
+            "url": str(request.base_url).rstrip("/") + f"/images/{image_id}.png",
+            "revised_prompt": f"{prompt} (stub)",
+        }],
+    }
+
+
+@app.get("/images/{image_id}.png")
+async def download_image(image_id: str):
+    stats["image_downloads"] += 1
+    failure = injected_error("download")
+    if failure is not None:
+        return failure
+    return Response(make_png(int(image_id) if image_id.isdigit() else digest(image_id), config.image_bytes),
+                    media_type="image/png")
+
+
+# -- S3 (path-style: /s3/<bucket>/<key>) ------------------------------------------
+
+
+def s3_error(code: str, status_code: int) -> Response:
+    return Response(f"<Error><Code>{code}</Code></Error>", status_code=status_code, media_type="application/xml")
+
+
+def etag(data: bytes) -> str:
+    return f'"{hashlib.md5(data).hexdigest()}"'
+
+
+@app.put("/s3/{bucket}/{key:path}")
+async def put_object(bucket: str, key: str, request: Request):
+    data = await request.body()
+    await asyncio.sleep(config.s3_latency_ms / 1000)
+    failure = injected_error("s3")
+    if failure is not None:
+        return failure
+
+    upload_id = request.query_params.get("uploadId")
+    if upload_id is not None:
+        if upload_id not in multipart_uploads:
+            return s3_error("NoSuchUpload", 404)
+        multipart_uploads[upload_id]["parts"][int(request.query_params["partNumber"])] = data
+        stats["s3_parts"] += 1
+        return Response(headers={"ETag": etag(data)})
+
+    objects[(bucket, key)] = (data, request.headers.get("content-type", "application/octet-stream"))
+    stats["s3_puts"] += 1
+    stats["s3_bytes"] += len(data)
+    return Response(headers={"ETag": etag(data)})
+
+
+@app.post("/s3/{bucket}/{key:path}")
+async def multipart_upload(bucket: str, key: str, request: Request):
+    await asyncio.sleep(config.s3_latency_ms / 1000)
+    if "uploads" in request.query_params:
+        upload_id = uuid.uuid4().hex
+        multipart_uploads[upload_id] = {
+            "bucket": bucket,
+            "key": key,
+            "content_type": request.headers.get("content-type", "application/octet-stream"),
+            "parts": {},
+        }
+        return Response(
+            "<InitiateMultipartUploadResult>"
+            f"<Bucket>{bucket}</Bucket><Key>{key}</Key><UploadId>{upload_id}</UploadId>"
+            "</InitiateMultipartUploadResult>",
+            media_type="application/xml",
+        )
+
+    upload = multipart_uploads.pop(request.query_params.get("uploadId", ""), None)
+    if upload is None:
+        return s3_error("NoSuchUpload", 404)
+    data = b"".join(upload["parts"][number] for number in sorted(upload["parts"]))
+    objects[(bucket, key)] = (data, upload["content_type"])
+    stats["s3_puts"] += 1
+    stats["s3_bytes"] += len(data)
+    return Response(
+        "<CompleteMultipartUploadResult>"
+        f"<Bucket>{bucket}</Bucket><Key>{key}</Key><ETag>{etag(data)}</ETag>"
+        "</CompleteMultipartUploadResult>",
+        media_type="application/xml",
+    )
+
+
+@app.delete("/s3/{bucket}/{key:path}")
+async def delete_object(bucket: str, key: str, request: Request):
+    upload_id = request.query_params.get("uploadId")
+    if upload_id is not None:
+        multipart_uploads.pop(upload_id, None)
+    else:
+        objects.pop((bucket, key), None)
+    return Response(status_code=204)
+
+
+@app.head("/s3/{bucket}/{key:path}")
+async def head_object(bucket: str, key: str):
+    stats["s3_heads"] += 1
+    await asyncio.sleep(config.s3_latency_ms / 1000)
+    stored = objects.get((bucket, key))
+    if stored is None:
+        return Response(status_code=404)
+    data, content_type = stored
+    return Response(headers={"ETag": etag(data), "Content-Type": content_type, "Content-Length": str(len(data))})
+
+
+@app.get("/s3/{bucket}/{key:path}")
+async def get_object(bucket: str, key: str):
+    stored = objects.get((bucket, key))
+    if stored is None:
+        return s3_error("NoSuchKey", 404)
+    data, content_type = stored
+    return Response(data, media_type=content_type, headers={"ETag": etag(data)})
+
+
+# -- Control ----------------------------------------------------------------------
+
+
+@app.get("/_stub/config")
+async def get_config():
+    return asdict(config)
+
+
+@app.post("/_stub/config")
+async def update_config(request: Request):
+    """Change any StubConfig field; a new seed also resets the RNG."""
+    global rng
+    changes = await request.json()
+    known = {f.name for f in fields(StubConfig)}
+    for name, value in changes.items():
+        if name in known:
+            setattr(config, name, FIELD_TYPES[name](value))
+    if "seed" in changes:
+        rng = random.Random(config.seed)
+    return asdict(config)
+
+
+@app.get("/_stub/stats")
+async def get_stats():
+    return {**stats, "objects": len(objects), "open_multipart_uploads": len(multipart_uploads)}
+
+
+@app.post("/_stub/reset")
+async def reset():
+    """Forget stored objects and counters, and reseed the RNG (call before each benchmark run)."""
+    global rng
+    stats.clear()
+    objects.clear()
+    multipart_uploads.clear()
+    rng = random.Random(config.seed)
+    return {"reset": True}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    for f in fields(StubConfig):
+        parser.add_argument(f"--{f.name.replace('_', '-')}", type=FIELD_TYPES[f.name], default=f.default)
+    args = parser.parse_args()
+
+    global rng
+    for f in fields(StubConfig):
+        setattr(config, f.name, getattr(args, f.name))
+    rng = random.Random(config.seed)
+
+    import uvicorn
+
+    print(f"🧪 Upstream stub on http://{args.host}:{args.port} with {asdict(config)}")
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
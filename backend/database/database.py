@@ -1,4 +1,5 @@
-from sqlalchemy import create_engine
+import os
+from sqlalchemy import create_engine, inspect
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from pydantic_settings import BaseSettings
@@ -11,12 +12,97 @@ class Settings(BaseSettings):
     # Default token lifetime (in minutes). Override with ACCESS_TOKEN_EXPIRE_MINUTES in env for flexibility.
     # 43200 minutes = 30 days, which effectively keeps users logged in unless they explicitly log out.
     access_token_expire_minutes: int = 43200
+
+    # In-process cache of authenticated user lookups (see utils/auth.py)
+    user_cache_ttl_seconds: float = 60.0
+    user_cache_max_entries: int = 1024
+    # How often the in-memory token version map is resynced from the DB
+    token_version_refresh_seconds: float = 30.0
+
+    # Password hashing runs on its own bounded thread pool (see utils/auth.py)
+    bcrypt_rounds: int = 12
+    password_hash_workers: int = 2
+    password_hash_queue_size: int = 32
+
+    # Image -> ASCII conversion runs on its own process pool (see routes/ascii_art.py)
+    ascii_workers: int = 2
+    ascii_queue_size: int = 8
+    ascii_max_image_bytes: int = 10 * 1024 * 1024
+    ascii_max_image_pixels: int = 4096 * 4096
+    # Hosts /api/ascii may fetch image URLs from, comma separated. The R2 public
+    # host is always allowed; the default is where DALL-E serves its images.
+    ascii_url_hosts: str = "oaidalleapiprodscus.blob.core.windows.net"
     
     # AI API settings (optional, used by AI routes)
     openai_api_key: str = ""
+    # Point at another OpenAI-compatible server, e.g. benchmarks/stub_upstream.py (empty = api.openai.com)
+    openai_base_url: str = ""
     max_requests_per_user_per_minute: int = 10
     max_requests_per_user_per_day: int = 100
+    # Where rate-limit counters live: "memory" (per process) or "sqlite"
+    # (shared by every worker on the host, stored at rate_limit_sqlite_path)
+    rate_limit_backend: str = "memory"
+    rate_limit_sqlite_path: str = "./rate_limits.db"
+    # Response cache for backstory/narrator (see utils/ai_cache.py).
+    # Set ai_cache_sqlite_path to keep entries across restarts and workers.
+    ai_cache_max_entries: int = 2048
+    ai_cache_sqlite_path: str = ""
+    ai_cache_backstory_ttl_seconds: float = 24 * 60 * 60
+    ai_cache_narrator_ttl_seconds: float = 24 * 60 * 60
+    # Distinct narrator comments kept per (narrator, question, choice)
+    ai_cache_narrator_variants: int = 5
+    # Portrait URLs cached by prompt in the image_cache table, LRU-capped (0 = off)
+    image_cache_max_entries: int = 500
+    # Tokens each client may spend per day across AI routes (0 = unlimited), and
+    # how often the in-memory usage ledger is written to the ai_usage table
+    ai_daily_token_budget: int = 50000
+    usage_flush_interval_seconds: float = 10.0
+    # Narrator comments answer locally if OpenAI takes longer than this (0 = wait)
+    narrator_latency_budget_seconds: float = 0.8
+    # Estimated tokens of character context in narrator prompts (0 = no limit)
+    narrator_context_token_budget: int = 60
+    # Pre-generated name pools per race/class (see utils/name_pools.py). Warming
+    # fills all 108 pools at startup in every worker; off, they fill on first use
+    name_pool_size: int = 20
+    name_pool_low_watermark: int = 6
+    name_pool_refill_concurrency: int = 4
+    name_pool_warm_on_startup: bool = False
     allowed_origins: str = "http://localhost:5173,http://localhost:3000"
+    # Shared AsyncOpenAI client: timeouts (seconds) and connection pool size
+    openai_timeout_seconds: float = 30.0
+    openai_image_timeout_seconds: float = 120.0
+    openai_connect_timeout_seconds: float = 5.0
+    openai_max_connections: int = 50
+    # Concurrent upstream calls per endpoint class, and how many more may queue
+    # before requests are shed with a 503 (see Bulkhead in utils/upstream.py)
+    ai_chat_concurrency: int = 16
+    ai_chat_queue_size: int = 32
+    ai_image_concurrency: int = 4
+    ai_image_queue_size: int = 8
+    # Background portrait jobs (POST /api/ai/images/jobs, see utils/portrait_jobs.py)
+    portrait_job_workers: int = 2
+    portrait_job_max_queued: int = 50
+    # Finished jobs are deleted this many days after they finish (0 = keep forever)
+    portrait_job_retention_days: int = 7
+    # A "running" job whose started_at is older than this is assumed orphaned
+    # (its process died) and queued again; keep it well above the image deadline
+    portrait_job_lease_seconds: float = 600.0
+    # How often job event streams re-read the table, to see progress made by
+    # another worker process
+    portrait_job_poll_seconds: float = 2.0
+    # Overall deadline per AI call (including retries), retry backoff, and the
+    # circuit breaker that fails fast while OpenAI is unhealthy
+    ai_chat_deadline_seconds: float = 20.0
+    ai_image_deadline_seconds: float = 150.0
+    ai_retry_max_attempts: int = 3
+    ai_retry_base_delay_seconds: float = 0.5
+    ai_retry_max_delay_seconds: float = 4.0
+    ai_breaker_failure_threshold: int = 5
+    ai_breaker_reset_seconds: float = 30.0
+    # Shared httpx client for outbound downloads (DALL-E results)
+    download_timeout_seconds: float = 60.0
+    download_max_connections: int = 20
+    download_keepalive_expiry_seconds: float = 30.0
 
     # Cloudflare R2 (optional, used for storing generated images)
     # These map from env vars like R2_ACCOUNT_ID, R2_ACCESS_KEY_ID, etc.
@@ -26,6 +112,16 @@ class Settings(BaseSettings):
     r2_bucket_name: str = ""
     # Optional: public base URL for your bucket, e.g. https://<id>.r2.dev/danddy-portraits
     r2_public_base_url: str = ""
+    # Optional: S3 endpoint override, e.g. benchmarks/stub_upstream.py (then R2_ACCOUNT_ID is not needed)
+    r2_endpoint_url: str = ""
+    # Threads for blocking R2 uploads (also the boto3 connection pool size)
+    r2_upload_workers: int = 4
+    # Image bytes all in-flight uploads together may hold in memory; each upload
+    # reserves its worst case (2 x 5 MiB), so the default allows 6 at once
+    r2_upload_memory_budget_bytes: int = 64 * 1024 * 1024
+
+    # Encounter tracker: how often in-memory initiative state is written behind to the DB
+    encounter_flush_interval_seconds: float = 5.0
     
     class Config:
         env_file = ".env"
@@ -60,6 +156,41 @@ SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
 
+# Revision matching the schema create_all() built before the app used migrations
+BASELINE_REVISION = "0001"
+_ALEMBIC_INI = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "alembic.ini")
+
+
+def run_migrations(bind=None):
+    """
+    Bring the database schema up to date with the alembic migrations in migrations/.
+
+    A new, empty database is built straight from the models and stamped at head.
+    A database created before the app used migrations (tables but no
+    alembic_version) is stamped at the baseline first, so only the later
+    revisions run against it.
+    """
+    from alembic import command
+    from alembic.config import Config
+    import models  # noqa: F401  (registers every table on Base.metadata)
+
+    bind = bind or engine
+    config = Config(_ALEMBIC_INI)
+    config.attributes["configure_logger"] = False
+
+    inspector = inspect(bind)
+    with bind.begin() as conn:
+        config.attributes["connection"] = conn
+        if not inspector.has_table("alembic_version"):
+            if inspector.has_table("users"):
+                command.stamp(config, BASELINE_REVISION)
+            else:
+                Base.metadata.create_all(bind=conn)
+                command.stamp(config, "head")
+                return
+        command.upgrade(config, "head")
+
+
 def get_db():
     db = SessionLocal()
     try:
@@ -1,20 +1,63 @@
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from database.database import engine, Base
-from routes import auth, characters, campaigns, ai, users
+from starlette.concurrency import run_in_threadpool
+from database.database import engine, get_settings, run_migrations
+from routes import auth, characters, campaigns, ai, users, encounters, ascii_art
+from utils import storage
+from utils.usage import usage_ledger, usage_flush_loop
+from utils.auth import (
+    password_hasher,
+    user_cache,
+    refresh_token_versions,
+    token_version_refresh_loop,
+)
 import os
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
 load_dotenv()
 
-# Create database tables
-Base.metadata.create_all(bind=engine)
+# Create or migrate the database schema (see migrations/)
+run_migrations(engine)
+
+settings = get_settings()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Token versions back DB-free authorization; load them before serving
+    await run_in_threadpool(refresh_token_versions)
+    token_refresh_task = asyncio.create_task(
+        token_version_refresh_loop(settings.token_version_refresh_seconds)
+    )
+    # Write-behind flush for in-memory encounter state
+    flush_task = asyncio.create_task(
+        encounters.write_behind_loop(settings.encounter_flush_interval_seconds)
+    )
+    # AI usage is batched in memory; loading today's totals also primes the token budgets
+    await run_in_threadpool(usage_ledger.flush)
+    usage_task = asyncio.create_task(usage_flush_loop(settings.usage_flush_interval_seconds))
+    await ai.start_ai_clients()
+    yield
+    flush_task.cancel()
+    usage_task.cancel()
+    token_refresh_task.cancel()
+    # Persist anything still pending before the process exits
+    await run_in_threadpool(encounters.flush_dirty_encounters)
+    password_hasher.shutdown()
+    ascii_art.ascii_converter.shutdown()
+    await ai.close_ai_clients()
+    await run_in_threadpool(usage_ledger.flush)
+    storage.shutdown()
+
 
 app = FastAPI(
     title="DandDy API",
     description="D&D 5e Character Management API",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
 )
 
 # Get allowed origins from environment or use defaults
@@ -43,7 +86,9 @@ app.include_router(auth.router, prefix="/api")
 app.include_router(characters.router, prefix="/api")
 app.include_router(campaigns.router, prefix="/api")
 app.include_router(users.router, prefix="/api")
+app.include_router(encounters.router, prefix="/api")
 app.include_router(ai.router, prefix="/api/ai")
+app.include_router(ascii_art.router, prefix="/api")
 
 @app.get("/")
 def root():
@@ -51,6 +96,11 @@ def root():
 
 @app.get("/health")
 def health_check():
-    return {"status": "healthy"}
+    return {
+        "status": "healthy",
+        "password_hashing": password_hasher.stats(),
+        "user_cache": user_cache.stats(),
+        "ascii": ascii_art.ascii_converter.stats(),
+    }
 
 
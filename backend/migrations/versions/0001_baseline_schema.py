@@ -0,0 +1,128 @@
+"""baseline schema
+
+The users, characters and campaigns tables as create_all() made them before
+the app used migrations. Databases from that time are stamped at this revision
+(see database.database.run_migrations) rather than running it.
+
+Revision ID: 0001
+Revises: 
+Create Date: 2026-10-19 01:19:29.661817
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0001'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('users',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('email', sa.String(), nullable=False),
+    sa.Column('username', sa.String(), nullable=False),
+    sa.Column('hashed_password', sa.String(), nullable=False),
+    sa.Column('role', sa.Enum('PLAYER', 'DM', name='userrole'), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_users_email'), ['email'], unique=True)
+        batch_op.create_index(batch_op.f('ix_users_id'), ['id'], unique=False)
+        batch_op.create_index(batch_op.f('ix_users_username'), ['username'], unique=True)
+
+    op.create_table('campaigns',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(), nullable=False),
+    sa.Column('description', sa.Text(), nullable=True),
+    sa.Column('dm_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['dm_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('campaigns', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_campaigns_id'), ['id'], unique=False)
+
+    op.create_table('characters',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('owner_id', sa.Integer(), nullable=False),
+    sa.Column('campaign_id', sa.Integer(), nullable=True),
+    sa.Column('name', sa.String(), nullable=False),
+    sa.Column('race', sa.String(), nullable=False),
+    sa.Column('character_class', sa.String(), nullable=False),
+    sa.Column('level', sa.Integer(), nullable=False),
+    sa.Column('background', sa.String(), nullable=True),
+    sa.Column('alignment', sa.Enum('LAWFUL_GOOD', 'NEUTRAL_GOOD', 'CHAOTIC_GOOD', 'LAWFUL_NEUTRAL', 'TRUE_NEUTRAL', 'CHAOTIC_NEUTRAL', 'LAWFUL_EVIL', 'NEUTRAL_EVIL', 'CHAOTIC_EVIL', name='alignment'), nullable=True),
+    sa.Column('experience_points', sa.Integer(), nullable=False),
+    sa.Column('strength', sa.Integer(), nullable=False),
+    sa.Column('dexterity', sa.Integer(), nullable=False),
+    sa.Column('constitution', sa.Integer(), nullable=False),
+    sa.Column('intelligence', sa.Integer(), nullable=False),
+    sa.Column('wisdom', sa.Integer(), nullable=False),
+    sa.Column('charisma', sa.Integer(), nullable=False),
+    sa.Column('hit_points_max', sa.Integer(), nullable=False),
+    sa.Column('hit_points_current', sa.Integer(), nullable=False),
+    sa.Column('hit_points_temp', sa.Integer(), nullable=False),
+    sa.Column('armor_class', sa.Integer(), nullable=False),
+    sa.Column('initiative', sa.Integer(), nullable=False),
+    sa.Column('speed', sa.Integer(), nullable=False),
+    sa.Column('death_save_successes', sa.Integer(), nullable=False),
+    sa.Column('death_save_failures', sa.Integer(), nullable=False),
+    sa.Column('saving_throw_proficiencies', sa.JSON(), nullable=False),
+    sa.Column('skill_proficiencies', sa.JSON(), nullable=False),
+    sa.Column('skill_expertises', sa.JSON(), nullable=False),
+    sa.Column('tool_proficiencies', sa.JSON(), nullable=False),
+    sa.Column('languages', sa.JSON(), nullable=False),
+    sa.Column('racial_traits', sa.JSON(), nullable=False),
+    sa.Column('class_features', sa.JSON(), nullable=False),
+    sa.Column('feats', sa.JSON(), nullable=False),
+    sa.Column('background_feature', sa.JSON(), nullable=False),
+    sa.Column('personality_traits', sa.String(), nullable=True),
+    sa.Column('ideals', sa.String(), nullable=True),
+    sa.Column('bonds', sa.String(), nullable=True),
+    sa.Column('flaws', sa.String(), nullable=True),
+    sa.Column('appearance', sa.String(), nullable=True),
+    sa.Column('backstory', sa.String(), nullable=True),
+    sa.Column('ascii_portrait', sa.String(), nullable=True),
+    sa.Column('original_portrait_url', sa.String(), nullable=True),
+    sa.Column('custom_portrait_ascii', sa.String(), nullable=True),
+    sa.Column('custom_portrait_count', sa.Integer(), nullable=False),
+    sa.Column('portrait_metadata', sa.JSON(), nullable=False),
+    sa.Column('inventory', sa.JSON(), nullable=False),
+    sa.Column('spellcasting_ability', sa.String(), nullable=True),
+    sa.Column('spell_save_dc', sa.Integer(), nullable=True),
+    sa.Column('spell_attack_bonus', sa.Integer(), nullable=True),
+    sa.Column('spell_slots', sa.JSON(), nullable=False),
+    sa.Column('spell_slots_used', sa.JSON(), nullable=False),
+    sa.Column('spells_known', sa.JSON(), nullable=False),
+    sa.Column('spells_prepared', sa.JSON(), nullable=False),
+    sa.Column('conditions', sa.JSON(), nullable=False),
+    sa.Column('attacks', sa.JSON(), nullable=False),
+    sa.Column('copper_pieces', sa.Integer(), nullable=False),
+    sa.Column('silver_pieces', sa.Integer(), nullable=False),
+    sa.Column('electrum_pieces', sa.Integer(), nullable=False),
+    sa.Column('gold_pieces', sa.Integer(), nullable=False),
+    sa.Column('platinum_pieces', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['campaign_id'], ['campaigns.id'], ),
+    sa.ForeignKeyConstraint(['owner_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('characters', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_characters_id'), ['id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('characters', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_characters_id'))
+
+    op.drop_table('characters')
+    with op.batch_alter_table('campaigns', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_campaigns_id'))
+
+    op.drop_table('campaigns')
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_users_username'))
+        batch_op.drop_index(batch_op.f('ix_users_id'))
+        batch_op.drop_index(batch_op.f('ix_users_email'))
+
+    op.drop_table('users')
\ No newline at end of file
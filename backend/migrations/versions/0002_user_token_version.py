@@ -0,0 +1,27 @@
+"""user token version
+
+users.token_version, which the cached user lookup checks so previously issued
+access tokens can be invalidated.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-19 01:19:36.858639
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('token_version', sa.Integer(), server_default='0', nullable=False))
+
+
+def downgrade():
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.drop_column('token_version')
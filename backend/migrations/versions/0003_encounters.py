@@ -0,0 +1,40 @@
+"""encounters
+
+The write-behind store of the in-memory encounter tracker (routes/encounters.py).
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-19 01:19:41.207113
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0003'
+down_revision = '0002'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('encounters',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('campaign_id', sa.Integer(), nullable=False),
+    sa.Column('round', sa.Integer(), nullable=False),
+    sa.Column('turn_index', sa.Integer(), nullable=False),
+    sa.Column('next_combatant_id', sa.Integer(), nullable=False),
+    sa.Column('combatants', sa.JSON(), nullable=False),
+    sa.ForeignKeyConstraint(['campaign_id'], ['campaigns.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('encounters', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_encounters_campaign_id'), ['campaign_id'], unique=True)
+        batch_op.create_index(batch_op.f('ix_encounters_id'), ['id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('encounters', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_encounters_id'))
+        batch_op.drop_index(batch_op.f('ix_encounters_campaign_id'))
+
+    op.drop_table('encounters')
@@ -0,0 +1,74 @@
+"""normalized login columns
+
+email_normalized and username_normalized columns under unique indexes, which
+login lookups seek on. SQLite's lower() only folds ASCII and a lower() index
+would not be unique, so case variants of an existing account could still be
+registered.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-19 02:05:12.418305
+"""
+import unicodedata
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0004'
+down_revision = '0003'
+branch_labels = None
+depends_on = None
+
+
+def _normalize(value):
+    # Frozen copy of models.user.normalize_login as of this revision
+    return unicodedata.normalize("NFKC", value.strip()).casefold()
+
+
+def upgrade():
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('email_normalized', sa.String(), nullable=True))
+        batch_op.add_column(sa.Column('username_normalized', sa.String(), nullable=True))
+
+    conn = op.get_bind()
+    users = sa.table(
+        'users',
+        sa.column('id', sa.Integer),
+        sa.column('email', sa.String),
+        sa.column('username', sa.String),
+        sa.column('email_normalized', sa.String),
+        sa.column('username_normalized', sa.String),
+    )
+    seen = {'email': {}, 'username': {}}
+    conflicts = []
+    for user_id, email, username in conn.execute(sa.select(users.c.id, users.c.email, users.c.username)).all():
+        values = {'email': _normalize(email), 'username': _normalize(username)}
+        for field, value in values.items():
+            other = seen[field].setdefault(value, user_id)
+            if other != user_id:
+                conflicts.append(f"{field} {value!r}: users {other} and {user_id}")
+        conn.execute(
+            users.update()
+            .where(users.c.id == user_id)
+            .values(email_normalized=values['email'], username_normalized=values['username'])
+        )
+    if conflicts:
+        raise RuntimeError(
+            "Users differ only by case; rename or merge them before migrating:\n  "
+            + "\n  ".join(conflicts)
+        )
+
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.alter_column('email_normalized', existing_type=sa.String(), nullable=False)
+        batch_op.alter_column('username_normalized', existing_type=sa.String(), nullable=False)
+        batch_op.create_index(batch_op.f('ix_users_email_normalized'), ['email_normalized'], unique=True)
+        batch_op.create_index(batch_op.f('ix_users_username_normalized'), ['username_normalized'], unique=True)
+
+
+def downgrade():
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_users_username_normalized'))
+        batch_op.drop_index(batch_op.f('ix_users_email_normalized'))
+        batch_op.drop_column('username_normalized')
+        batch_op.drop_column('email_normalized')
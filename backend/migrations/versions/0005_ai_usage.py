@@ -0,0 +1,48 @@
+"""ai usage
+
+Per-day, per-client, per-feature AI token and cost counters (utils/usage.py).
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-19 01:19:47.530962
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0005'
+down_revision = '0004'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('ai_usage',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('client_id', sa.String(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=True),
+    sa.Column('feature', sa.String(), nullable=False),
+    sa.Column('requests', sa.Integer(), nullable=False),
+    sa.Column('prompt_tokens', sa.Integer(), nullable=False),
+    sa.Column('completion_tokens', sa.Integer(), nullable=False),
+    sa.Column('cost_usd', sa.Float(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='SET NULL'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('day', 'client_id', 'feature', name='uq_ai_usage_day_client_feature')
+    )
+    with op.batch_alter_table('ai_usage', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_ai_usage_client_id'), ['client_id'], unique=False)
+        batch_op.create_index(batch_op.f('ix_ai_usage_day'), ['day'], unique=False)
+        batch_op.create_index(batch_op.f('ix_ai_usage_id'), ['id'], unique=False)
+        batch_op.create_index(batch_op.f('ix_ai_usage_user_id'), ['user_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('ai_usage', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_ai_usage_user_id'))
+        batch_op.drop_index(batch_op.f('ix_ai_usage_id'))
+        batch_op.drop_index(batch_op.f('ix_ai_usage_day'))
+        batch_op.drop_index(batch_op.f('ix_ai_usage_client_id'))
+
+    op.drop_table('ai_usage')
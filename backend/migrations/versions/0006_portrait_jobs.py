@@ -0,0 +1,45 @@
+"""portrait jobs
+
+The durable queue behind POST /api/ai/images/jobs (utils/portrait_jobs.py).
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-19 01:19:52.114790
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0006'
+down_revision = '0005'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('portrait_jobs',
+    sa.Column('id', sa.String(length=32), nullable=False),
+    sa.Column('status', sa.String(), nullable=False),
+    sa.Column('client_id', sa.String(), nullable=False),
+    sa.Column('prompt', sa.Text(), nullable=False),
+    sa.Column('size', sa.String(), nullable=False),
+    sa.Column('quality', sa.String(), nullable=False),
+    sa.Column('url', sa.Text(), nullable=True),
+    sa.Column('revised_prompt', sa.Text(), nullable=True),
+    sa.Column('error', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('started_at', sa.DateTime(), nullable=True),
+    sa.Column('finished_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('portrait_jobs', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_portrait_jobs_client_id'), ['client_id'], unique=False)
+        batch_op.create_index(batch_op.f('ix_portrait_jobs_status'), ['status'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('portrait_jobs', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_portrait_jobs_status'))
+        batch_op.drop_index(batch_op.f('ix_portrait_jobs_client_id'))
+
+    op.drop_table('portrait_jobs')
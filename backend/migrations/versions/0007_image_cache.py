@@ -0,0 +1,47 @@
+"""image cache
+
+The prompt-level portrait cache (utils/image_cache.py), and portrait_jobs.reroll
+so queued jobs can skip it.
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-19 01:19:57.068341
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0007'
+down_revision = '0006'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('image_cache',
+    sa.Column('key', sa.String(length=80), nullable=False),
+    sa.Column('prompt', sa.Text(), nullable=False),
+    sa.Column('size', sa.String(), nullable=False),
+    sa.Column('quality', sa.String(), nullable=False),
+    sa.Column('url', sa.Text(), nullable=False),
+    sa.Column('revised_prompt', sa.Text(), nullable=True),
+    sa.Column('hits', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('last_used_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('key')
+    )
+    with op.batch_alter_table('image_cache', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_image_cache_last_used_at'), ['last_used_at'], unique=False)
+
+    with op.batch_alter_table('portrait_jobs', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('reroll', sa.Boolean(), server_default=sa.false(), nullable=False))
+
+
+def downgrade():
+    with op.batch_alter_table('portrait_jobs', schema=None) as batch_op:
+        batch_op.drop_column('reroll')
+
+    with op.batch_alter_table('image_cache', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_image_cache_last_used_at'))
+
+    op.drop_table('image_cache')
@@ -1,7 +1,11 @@
 from .user import User, UserRole
 from .character import Character, Alignment
 from .campaign import Campaign
+from .encounter import Encounter
+from .ai_usage import AIUsage
+from .portrait_job import PortraitJob
+from .image_cache import ImageCacheEntry
 
-__all__ = ["User", "UserRole", "Character", "Alignment", "Campaign"]
+__all__ = ["User", "UserRole", "Character", "Alignment", "Campaign", "Encounter", "AIUsage", "PortraitJob", "ImageCacheEntry"]
 
 
@@ -0,0 +1,26 @@
+from sqlalchemy import Column, Integer, String, Float, Date, ForeignKey, UniqueConstraint
+from database.database import Base
+
+class AIUsage(Base):
+    """
+    Daily AI usage ledger: one row per (day, client, feature).
+
+    Rows are written in batches by utils.usage.UsageLedger, which adds its
+    in-memory deltas to the counters here.
+    """
+    __tablename__ = "ai_usage"
+    __table_args__ = (UniqueConstraint("day", "client_id", "feature", name="uq_ai_usage_day_client_feature"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    day = Column(Date, nullable=False, index=True)
+    # "user:<id>" for signed-in callers, otherwise the client IP
+    client_id = Column(String, nullable=False, index=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="SET NULL"), nullable=True, index=True)
+    # Which endpoint spent it: chat, narrator, names, backstory, image, ...
+    feature = Column(String, nullable=False)
+
+    requests = Column(Integer, default=0, nullable=False)
+    prompt_tokens = Column(Integer, default=0, nullable=False)
+    completion_tokens = Column(Integer, default=0, nullable=False)
+    # Estimated from list prices in utils/usage.py
+    cost_usd = Column(Float, default=0.0, nullable=False)
@@ -13,5 +13,6 @@ class Campaign(Base):
     # Relationships
     dm = relationship("User", back_populates="campaigns_owned")
     characters = relationship("Character", back_populates="campaign")
+    encounter = relationship("Encounter", back_populates="campaign", uselist=False, cascade="all, delete-orphan")
 
 
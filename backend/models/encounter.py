@@ -0,0 +1,22 @@
+from sqlalchemy import Column, Integer, ForeignKey, JSON
+from sqlalchemy.orm import relationship
+from database.database import Base
+
+class Encounter(Base):
+    __tablename__ = "encounters"
+
+    id = Column(Integer, primary_key=True, index=True)
+    # One live encounter per campaign; the in-memory tracker is keyed on this.
+    campaign_id = Column(Integer, ForeignKey("campaigns.id"), unique=True, index=True, nullable=False)
+
+    # Turn state
+    round = Column(Integer, default=1, nullable=False)
+    turn_index = Column(Integer, default=0, nullable=False)
+    next_combatant_id = Column(Integer, default=1, nullable=False)
+
+    # Initiative order (JSON array, already sorted)
+    # [{"id": 1, "name": "Goblin", "initiative": 14, "hit_points_current": 7, ...}]
+    combatants = Column(JSON, default=list, nullable=False)
+
+    # Relationships
+    campaign = relationship("Campaign", back_populates="encounter")
@@ -0,0 +1,26 @@
+from sqlalchemy import Column, Integer, String, Text, DateTime
+from database.database import Base
+
+class ImageCacheEntry(Base):
+    """
+    A generated portrait, keyed on its normalized prompt, size and quality
+    (plus the client id for a client's rerolled portrait).
+
+    Managed by utils.image_cache.ImagePromptCache, which evicts the least
+    recently used rows beyond its size cap. Only durable (R2) URLs are stored:
+    OpenAI's own image URLs expire after an hour.
+    """
+    __tablename__ = "image_cache"
+
+    # utils.image_cache.image_cache_key(prompt, size, quality[, owner])
+    key = Column(String(80), primary_key=True)
+    prompt = Column(Text, nullable=False)
+    size = Column(String, nullable=False)
+    quality = Column(String, nullable=False)
+
+    url = Column(Text, nullable=False)
+    revised_prompt = Column(Text, nullable=True)
+
+    hits = Column(Integer, default=0, nullable=False)
+    created_at = Column(DateTime, nullable=False)
+    last_used_at = Column(DateTime, nullable=False, index=True)
@@ -0,0 +1,32 @@
+from sqlalchemy import Boolean, Column, String, Text, DateTime
+from database.database import Base
+
+class PortraitJob(Base):
+    """
+    A queued portrait generation (DALL-E + R2 upload).
+
+    Run by utils.portrait_jobs.PortraitJobQueue; the row is the source of
+    truth, so queued and interrupted jobs are picked up again after a restart.
+    """
+    __tablename__ = "portrait_jobs"
+
+    # uuid4 hex; unguessable, so it doubles as the handle for polling
+    id = Column(String(32), primary_key=True)
+    # queued -> running -> succeeded | failed | cancelled
+    status = Column(String, nullable=False, default="queued", index=True)
+    # "user:<id>" for signed-in callers, otherwise the client IP
+    client_id = Column(String, nullable=False, index=True)
+
+    prompt = Column(Text, nullable=False)
+    size = Column(String, nullable=False)
+    quality = Column(String, nullable=False)
+    # Skip the image prompt cache and generate a fresh image
+    reroll = Column(Boolean, default=False, nullable=False)
+
+    url = Column(Text, nullable=True)
+    revised_prompt = Column(Text, nullable=True)
+    error = Column(Text, nullable=True)
+
+    created_at = Column(DateTime, nullable=False)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
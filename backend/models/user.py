@@ -1,8 +1,20 @@
 from sqlalchemy import Column, Integer, String, Enum
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import relationship, validates
 import enum
+import unicodedata
 from database.database import Base
 
+
+def normalize_login(value: str) -> str:
+    """
+    Canonical form used for every username/email comparison.
+
+    Folded in Python rather than with SQL lower(), which only folds ASCII on
+    SQLite, so "Élodie" and "élodie" compare equal on every database.
+    """
+    return unicodedata.normalize("NFKC", value.strip()).casefold()
+
+
 class UserRole(enum.Enum):
     PLAYER = "player"
     DM = "dm"
@@ -15,9 +27,19 @@ class User(Base):
     username = Column(String, unique=True, index=True, nullable=False)
     hashed_password = Column(String, nullable=False)
     role = Column(Enum(UserRole), default=UserRole.PLAYER, nullable=False)
+    # normalize_login() of email / username, kept in sync by the validators
+    # below. Their unique indexes stop case variants of an existing account
+    # from being created, and carry the case-insensitive login lookups.
+    email_normalized = Column(String, unique=True, index=True, nullable=False)
+    username_normalized = Column(String, unique=True, index=True, nullable=False)
+    # Incremented to invalidate previously issued access tokens
+    token_version = Column(Integer, default=0, nullable=False)
     
     # Relationships
     characters = relationship("Character", back_populates="owner")
     campaigns_owned = relationship("Campaign", back_populates="dm")
 
-
+    @validates("email", "username")
+    def _normalize(self, key, value):
+        setattr(self, f"{key}_normalized", normalize_login(value))
+        return value
@@ -2,74 +2,191 @@
 AI Service Routes - Secure proxy for OpenAI API calls
 This prevents exposing API keys to the frontend
 """
-from fastapi import APIRouter, HTTPException, Depends, Request
+from fastapi import APIRouter, HTTPException, Depends, Query, Request
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
 from pydantic import BaseModel, Field
-from typing import Optional, List
+from typing import AsyncIterator, Awaitable, Callable, Optional, List
+import asyncio
+import importlib.util
+import json
 import os
-import time
-from collections import defaultdict
-from datetime import datetime, timedelta
-import uuid
 
+import anyio
 import httpx
-import boto3
 import openai
+from openai import AsyncOpenAI
 from database.database import get_settings
+from routes.users import require_dm
+from utils.auth import CurrentUser, user_id_from_token
+from utils import storage
+from utils.ai_cache import CachePolicy, ResponseCache, exact_key, make_key
+from utils.image_cache import ImagePromptCache, image_cache_key
+from utils.name_pools import NamePools
+from utils.narrator_templates import local_narrator_comment
+from utils.portrait_jobs import JobFailed, PortraitJobQueue, TERMINAL_STATES
+from utils.prompts import compact_character, estimate_tokens
+from utils.rate_limit import create_rate_limiter
+from utils.usage import image_cost, set_usage_context, token_cost, usage_ledger
+from utils.upstream import Bulkhead, CircuitBreaker, RetryPolicy, SingleFlight, call_upstream
 
 router = APIRouter(tags=["AI"])
 
-# Rate limiting in-memory storage (use Redis in production)
-_rate_limit_store = defaultdict(list)
-
 # Load configuration from settings
 settings = get_settings()
 OPENAI_API_KEY = settings.openai_api_key
+# Explicit so an empty OPENAI_BASE_URL in .env can't override it
+OPENAI_DEFAULT_BASE_URL = "https://api.openai.com/v1"
 MAX_REQUESTS_PER_MINUTE = settings.max_requests_per_user_per_minute
 MAX_REQUESTS_PER_DAY = settings.max_requests_per_user_per_day
 
-# Cloudflare R2 configuration (optional)
-R2_ACCOUNT_ID = settings.r2_account_id
-R2_ACCESS_KEY_ID = settings.r2_access_key_id
-R2_SECRET_ACCESS_KEY = settings.r2_secret_access_key
-R2_BUCKET_NAME = settings.r2_bucket_name
-R2_PUBLIC_BASE_URL = settings.r2_public_base_url
-
-# Light debug to confirm whether R2 looks configured (does NOT print secrets).
-print(
-    "☁️  R2 config summary:",
-    {
-        "has_account_id": bool(R2_ACCOUNT_ID),
-        "has_access_key": bool(R2_ACCESS_KEY_ID),
-        "has_secret_key": bool(R2_SECRET_ACCESS_KEY),
-        "bucket_name": R2_BUCKET_NAME or "(empty)",
-        "public_base_url": R2_PUBLIC_BASE_URL or "(empty)",
-    },
+# Per-client minute/day counters. Use RATE_LIMIT_BACKEND=sqlite when running
+# several uvicorn workers so the quotas are shared instead of multiplied.
+_rate_limiter = create_rate_limiter(settings)
+
+# Cached text generations. Narrator comments keep several variants per key so
+# repeats don't feel canned. (Names come from the name pools instead.)
+_response_cache = ResponseCache(settings.ai_cache_max_entries, settings.ai_cache_sqlite_path)
+# Identical requests already in flight share one upstream call (double-clicks,
+# re-renders). Each request is still rate limited on its own before joining.
+_in_flight = SingleFlight()
+
+# Separate concurrency caps (with bounded wait queues) for each class of upstream
+# call, so a burst of slow image generations can't starve chat and narrator calls
+_chat_bulkhead = Bulkhead("chat", settings.ai_chat_concurrency, settings.ai_chat_queue_size)
+_image_bulkhead = Bulkhead("image", settings.ai_image_concurrency, settings.ai_image_queue_size)
+
+# Deadlines, jittered retries and a circuit breaker per class of upstream call.
+# The OpenAI client's own retries are disabled so this is the only retry policy.
+CHAT_RETRY = RetryPolicy(
+    settings.ai_chat_deadline_seconds,
+    settings.ai_retry_max_attempts,
+    settings.ai_retry_base_delay_seconds,
+    settings.ai_retry_max_delay_seconds,
+)
+IMAGE_RETRY = RetryPolicy(
+    settings.ai_image_deadline_seconds,
+    settings.ai_retry_max_attempts,
+    settings.ai_retry_base_delay_seconds,
+    settings.ai_retry_max_delay_seconds,
+)
+_chat_breaker = CircuitBreaker(
+    "chat", settings.ai_breaker_failure_threshold, settings.ai_breaker_reset_seconds
+)
+_image_breaker = CircuitBreaker(
+    "image", settings.ai_breaker_failure_threshold, settings.ai_breaker_reset_seconds
+)
+# Worth retrying: timeouts, dropped connections, 429s and 5xx from OpenAI
+RETRYABLE_ERRORS = (
+    openai.APIConnectionError,
+    openai.RateLimitError,
+    openai.InternalServerError,
 )
 
+# Generated portraits by prompt, persisted in the image_cache table
+_image_cache = ImagePromptCache(settings.image_cache_max_entries)
+
+BACKSTORY_CACHE = CachePolicy(settings.ai_cache_backstory_ttl_seconds)
+NARRATOR_CACHE = CachePolicy(
+    settings.ai_cache_narrator_ttl_seconds, variants=settings.ai_cache_narrator_variants
+)
+
+# Narrator calls that outlive their latency budget finish in the background
+_background_tasks = set()
+_narrator_stats = {"budget_fallbacks": 0, "error_fallbacks": 0, "late_results_cached": 0}
+
 if not OPENAI_API_KEY:
     print("⚠️  WARNING: OPENAI_API_KEY not set. AI features will be disabled.")
 
-# Initialize OpenAI client
-openai.api_key = OPENAI_API_KEY
+# Shared async OpenAI client (one pooled HTTP transport for every AI route).
+# Created by start_ai_clients() from the app lifespan; see get_openai_client().
+_openai_client: Optional[AsyncOpenAI] = None
 
 
-def _get_r2_client():
-    """
-    Build an S3-compatible client for Cloudflare R2 if configuration is present.
-    Returns None when R2 is not configured so callers can gracefully fall back.
-    """
-    if not (R2_ACCOUNT_ID and R2_ACCESS_KEY_ID and R2_SECRET_ACCESS_KEY and R2_BUCKET_NAME):
-        return None
+def get_openai_client() -> AsyncOpenAI:
+    """Return the shared AsyncOpenAI client, creating it on first use."""
+    global _openai_client
+    if _openai_client is None:
+        _openai_client = AsyncOpenAI(
+            api_key=OPENAI_API_KEY,
+            base_url=settings.openai_base_url or OPENAI_DEFAULT_BASE_URL,
+            timeout=httpx.Timeout(
+                settings.openai_timeout_seconds,
+                connect=settings.openai_connect_timeout_seconds,
+            ),
+            # Retries are handled by call_upstream (with deadlines and the circuit breaker)
+            max_retries=0,
+            http_client=openai.DefaultAsyncHttpxClient(
+                limits=httpx.Limits(
+                    max_connections=settings.openai_max_connections,
+                    max_keepalive_connections=settings.openai_max_connections,
+                ),
+            ),
+        )
+    return _openai_client
 
-    endpoint_url = f"https://{R2_ACCOUNT_ID}.r2.cloudflarestorage.com"
 
-    return boto3.client(
-        "s3",
-        endpoint_url=endpoint_url,
-        aws_access_key_id=R2_ACCESS_KEY_ID,
-        aws_secret_access_key=R2_SECRET_ACCESS_KEY,
-        region_name="auto",
-    )
+# Shared client for outbound downloads (e.g. fetching DALL-E results), so repeat
+# downloads reuse warm keep-alive connections instead of a fresh TCP+TLS handshake.
+_download_client: Optional[httpx.AsyncClient] = None
+
+# Read size when streaming downloads onward (e.g. portraits into R2)
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+
+# HTTP/2 needs the optional `h2` package (pip install "httpx[http2]")
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+
+def get_download_client() -> httpx.AsyncClient:
+    """Return the shared download client, creating it on first use."""
+    global _download_client
+    if _download_client is None:
+        _download_client = httpx.AsyncClient(
+            http2=HTTP2_AVAILABLE,
+            timeout=httpx.Timeout(
+                settings.download_timeout_seconds,
+                connect=settings.openai_connect_timeout_seconds,
+            ),
+            limits=httpx.Limits(
+                max_connections=settings.download_max_connections,
+                max_keepalive_connections=settings.download_max_connections,
+                keepalive_expiry=settings.download_keepalive_expiry_seconds,
+            ),
+            follow_redirects=True,
+        )
+    return _download_client
+
+
+async def start_ai_clients():
+    """Create shared upstream clients at startup (called from main.py lifespan)."""
+    if OPENAI_API_KEY:
+        get_openai_client()
+        if settings.name_pool_warm_on_startup:
+            _name_pools.warm()
+    get_download_client()
+    # Pay boto3's client construction cost once, before the first portrait
+    storage.get_r2_client()
+    await _portrait_jobs.start()
+
+
+async def close_ai_clients():
+    """
+    Close shared upstream clients and their connection pools, and the
+    rate limiter's and response cache's SQLite stores.
+    """
+    global _openai_client, _download_client
+    await _portrait_jobs.close()
+    await _name_pools.close()
+    _rate_limiter.close()
+    _response_cache.close()
+    for task in list(_background_tasks):
+        task.cancel()
+    if _openai_client is not None:
+        await _openai_client.close()
+        _openai_client = None
+    if _download_client is not None:
+        await _download_client.aclose()
+        _download_client = None
 
 
 # Request/Response models
@@ -86,6 +203,8 @@ class ImageGenerationRequest(BaseModel):
     prompt: str = Field(..., min_length=10, max_length=4000)
     size: str = Field("1024x1024", pattern="^(256x256|512x512|1024x1024|1792x1024|1024x1792)$")
     quality: str = Field("standard", pattern="^(standard|hd)$")
+    # Skip the shared prompt cache and generate a new image, kept for this client only
+    reroll: bool = False
 
 
 class NamesGenerationRequest(BaseModel):
@@ -123,57 +242,199 @@ def check_api_key():
 
 
 def get_client_id(request: Request) -> str:
-    """Get a unique identifier for the client (IP address or user ID)"""
-    # In production, use authenticated user ID instead
+    """Get a unique identifier for the client (user ID when signed in, else IP address)"""
+    authorization = request.headers.get("authorization", "")
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() == "bearer" and token:
+        user_id = user_id_from_token(token)
+        if user_id is not None:
+            return f"user:{user_id}"
     return request.client.host if request.client else "unknown"
 
 
-def check_rate_limit(client_id: str):
-    """Simple rate limiting (use Redis in production)"""
-    now = datetime.now()
-    
-    # Clean old entries
-    _rate_limit_store[client_id] = [
-        timestamp for timestamp in _rate_limit_store[client_id]
-        if now - timestamp < timedelta(days=1)
-    ]
-    
-    # Check per-minute limit
-    recent_requests = [
-        timestamp for timestamp in _rate_limit_store[client_id]
-        if now - timestamp < timedelta(minutes=1)
-    ]
-    if len(recent_requests) >= MAX_REQUESTS_PER_MINUTE:
+async def check_rate_limit(client_id: str):
+    """Enforce the per-client minute and day quotas and the daily token budget"""
+    usage_ledger.check_budget(client_id)
+    if _rate_limiter.blocking:
+        # Shared backends do file I/O and may wait on another worker's lock
+        exceeded = await run_in_threadpool(_rate_limiter.hit, client_id)
+    else:
+        exceeded = _rate_limiter.hit(client_id)
+    if exceeded == "minute":
         raise HTTPException(
             status_code=429,
             detail=f"Rate limit exceeded. Max {MAX_REQUESTS_PER_MINUTE} requests per minute."
         )
-    
-    # Check per-day limit
-    if len(_rate_limit_store[client_id]) >= MAX_REQUESTS_PER_DAY:
+    if exceeded == "day":
         raise HTTPException(
             status_code=429,
             detail=f"Daily rate limit exceeded. Max {MAX_REQUESTS_PER_DAY} requests per day."
         )
+
+
+async def create_chat_completion(**kwargs):
+    """
+    Chat completion under the chat deadline, retry policy and circuit breaker.
+    Each attempt holds a slot in the chat bulkhead.
+    """
+    async def attempt():
+        return await get_openai_client().chat.completions.create(
+            model="gpt-3.5-turbo",
+            **kwargs
+        )
     
-    # Record this request
-    _rate_limit_store[client_id].append(now)
+    response = await call_upstream(
+        attempt, CHAT_RETRY, _chat_breaker, RETRYABLE_ERRORS, bulkhead=_chat_bulkhead
+    )
+    if response.usage is not None:
+        record_chat_usage(response.usage.prompt_tokens, response.usage.completion_tokens)
+    return response
+
+
+def record_chat_usage(prompt_tokens: int, completion_tokens: int) -> None:
+    usage_ledger.record(
+        prompt_tokens,
+        completion_tokens,
+        token_cost("gpt-3.5-turbo", prompt_tokens, completion_tokens),
+    )
+
+
+def sse_event(data: dict, event: Optional[str] = None) -> str:
+    """Format one server-sent event"""
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data)}\n\n"
+
+
+def sse_response(events: AsyncIterator[str]) -> StreamingResponse:
+    return StreamingResponse(
+        events,
+        media_type="text/event-stream",
+        # Stop proxies (nginx, Render) from buffering the stream
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+async def stream_chat_completion(
+    http_request: Request,
+    messages: List[dict],
+    max_tokens: int,
+    temperature: float,
+    on_complete: Optional[Callable[[str], Awaitable[None]]] = None,
+) -> AsyncIterator[str]:
+    """
+    Forward an OpenAI streaming completion as server-sent events.
+
+    Emits one `data: {"content": ...}` event per token delta, then an `event: done`
+    with the full text (or `event: error`). If the client goes away the upstream
+    stream is closed, which cancels generation instead of paying for unread tokens.
+    """
+    stream = None
+    parts = []
+    usage = None
+    try:
+        # The slot is held for the whole stream, since the upstream call is live until it ends
+        async with _chat_bulkhead.slot():
+            # Opening the stream is retried like any other call; once tokens
+            # have been forwarded a failure just ends the stream with an error
+            stream = await call_upstream(
+                lambda: get_openai_client().chat.completions.create(
+                    model="gpt-3.5-turbo",
+                    messages=messages,
+                    max_tokens=max_tokens,
+                    temperature=temperature,
+                    stream=True,
+                    stream_options={"include_usage": True},
+                ),
+                CHAT_RETRY,
+                _chat_breaker,
+                RETRYABLE_ERRORS,
+            )
+            async for chunk in stream:
+                if chunk.usage is not None:
+                    usage = chunk.usage
+                if await http_request.is_disconnected():
+                    return
+                delta = chunk.choices[0].delta.content if chunk.choices else None
+                if delta:
+                    parts.append(delta)
+                    yield sse_event({"content": delta})
+
+        content = "".join(parts).strip()
+        if on_complete is not None:
+            await on_complete(content)
+        yield sse_event({"content": content}, event="done")
+
+    except HTTPException as e:
+        yield sse_event({"detail": e.detail}, event="error")
+    except openai.RateLimitError:
+        yield sse_event({"detail": "OpenAI rate limit exceeded. Please try again later."}, event="error")
+    except openai.APIError as e:
+        yield sse_event({"detail": f"OpenAI API error: {str(e)}"}, event="error")
+    finally:
+        # Also runs when Starlette cancels the response because the client
+        # disconnected. Its cancel scope then cancels every await here too, so
+        # usage is recorded before awaiting anything and the close is shielded
+        if stream is not None:
+            # The final usage chunk is missing if the stream was cut short; then
+            # estimate (~1 token per delta)
+            if usage is not None:
+                record_chat_usage(usage.prompt_tokens, usage.completion_tokens)
+            else:
+                record_chat_usage(sum(estimate_tokens(m["content"]) for m in messages), len(parts))
+            with anyio.CancelScope(shield=True):
+                await stream.close()
 
 
 # Routes
 @router.get("/status")
 async def get_ai_status():
     """Check if AI service is available"""
+    # The SQLite backend counts its clients with a query; keep it off the event loop
+    if _rate_limiter.blocking:
+        rate_limit_stats = await run_in_threadpool(_rate_limiter.stats)
+    else:
+        rate_limit_stats = _rate_limiter.stats()
     return {
         "available": OPENAI_API_KEY is not None,
         "provider": "openai",
         "features": {
             "chat": OPENAI_API_KEY is not None,
             "images": OPENAI_API_KEY is not None
-        }
+        },
+        "storage": storage.upload_stats(),
+        "rate_limit": rate_limit_stats,
+        "cache": _response_cache.stats(),
+        "name_pools": _name_pools.stats(),
+        "in_flight": _in_flight.stats(),
+        "bulkheads": {
+            "chat": _chat_bulkhead.stats(),
+            "images": _image_bulkhead.stats(),
+        },
+        "portrait_jobs": _portrait_jobs.stats(),
+        "image_cache": _image_cache.stats(),
+        "narrator": {
+            "latency_budget_ms": round(settings.narrator_latency_budget_seconds * 1000),
+            **_narrator_stats,
+        },
+        "usage": usage_ledger.stats(),
+        "circuits": {
+            "chat": _chat_breaker.stats(),
+            "images": _image_breaker.stats(),
+        },
     }
 
 
+@router.get("/usage")
+async def get_ai_usage(
+    days: int = Query(7, ge=1, le=90),
+    _: CurrentUser = Depends(require_dm),
+):
+    """AI usage and estimated cost by feature, day and client (DM only)"""
+    # Include everything recorded so far, not just the last batch
+    await run_in_threadpool(usage_ledger.flush)
+    return await run_in_threadpool(usage_ledger.summary, days)
+
+
 @router.post("/chat/completion")
 async def chat_completion(
     request: ChatCompletionRequest,
@@ -182,16 +443,16 @@ async def chat_completion(
     """Generate chat completion (for narrator, names, backstory)"""
     check_api_key()
     client_id = get_client_id(http_request)
-    check_rate_limit(client_id)
+    await check_rate_limit(client_id)
+    set_usage_context(client_id, "chat")
     
-    try:
-        messages = []
-        if request.system_prompt:
-            messages.append({"role": "system", "content": request.system_prompt})
-        messages.append({"role": "user", "content": request.prompt})
-        
-        response = openai.chat.completions.create(
-            model="gpt-3.5-turbo",
+    messages = []
+    if request.system_prompt:
+        messages.append({"role": "system", "content": request.system_prompt})
+    messages.append({"role": "user", "content": request.prompt})
+    
+    async def generate():
+        response = await create_chat_completion(
             messages=messages,
             max_tokens=request.max_tokens,
             temperature=request.temperature
@@ -209,101 +470,289 @@ async def chat_completion(
             }
         }
     
+    # Free text: prompts differing only in case or spacing may want different answers
+    flight_key = exact_key(
+        "chat",
+        system_prompt=request.system_prompt,
+        prompt=request.prompt,
+        max_tokens=request.max_tokens,
+        temperature=request.temperature,
+    )
+    
+    try:
+        return await _in_flight.do(flight_key, generate)
+    
     except openai.RateLimitError as e:
         raise HTTPException(status_code=429, detail="OpenAI rate limit exceeded. Please try again later.")
     except openai.APIError as e:
         raise HTTPException(status_code=502, detail=f"OpenAI API error: {str(e)}")
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to generate completion: {str(e)}")
 
 
-@router.post("/images/generate")
-async def generate_image(
-    request: ImageGenerationRequest,
+@router.post("/chat/completion/stream")
+async def chat_completion_stream(
+    request: ChatCompletionRequest,
     http_request: Request
 ):
-    """Generate image using DALL-E"""
+    """Stream a chat completion as server-sent events"""
     check_api_key()
     client_id = get_client_id(http_request)
-    check_rate_limit(client_id)
+    await check_rate_limit(client_id)
+    set_usage_context(client_id, "chat_stream")
     
-    try:
-        # Step 1: Generate image with DALL-E
-        response = openai.images.generate(
+    messages = []
+    if request.system_prompt:
+        messages.append({"role": "system", "content": request.system_prompt})
+    messages.append({"role": "user", "content": request.prompt})
+    
+    # Shed load with a real 503 before the stream (and its 200 status) starts
+    _chat_bulkhead.check()
+    return sse_response(
+        stream_chat_completion(http_request, messages, request.max_tokens, request.temperature)
+    )
+
+
+async def create_portrait(request: ImageGenerationRequest, client_id: str) -> dict:
+    """Generate an image with DALL-E and, when R2 is configured, re-host it there"""
+    # Step 1: Generate image with DALL-E
+    async def attempt():
+        return await get_openai_client().images.generate(
             model="dall-e-3",
             prompt=request.prompt,
             n=1,
             size=request.size,
             quality=request.quality,
+            timeout=settings.openai_image_timeout_seconds,
         )
+    
+    response = await call_upstream(
+        attempt, IMAGE_RETRY, _image_breaker, RETRYABLE_ERRORS, bulkhead=_image_bulkhead
+    )
+    usage_ledger.record(cost_usd=image_cost(request.quality, request.size))
+
+    openai_url = response.data[0].url
+    revised_prompt = response.data[0].revised_prompt
 
-        openai_url = response.data[0].url
-        revised_prompt = response.data[0].revised_prompt
-
-        # Debug logging for DALL-E response
-        print("🎨 DALL-E image generated.")
-        print(f"   Prompt (truncated): {request.prompt[:120]}...")
-        print(f"   OpenAI URL (truncated): {openai_url[:80]}...")
-
-        # Default to OpenAI's temporary URL; we'll overwrite if R2 upload succeeds.
-        final_url = openai_url
-
-        # Step 2: If Cloudflare R2 is configured, download the image and upload it to R2
-        r2_client = _get_r2_client()
-        if r2_client and openai_url:
-            try:
-                async with httpx.AsyncClient(timeout=60.0) as client:
-                    img_resp = await client.get(openai_url)
-                    img_resp.raise_for_status()
-
-                    content_type = img_resp.headers.get("content-type", "image/png")
-                    # Basic extension detection; defaults to .png
-                    ext = "jpg" if "jpeg" in content_type or "jpg" in content_type else "png"
-
-                    # Use a reasonably unique key for the portrait
-                    timestamp = int(time.time())
-                    key = f"portraits/{timestamp}_{uuid.uuid4().hex}.{ext}"
-
-                    print("☁️  Uploading portrait to Cloudflare R2...")
-                    print(f"   Bucket: {R2_BUCKET_NAME}")
-                    print(f"   Key: {key}")
-                    print(f"   Content-Type: {content_type}")
-
-                    r2_client.put_object(
-                        Bucket=R2_BUCKET_NAME,
-                        Key=key,
-                        Body=img_resp.content,
-                        ContentType=content_type,
+    # Debug logging for DALL-E response
+    print("🎨 DALL-E image generated.")
+    print(f"   Prompt (truncated): {request.prompt[:120]}...")
+    print(f"   OpenAI URL (truncated): {openai_url[:80]}...")
+
+    # Default to OpenAI's temporary URL; we'll overwrite if R2 upload succeeds.
+    final_url = openai_url
+
+    # Step 2: If Cloudflare R2 is configured, download the image and upload it to R2
+    if storage.get_r2_client() and openai_url:
+        try:
+            # Hash the download as it arrives; identical images share one object
+            async with get_download_client().stream("GET", openai_url) as img_resp:
+                img_resp.raise_for_status()
+
+                content_type = img_resp.headers.get("content-type", "image/png")
+                # Basic extension detection; defaults to .png
+                ext = "jpg" if "jpeg" in content_type or "jpg" in content_type else "png"
+
+                print("☁️  Uploading portrait to Cloudflare R2...")
+                print(f"   Bucket: {storage.R2_BUCKET_NAME}")
+                print(f"   Content-Type: {content_type}")
+
+                key, reused, upload_ms = await storage.upload_content_addressed(
+                    "portraits", img_resp.aiter_bytes(DOWNLOAD_CHUNK_SIZE), content_type, ext
+                )
+            final_url = storage.public_url(key)
+
+            if reused:
+                print(f"♻️  Identical portrait already in R2, reusing {key}")
+            else:
+                print(f"✅ Cloudflare R2 upload complete in {upload_ms:.0f} ms.")
+            print(f"   Final image URL: {final_url}")
+        except Exception as r2_error:
+            # Non-fatal: log and fall back to the original OpenAI URL
+            print(f"⚠️  Failed to upload image to Cloudflare R2: {r2_error}")
+        else:
+            # Only R2 URLs are worth caching; OpenAI's expire after an hour.
+            # A reroll is stored for its client only, never over the shared entry
+            if _image_cache.enabled:
+                owner = client_id if request.reroll else None
+                try:
+                    await run_in_threadpool(
+                        _image_cache.put,
+                        image_cache_key(request.prompt, request.size, request.quality, owner),
+                        request.prompt, request.size, request.quality, final_url, revised_prompt,
                     )
+                except Exception as cache_error:
+                    print(f"⚠️  Failed to cache portrait URL: {cache_error}")
 
-                    # Prefer explicit public base URL when provided (recommended for R2 dev/public buckets),
-                    # otherwise fall back to the S3-style endpoint.
-                    if R2_PUBLIC_BASE_URL:
-                        base = R2_PUBLIC_BASE_URL.rstrip("/")
-                        final_url = f"{base}/{key}"
-                    else:
-                        final_url = f"https://{R2_ACCOUNT_ID}.r2.cloudflarestorage.com/{R2_BUCKET_NAME}/{key}"
+    return {
+        "success": True,
+        "url": final_url,
+        "revised_prompt": revised_prompt,
+    }
 
-                    print("✅ Cloudflare R2 upload complete.")
-                    print(f"   Final image URL: {final_url}")
-            except Exception as r2_error:
-                # Non-fatal: log and fall back to the original OpenAI URL
-                print(f"⚠️  Failed to upload image to Cloudflare R2: {r2_error}")
 
-        return {
-            "success": True,
-            "url": final_url,
-            "revised_prompt": revised_prompt,
-        }
+async def cached_portrait(request: ImageGenerationRequest, client_id: str) -> Optional[dict]:
+    """
+    The cached portrait for this prompt, or None (always, when rerolling).
+    The client's own rerolled portrait for the prompt comes before the shared one.
+    """
+    if not _image_cache.enabled or request.reroll:
+        return None
+    cached = await run_in_threadpool(
+        _image_cache.get,
+        image_cache_key(request.prompt, request.size, request.quality, client_id),
+        image_cache_key(request.prompt, request.size, request.quality),
+    )
+    return {"success": True, **cached, "cached": True} if cached is not None else None
+
+
+async def portrait_for(request: ImageGenerationRequest, client_id: str) -> dict:
+    """The cached portrait for this prompt if there is one (unless rerolling), else a new one"""
+    cached = await cached_portrait(request, client_id)
+    return cached if cached is not None else await create_portrait(request, client_id)
+
+
+@router.post("/images/generate")
+async def generate_image(
+    request: ImageGenerationRequest,
+    http_request: Request
+):
+    """Generate image using DALL-E"""
+    check_api_key()
+    client_id = get_client_id(http_request)
+    await check_rate_limit(client_id)
+    set_usage_context(client_id, "image")
+    
+    # A reroll is stored for its client only, so only that client's rerolls share a flight
+    flight_key = exact_key(
+        "image", prompt=request.prompt, size=request.size, quality=request.quality,
+        reroll=request.reroll, client=client_id if request.reroll else None,
+    )
+    
+    try:
+        cached = await cached_portrait(request, client_id)
+        if cached is not None:
+            return cached
+        return await _in_flight.do(flight_key, lambda: create_portrait(request, client_id))
     
     except openai.RateLimitError:
         raise HTTPException(status_code=429, detail="OpenAI rate limit exceeded. Please try again later.")
     except openai.APIError as e:
         raise HTTPException(status_code=502, detail=f"OpenAI API error: {str(e)}")
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to generate image: {str(e)}")
 
 
+async def run_portrait_job(job: dict) -> dict:
+    """Job runner for _portrait_jobs: the same pipeline as /images/generate"""
+    set_usage_context(job["client_id"], "image_job")
+    request = ImageGenerationRequest(
+        prompt=job["prompt"], size=job["size"], quality=job["quality"], reroll=job["reroll"]
+    )
+    # Called directly rather than through _in_flight, so cancelling the job
+    # really aborts the upstream call
+    try:
+        result = await portrait_for(request, job["client_id"])
+    except openai.RateLimitError:
+        raise JobFailed("OpenAI rate limit exceeded. Please try again later.")
+    except openai.APIError as e:
+        raise JobFailed(f"OpenAI API error: {str(e)}")
+    except HTTPException as e:
+        raise JobFailed(e.detail)
+    return {"url": result["url"], "revised_prompt": result["revised_prompt"]}
+
+
+_portrait_jobs = PortraitJobQueue(
+    run_portrait_job,
+    workers=settings.portrait_job_workers,
+    max_queued=settings.portrait_job_max_queued,
+    retention_days=settings.portrait_job_retention_days,
+    lease_seconds=settings.portrait_job_lease_seconds,
+    poll_seconds=settings.portrait_job_poll_seconds,
+)
+
+
+def public_job(job: dict, http_request: Request) -> dict:
+    """A job as returned to clients: without the submitter's client id, with its URLs"""
+    data = {key: value for key, value in job.items() if key != "client_id"}
+    data["status_url"] = str(http_request.url_for("get_portrait_job", job_id=job["id"]))
+    data["events_url"] = str(http_request.url_for("portrait_job_events", job_id=job["id"]))
+    return data
+
+
+async def get_job_or_404(job_id: str) -> dict:
+    job = await _portrait_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+@router.post("/images/jobs", status_code=202)
+async def submit_image_job(
+    request: ImageGenerationRequest,
+    http_request: Request
+):
+    """Queue a DALL-E portrait; poll status_url or subscribe to events_url for the result"""
+    check_api_key()
+    client_id = get_client_id(http_request)
+    await check_rate_limit(client_id)
+    
+    job = await _portrait_jobs.submit(
+        client_id, request.prompt, request.size, request.quality, request.reroll
+    )
+    return {
+        "success": True,
+        "job": public_job(job, http_request)
+    }
+
+
+@router.get("/jobs/{job_id}")
+async def get_portrait_job(job_id: str, http_request: Request):
+    """Current state of a portrait job"""
+    job = await get_job_or_404(job_id)
+    return {
+        "success": True,
+        "job": public_job(job, http_request)
+    }
+
+
+@router.get("/jobs/{job_id}/events")
+async def portrait_job_events(job_id: str, http_request: Request):
+    """
+    Stream a portrait job's progress as server-sent events:
+    `event: status` on every change, then `event: done` with the finished job.
+    """
+    await get_job_or_404(job_id)
+
+    async def events() -> AsyncIterator[str]:
+        async for job in _portrait_jobs.watch(job_id):
+            event = "done" if job["status"] in TERMINAL_STATES else "status"
+            yield sse_event(public_job(job, http_request), event=event)
+
+    return sse_response(events())
+
+
+@router.delete("/jobs/{job_id}")
+async def cancel_portrait_job(job_id: str, http_request: Request):
+    """Cancel a queued or running portrait job (only the client that submitted it)"""
+    job = await get_job_or_404(job_id)
+    if job["client_id"] != get_client_id(http_request):
+        # Same answer as an unknown id, so job ids can't be probed
+        raise HTTPException(status_code=404, detail="Job not found")
+    if job["status"] in TERMINAL_STATES:
+        raise HTTPException(status_code=409, detail=f"Job already {job['status']}")
+    
+    job = await _portrait_jobs.cancel(job_id)
+    return {
+        "success": job["status"] == "cancelled",
+        "job": public_job(job, http_request)
+    }
+
+
 # Narrator personality system prompts
 NARRATOR_PROMPTS = {
     'deadpan': 'You are a deadpan, slightly cheeky D&D narrator. Your personality is dry and witty, occasionally using emoticons like ( ._.) when amused. Keep responses under 50 words. Be brief, sarcastic, and occasionally break the fourth wall. Vary your phrasing across comments.',
@@ -329,20 +778,25 @@ async def generate_narrator_comment(
     """Generate narrator comment for character creation"""
     check_api_key()
     client_id = get_client_id(http_request)
-    check_rate_limit(client_id)
+    await check_rate_limit(client_id)
+    set_usage_context(client_id, "narrator")
     
     # Get system prompt based on narrator personality
-    system_prompt = NARRATOR_PROMPTS.get(request.narrator_id, NARRATOR_PROMPTS['deadpan'])
+    narrator_id = request.narrator_id if request.narrator_id in NARRATOR_PROMPTS else 'deadpan'
+    system_prompt = NARRATOR_PROMPTS[narrator_id]
     
+    # Only the fields relevant to this question, not the whole builder state
+    character = compact_character(
+        request.character_so_far, request.question, settings.narrator_context_token_budget
+    )
     user_prompt = (
         f"The player chose: {request.choice} for {request.question}. "
-        f"Their character so far: {request.character_so_far}. "
+        f"Their character so far: {character}. "
         "Make a brief comment about their choice that fits your personality."
     )
-    
-    try:
-        response = openai.chat.completions.create(
-            model="gpt-3.5-turbo",
+
+    async def generate():
+        response = await create_chat_completion(
             messages=[
                 {"role": "system", "content": system_prompt},
                 {"role": "user", "content": user_prompt}
@@ -350,28 +804,96 @@ async def generate_narrator_comment(
             max_tokens=100,
             temperature=0.8
         )
+        return response.choices[0].message.content.strip()
+
+    # Keyed on the choice itself; the rest of the character only flavors the comment
+    cache_key = make_key(
+        "narrator", narrator_id=narrator_id, question=request.question, choice=request.choice
+    )
+    
+    # Run the lookup as its own task: if it misses the latency budget we answer
+    # locally, and a late upstream result still lands in the cache for next time
+    lookup = asyncio.create_task(
+        _response_cache.get_or_create(
+            cache_key, NARRATOR_CACHE, lambda: _in_flight.do(cache_key, generate)
+        )
+    )
+    _background_tasks.add(lookup)
+    lookup.add_done_callback(_background_tasks.discard)
+    
+    try:
+        comment = await asyncio.wait_for(
+            asyncio.shield(lookup), timeout=settings.narrator_latency_budget_seconds or None
+        )
         
         return {
             "success": True,
-            "comment": response.choices[0].message.content.strip()
+            "comment": comment
+        }
+    
+    except asyncio.TimeoutError:
+        _narrator_stats["budget_fallbacks"] += 1
+        lookup.add_done_callback(_count_late_narrator_result)
+        return {
+            "success": True,
+            "comment": local_narrator_comment(narrator_id, request.choice),
+            "fallback": True
         }
     
     except Exception as e:
-        # Return fallback on error (using deadpan fallbacks as default)
-        fallbacks = [
-            'Interesting choice. ( ._. )',
-            "Well, that tracks.",
-            "Bold move. We'll see how that works out.",
-            'Sure. Why not.',
-        ]
-        import random
+        # Return a local comment in the narrator's voice on error
+        _narrator_stats["error_fallbacks"] += 1
         return {
             "success": False,
-            "comment": random.choice(fallbacks),
+            "comment": local_narrator_comment(narrator_id, request.choice),
             "error": str(e)
         }
 
 
+def _count_late_narrator_result(task: asyncio.Task) -> None:
+    if not task.cancelled() and task.exception() is None:
+        _narrator_stats["late_results_cached"] += 1
+
+
+async def generate_names(race: str, class_type: str, count: int) -> List[str]:
+    """Ask OpenAI for `count` names for a race/class (used directly and by the name pools)"""
+    prompt = (
+        f"Generate {count} fantasy character names suitable for a "
+        f"{race} {class_type} in D&D. "
+        "Just list the names, one per line, nothing else."
+    )
+    response = await create_chat_completion(
+        messages=[{"role": "user", "content": prompt}],
+        max_tokens=200,
+        temperature=0.9
+    )
+    
+    content = response.choices[0].message.content.strip()
+    # Parse names from response
+    names = [
+        name.strip()
+        for name in content.split('\n')
+        if name.strip()
+    ]
+    # Remove leading numbers
+    return [name.split('. ', 1)[-1].split(') ', 1)[-1] for name in names]
+
+
+async def generate_pool_names(race: str, class_type: str, count: int) -> List[str]:
+    # Refills serve everyone, so they are not charged to the request that triggered them
+    set_usage_context("system", "name_pool")
+    return await generate_names(race, class_type, count)
+
+
+# Names are served from per-race/class pools that refill in the background
+_name_pools = NamePools(
+    generate_pool_names,
+    target_size=settings.name_pool_size,
+    low_watermark=settings.name_pool_low_watermark,
+    refill_concurrency=settings.name_pool_refill_concurrency,
+)
+
+
 @router.post("/characters/names")
 async def generate_character_names(
     request: NamesGenerationRequest,
@@ -380,51 +902,37 @@ async def generate_character_names(
     """Generate character names"""
     check_api_key()
     client_id = get_client_id(http_request)
-    check_rate_limit(client_id)
+    await check_rate_limit(client_id)
+    set_usage_context(client_id, "names")
     
-    prompt = (
-        f"Generate {request.count} fantasy character names suitable for a "
-        f"{request.race} {request.class_type} in D&D. "
-        "Just list the names, one per line, nothing else."
-    )
+    # Pop from the pre-generated pool; an empty pool is refilled in the background
+    names = _name_pools.take(request.race, request.class_type, request.count)
+    if names is not None:
+        return {
+            "success": True,
+            "names": names
+        }
     
     try:
-        response = openai.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[{"role": "user", "content": prompt}],
-            max_tokens=200,
-            temperature=0.9
+        flight_key = make_key(
+            "names", race=request.race, class_type=request.class_type, count=request.count
+        )
+        names = await _in_flight.do(
+            flight_key, lambda: generate_names(request.race, request.class_type, request.count)
         )
-        
-        content = response.choices[0].message.content.strip()
-        # Parse names from response
-        names = [
-            name.strip()
-            for name in content.split('\n')
-            if name.strip()
-        ]
-        # Remove leading numbers
-        names = [name.split('. ', 1)[-1].split(') ', 1)[-1] for name in names]
         
         return {
             "success": True,
             "names": names[:request.count]
         }
     
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to generate names: {str(e)}")
 
 
-@router.post("/characters/backstory")
-async def generate_character_backstory(
-    request: BackstoryGenerationRequest,
-    http_request: Request
-):
-    """Generate character backstory"""
-    check_api_key()
-    client_id = get_client_id(http_request)
-    check_rate_limit(client_id)
-    
+def backstory_prompt(request: BackstoryGenerationRequest) -> str:
     prompt = (
         f"Create a brief (100 words max) backstory for: {request.name}, "
         f"a {request.race} {request.class_type}. "
@@ -434,20 +942,88 @@ async def generate_character_backstory(
     if request.background:
         prompt += f"Background: {request.background}. "
     prompt += "Make it dramatic but deadpan in tone."
+    return prompt
+
+
+def backstory_cache_key(request: BackstoryGenerationRequest) -> str:
+    return make_key(
+        "backstory",
+        name=request.name,
+        race=request.race,
+        class_type=request.class_type,
+        personality=request.personality,
+        background=request.background,
+    )
+
+
+@router.post("/characters/backstory")
+async def generate_character_backstory(
+    request: BackstoryGenerationRequest,
+    http_request: Request
+):
+    """Generate character backstory"""
+    check_api_key()
+    client_id = get_client_id(http_request)
+    await check_rate_limit(client_id)
+    set_usage_context(client_id, "backstory")
     
-    try:
-        response = openai.chat.completions.create(
-            model="gpt-3.5-turbo",
+    prompt = backstory_prompt(request)
+    
+    async def generate():
+        response = await create_chat_completion(
             messages=[{"role": "user", "content": prompt}],
             max_tokens=300,
             temperature=0.8
         )
-        
+        return response.choices[0].message.content.strip()
+    
+    cache_key = backstory_cache_key(request)
+    
+    try:
         return {
             "success": True,
-            "backstory": response.choices[0].message.content.strip()
+            "backstory": await _response_cache.get_or_create(
+                cache_key, BACKSTORY_CACHE, lambda: _in_flight.do(cache_key, generate)
+            )
         }
     
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to generate backstory: {str(e)}")
 
+
+@router.post("/characters/backstory/stream")
+async def generate_character_backstory_stream(
+    request: BackstoryGenerationRequest,
+    http_request: Request
+):
+    """Stream a character backstory as server-sent events"""
+    check_api_key()
+    client_id = get_client_id(http_request)
+    await check_rate_limit(client_id)
+    set_usage_context(client_id, "backstory_stream")
+    
+    cache_key = backstory_cache_key(request)
+    cached = await _response_cache.get(cache_key)
+    if cached is not None:
+        async def replay():
+            yield sse_event({"content": cached})
+            yield sse_event({"content": cached}, event="done")
+        return sse_response(replay())
+    
+    _chat_bulkhead.check()
+    
+    async def remember(backstory: str):
+        if backstory:
+            await _response_cache.set(cache_key, backstory, BACKSTORY_CACHE.ttl_seconds)
+    
+    return sse_response(
+        stream_chat_completion(
+            http_request,
+            [{"role": "user", "content": backstory_prompt(request)}],
+            max_tokens=300,
+            temperature=0.8,
+            on_complete=remember,
+        )
+    )
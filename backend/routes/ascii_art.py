@@ -0,0 +1,220 @@
+"""
+ASCII Art Routes - Server-side image -> ASCII conversion
+
+The character builder used to dither portraits in the browser, which takes
+seconds on slow phones. POST /api/ascii does the same conversion
+(utils/ascii_art.py, shared with the offline scripts) on a dedicated process
+pool, so the CPU work neither runs on the client nor blocks the event loop.
+"""
+import asyncio
+import multiprocessing
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional
+from urllib.parse import urlparse
+
+import httpx
+from fastapi import APIRouter, Depends, File, Form, HTTPException, Request, UploadFile, status
+from PIL import Image, UnidentifiedImageError
+
+from database.database import get_settings
+from routes.ai import check_rate_limit, get_client_id, get_download_client
+from utils import storage
+from utils.ascii_art import ASCII_HEIGHT, ASCII_WIDTH, image_to_ascii, limit_image_pixels
+from utils.auth import CurrentUser, get_current_user
+
+settings = get_settings()
+
+router = APIRouter(prefix="/ascii", tags=["ascii"])
+
+
+class AsciiConverter:
+    """
+    Runs image_to_ascii on a dedicated, bounded process pool.
+
+    At most `workers` conversions run at once, up to `queue_size` more wait
+    their turn, and anything beyond that is rejected with a 503. The pool is
+    started on first use, with "spawn" rather than fork: forking a process
+    that already runs threads (the threadpool, boto3) can deadlock the child.
+
+    A conversion counts against the bound until its worker is done with it,
+    not until the request stops waiting: a cancelled request whose image is
+    already being converted still occupies that worker. If a worker dies
+    (e.g. killed for running out of memory), the broken pool is dropped and
+    the next conversion starts a new one.
+    """
+
+    def __init__(self, workers: int, queue_size: int, max_pixels: int):
+        self.workers = workers
+        self.queue_size = queue_size
+        self.max_pixels = max_pixels
+        self._executor: Optional[ProcessPoolExecutor] = None
+        # Only touched from the event loop thread, so no lock is needed
+        self._pending = 0
+        self._peak_pending = 0
+        self._completed = 0
+        self._rejected = 0
+        self._run_time_total = 0.0
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=limit_image_pixels,
+                initargs=(self.max_pixels,),
+            )
+        return self._executor
+
+    def _discard_executor(self, executor: ProcessPoolExecutor) -> None:
+        # Another request may already have replaced the broken pool
+        if self._executor is executor:
+            self._executor = None
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    async def convert(self, image_bytes: bytes, width: int, height: int, invert: bool) -> str:
+        if self._pending >= self.workers + self.queue_size:
+            self._rejected += 1
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Too many ASCII conversions in progress. Please try again shortly.",
+                headers={"Retry-After": "1"},
+            )
+
+        loop = asyncio.get_running_loop()
+        executor = self._get_executor()
+        try:
+            job = executor.submit(image_to_ascii, image_bytes, width, height, invert)
+        except BrokenProcessPool:
+            self._discard_executor(executor)
+            executor = self._get_executor()
+            job = executor.submit(image_to_ascii, image_bytes, width, height, invert)
+
+        self._pending += 1
+        self._peak_pending = max(self._peak_pending, self._pending)
+
+        def finished(_: Future) -> None:
+            # Runs on the pool's management thread once the worker is done
+            try:
+                loop.call_soon_threadsafe(self._finish)
+            except RuntimeError:  # event loop already closed at shutdown
+                pass
+
+        job.add_done_callback(finished)
+        started = time.perf_counter()
+        try:
+            result = await asyncio.wrap_future(job)
+        except BrokenProcessPool:
+            self._discard_executor(executor)
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="ASCII conversion worker crashed. Please try again.",
+                headers={"Retry-After": "1"},
+            )
+
+        self._completed += 1
+        self._run_time_total += time.perf_counter() - started
+        return result
+
+    def _finish(self) -> None:
+        self._pending -= 1
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def stats(self) -> dict:
+        completed = self._completed or 1
+        return {
+            "workers": self.workers,
+            "queue_size": self.queue_size,
+            "in_flight": min(self._pending, self.workers),
+            "queued": max(0, self._pending - self.workers),
+            "peak_pending": self._peak_pending,
+            "completed": self._completed,
+            "rejected": self._rejected,
+            "avg_convert_ms": round(self._run_time_total / completed * 1000, 2),
+        }
+
+
+ascii_converter = AsciiConverter(
+    settings.ascii_workers, settings.ascii_queue_size, settings.ascii_max_image_pixels
+)
+
+
+def allowed_url_hosts() -> set:
+    hosts = {host.strip().lower() for host in settings.ascii_url_hosts.split(",") if host.strip()}
+    if storage.R2_PUBLIC_BASE_URL:
+        hosts.add((urlparse(storage.R2_PUBLIC_BASE_URL).hostname or "").lower())
+    return hosts
+
+
+async def fetch_image(url: str) -> bytes:
+    """Download an image from an allowed host, up to ascii_max_image_bytes"""
+    parsed = urlparse(url)
+    # Only hosts we serve portraits from, so this can't be used to probe other servers
+    if parsed.scheme not in ("http", "https") or (parsed.hostname or "").lower() not in allowed_url_hosts():
+        raise HTTPException(status_code=400, detail="Image URL host is not allowed")
+
+    chunks = []
+    size = 0
+    try:
+        # No redirects: they could point anywhere
+        async with get_download_client().stream("GET", url, follow_redirects=False) as response:
+            if response.status_code != 200:
+                raise HTTPException(status_code=502, detail=f"Image download failed with status {response.status_code}")
+            async for chunk in response.aiter_bytes():
+                size += len(chunk)
+                if size > settings.ascii_max_image_bytes:
+                    raise HTTPException(status_code=413, detail="Image is too large")
+                chunks.append(chunk)
+    except httpx.HTTPError as e:
+        raise HTTPException(status_code=502, detail=f"Image download failed: {str(e)}")
+    return b"".join(chunks)
+
+
+async def read_upload(file: UploadFile) -> bytes:
+    data = await file.read(settings.ascii_max_image_bytes + 1)
+    if len(data) > settings.ascii_max_image_bytes:
+        raise HTTPException(status_code=413, detail="Image is too large")
+    return data
+
+
+@router.post("")
+async def convert_image_to_ascii(
+    http_request: Request,
+    file: Optional[UploadFile] = File(None),
+    url: Optional[str] = Form(None, max_length=2000),
+    width: int = Form(ASCII_WIDTH, ge=8, le=400),
+    height: int = Form(ASCII_HEIGHT, ge=4, le=200),
+    invert: bool = Form(False),
+    current_user: CurrentUser = Depends(get_current_user),
+):
+    """
+    Convert an uploaded image (multipart `file`) or an image `url` to ASCII art
+    with Floyd-Steinberg dithering, `width` x `height` characters.
+    Signed-in users only, under the same per-client quotas as the AI routes.
+    """
+    await check_rate_limit(get_client_id(http_request))
+    if (file is None) == (url is None):
+        raise HTTPException(status_code=400, detail="Provide either an image file or an image URL")
+
+    image_bytes = await read_upload(file) if file is not None else await fetch_image(url)
+
+    try:
+        ascii_art = await ascii_converter.convert(image_bytes, width, height, invert)
+    except (UnidentifiedImageError, Image.DecompressionBombError, Image.DecompressionBombWarning):
+        raise HTTPException(status_code=400, detail="Unsupported or oversized image")
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to convert image: {str(e)}")
+
+    return {
+        "success": True,
+        "ascii": ascii_art,
+        "width": width,
+        "height": height,
+    }
@@ -1,9 +1,9 @@
-from datetime import timedelta
 import os
 
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 
 from database.database import get_db, get_settings
 from models.user import User
@@ -16,11 +16,18 @@ from schemas.user import (
     PasswordResetConfirm,
 )
 from utils.auth import (
-    get_password_hash,
-    verify_password,
-    create_access_token,
+    get_password_hash_async,
+    verify_password_async,
+    create_user_access_token,
+    record_token_version,
+    revoke_user_tokens,
     get_current_active_user,
+    CurrentUser,
     create_password_reset_token,
+    find_conflicting_user,
+    find_user_by_email,
+    find_user_by_login,
+    save_user,
     verify_password_reset_token,
 )
 
@@ -28,12 +35,14 @@ router = APIRouter(prefix="/auth", tags=["auth"])
 settings = get_settings()
 
 
+# The password routes are async so bcrypt can be awaited on its own bounded pool
+# (see utils.auth.PasswordHasher); their database work still runs in the threadpool.
 @router.post("/register", response_model=Token, status_code=status.HTTP_201_CREATED)
-def register(user_data: UserCreate, db: Session = Depends(get_db)):
+async def register(user_data: UserCreate, db: Session = Depends(get_db)):
     # Check if user already exists
-    existing_user = db.query(User).filter(
-        (User.email == user_data.email) | (User.username == user_data.username)
-    ).first()
+    existing_user = await run_in_threadpool(
+        find_conflicting_user, db, user_data.email, user_data.username
+    )
 
     if existing_user:
         raise HTTPException(
@@ -42,7 +51,7 @@ def register(user_data: UserCreate, db: Session = Depends(get_db)):
         )
 
     # Create new user
-    hashed_password = get_password_hash(user_data.password)
+    hashed_password = await get_password_hash_async(user_data.password)
     new_user = User(
         email=user_data.email,
         username=user_data.username,
@@ -50,59 +59,47 @@ def register(user_data: UserCreate, db: Session = Depends(get_db)):
         role=user_data.role,
     )
 
-    db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+    await run_in_threadpool(save_user, db, new_user)
+    record_token_version(new_user)
 
     # Return token so user is automatically logged in after registration
-    access_token_expires = timedelta(minutes=settings.access_token_expire_minutes)
-    access_token = create_access_token(
-        data={"sub": str(new_user.id)}, expires_delta=access_token_expires
-    )
+    access_token = create_user_access_token(new_user)
 
     return {"access_token": access_token, "token_type": "bearer"}
 
 
 @router.post("/token", response_model=Token)
-def login_for_access_token(
+async def login_for_access_token(
     form_data: OAuth2PasswordRequestForm = Depends(),
     db: Session = Depends(get_db),
 ):
     # OAuth2 uses username field, but we'll accept both username and email
-    user = db.query(User).filter(
-        (User.username == form_data.username) | (User.email == form_data.username)
-    ).first()
+    user = await run_in_threadpool(find_user_by_login, db, form_data.username)
 
-    if not user or not verify_password(form_data.password, user.hashed_password):
+    if not user or not await verify_password_async(form_data.password, user.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
 
-    access_token_expires = timedelta(minutes=settings.access_token_expire_minutes)
-    access_token = create_access_token(
-        data={"sub": str(user.id)}, expires_delta=access_token_expires
-    )
+    access_token = create_user_access_token(user)
 
     return {"access_token": access_token, "token_type": "bearer"}
 
 
 @router.post("/login", response_model=Token)
-def login(user_credentials: UserLogin, db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.email == user_credentials.email).first()
+async def login(user_credentials: UserLogin, db: Session = Depends(get_db)):
+    user = await run_in_threadpool(find_user_by_email, db, user_credentials.email)
 
-    if not user or not verify_password(user_credentials.password, user.hashed_password):
+    if not user or not await verify_password_async(user_credentials.password, user.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
 
-    access_token_expires = timedelta(minutes=settings.access_token_expire_minutes)
-    access_token = create_access_token(
-        data={"sub": str(user.id)}, expires_delta=access_token_expires
-    )
+    access_token = create_user_access_token(user)
 
     return {"access_token": access_token, "token_type": "bearer"}
 
@@ -116,7 +113,7 @@ def forgot_password(request: PasswordResetRequest, db: Session = Depends(get_db)
     In development (when PRODUCTION env var is not set), the reset token is included
     in the response for convenience. In production, you should email the token instead.
     """
-    user = db.query(User).filter(User.email == request.email).first()
+    user = find_user_by_email(db, request.email)
 
     # Generic response message regardless of whether the user exists
     message = "If an account with that email exists, a password reset link has been sent."
@@ -136,13 +133,13 @@ def forgot_password(request: PasswordResetRequest, db: Session = Depends(get_db)
 
 
 @router.post("/password/reset", response_model=Token)
-def reset_password(data: PasswordResetConfirm, db: Session = Depends(get_db)):
+async def reset_password(data: PasswordResetConfirm, db: Session = Depends(get_db)):
     """
     Reset a user's password using a valid password reset token.
     Returns a fresh access token so the user is immediately logged in.
     """
     user_id = verify_password_reset_token(data.token)
-    user = db.query(User).filter(User.id == user_id).first()
+    user = await run_in_threadpool(lambda: db.query(User).filter(User.id == user_id).first())
 
     if not user:
         # This should be rare because the token was valid, but guard anyway.
@@ -151,22 +148,30 @@ def reset_password(data: PasswordResetConfirm, db: Session = Depends(get_db)):
             detail="Invalid password reset token",
         )
 
-    # Update the user's password
-    user.hashed_password = get_password_hash(data.new_password)
-    db.add(user)
-    db.commit()
+    # Update the user's password and revoke every token issued before the reset
+    user.hashed_password = await get_password_hash_async(data.new_password)
+    revoke_user_tokens(user)
+    await run_in_threadpool(save_user, db, user)
+    record_token_version(user)
 
-    # Issue a new access token
-    access_token_expires = timedelta(minutes=settings.access_token_expire_minutes)
-    access_token = create_access_token(
-        data={"sub": str(user.id)}, expires_delta=access_token_expires
-    )
+    # Issue a new access token (carries the bumped token version)
+    access_token = create_user_access_token(user)
 
     return {"access_token": access_token, "token_type": "bearer"}
 
 
 @router.get("/me", response_model=UserResponse)
-def get_current_user_info(current_user: User = Depends(get_current_active_user)):
-    return current_user
+def get_current_user_info(
+    current_user: CurrentUser = Depends(get_current_active_user),
+    db: Session = Depends(get_db),
+):
+    # The authenticated principal only carries id/role, so load the full profile here
+    user = db.query(User).filter(User.id == current_user.id).first()
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="User not found",
+        )
+    return user
 
 
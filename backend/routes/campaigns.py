@@ -2,18 +2,19 @@ from typing import List
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 from database.database import get_db
-from models.user import User, UserRole
+from models.user import UserRole
 from models.campaign import Campaign
 from models.character import Character
 from schemas.campaign import CampaignCreate, CampaignUpdate, CampaignResponse, CampaignWithCharacters
-from utils.auth import get_current_active_user
+from utils.auth import get_current_active_user, CurrentUser
+from routes.encounters import forget_encounter
 
 router = APIRouter(prefix="/campaigns", tags=["campaigns"])
 
 @router.post("/", response_model=CampaignResponse, status_code=status.HTTP_201_CREATED)
 def create_campaign(
     campaign_data: CampaignCreate,
-    current_user: User = Depends(get_current_active_user),
+    current_user: CurrentUser = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
     # Only DMs can create campaigns
@@ -36,7 +37,7 @@ def create_campaign(
 
 @router.get("/", response_model=List[CampaignResponse])
 def get_campaigns(
-    current_user: User = Depends(get_current_active_user),
+    current_user: CurrentUser = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
     if current_user.role == UserRole.DM:
@@ -53,7 +54,7 @@ def get_campaigns(
 @router.get("/{campaign_id}", response_model=CampaignWithCharacters)
 def get_campaign(
     campaign_id: int,
-    current_user: User = Depends(get_current_active_user),
+    current_user: CurrentUser = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
     campaign = db.query(Campaign).filter(Campaign.id == campaign_id).first()
@@ -83,7 +84,7 @@ def get_campaign(
 def update_campaign(
     campaign_id: int,
     campaign_update: CampaignUpdate,
-    current_user: User = Depends(get_current_active_user),
+    current_user: CurrentUser = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
     campaign = db.query(Campaign).filter(Campaign.id == campaign_id).first()
@@ -113,7 +114,7 @@ def update_campaign(
 @router.delete("/{campaign_id}", status_code=status.HTTP_204_NO_CONTENT)
 def delete_campaign(
     campaign_id: int,
-    current_user: User = Depends(get_current_active_user),
+    current_user: CurrentUser = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
     campaign = db.query(Campaign).filter(Campaign.id == campaign_id).first()
@@ -131,8 +132,10 @@ def delete_campaign(
             detail="Not authorized to delete this campaign"
         )
     
-    db.delete(campaign)
-    db.commit()
+    # Drop the live encounter first; no flush can write it back until the delete commits
+    with forget_encounter(campaign_id):
+        db.delete(campaign)
+        db.commit()
     
     return None
 
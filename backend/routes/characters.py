@@ -2,17 +2,17 @@ from typing import List
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 from database.database import get_db
-from models.user import User, UserRole
+from models.user import UserRole
 from models.character import Character
 from schemas.character import CharacterCreate, CharacterUpdate, CharacterResponse
-from utils.auth import get_current_active_user
+from utils.auth import get_current_active_user, CurrentUser
 
 router = APIRouter(prefix="/characters", tags=["characters"])
 
 @router.post("/", response_model=CharacterResponse, status_code=status.HTTP_201_CREATED)
 def create_character(
     character_data: CharacterCreate,
-    current_user: User = Depends(get_current_active_user),
+    current_user: CurrentUser = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
     new_character = Character(
@@ -28,7 +28,7 @@ def create_character(
 
 @router.get("/", response_model=List[CharacterResponse])
 def get_characters(
-    current_user: User = Depends(get_current_active_user),
+    current_user: CurrentUser = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
     # Players see only their characters
@@ -38,7 +38,7 @@ def get_characters(
 @router.get("/{character_id}", response_model=CharacterResponse)
 def get_character(
     character_id: int,
-    current_user: User = Depends(get_current_active_user),
+    current_user: CurrentUser = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
     character = db.query(Character).filter(Character.id == character_id).first()
@@ -69,7 +69,7 @@ def get_character(
 def update_character(
     character_id: int,
     character_update: CharacterUpdate,
-    current_user: User = Depends(get_current_active_user),
+    current_user: CurrentUser = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
     character = db.query(Character).filter(Character.id == character_id).first()
@@ -100,7 +100,7 @@ def update_character(
 @router.delete("/{character_id}", status_code=status.HTTP_204_NO_CONTENT)
 def delete_character(
     character_id: int,
-    current_user: User = Depends(get_current_active_user),
+    current_user: CurrentUser = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
     character = db.query(Character).filter(Character.id == character_id).first()
@@ -127,7 +127,7 @@ def delete_character(
 def duplicate_character(
     character_id: int,
     new_name: str = None,
-    current_user: User = Depends(get_current_active_user),
+    current_user: CurrentUser = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
     # Get original character
@@ -213,7 +213,7 @@ def duplicate_character(
 @router.get("/{character_id}/export")
 def export_character(
     character_id: int,
-    current_user: User = Depends(get_current_active_user),
+    current_user: CurrentUser = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
     character = db.query(Character).filter(Character.id == character_id).first()
@@ -238,7 +238,7 @@ def export_character(
 @router.post("/import", response_model=CharacterResponse, status_code=status.HTTP_201_CREATED)
 def import_character(
     character_data: CharacterCreate,
-    current_user: User = Depends(get_current_active_user),
+    current_user: CurrentUser = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
     # Create character from imported data
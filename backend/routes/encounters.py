@@ -0,0 +1,465 @@
+"""
+Encounter Routes - Server-side initiative and turn tracking
+
+Live encounter state is kept in memory (one compact, pre-sorted initiative
+list per campaign) so next-turn / damage clicks never wait on the database.
+Changes are marked dirty and written behind to the `encounters` table by a
+periodic background flush (see `write_behind_loop`, started from main.py).
+"""
+import asyncio
+import threading
+from bisect import insort
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from database.database import get_db, SessionLocal
+from models.campaign import Campaign
+from models.character import Character
+from models.encounter import Encounter
+from schemas.encounter import (
+    CombatantCreate,
+    EncounterStart,
+    EncounterResponse,
+    HitPointChange,
+)
+from utils.auth import get_current_active_user, CurrentUser
+
+router = APIRouter(prefix="/encounters", tags=["encounters"])
+
+
+class Combatant:
+    """A single entry in the initiative order."""
+    __slots__ = (
+        "id", "name", "initiative", "dexterity",
+        "hit_points_max", "hit_points_current", "hit_points_temp",
+        "armor_class", "character_id", "is_player", "conditions",
+    )
+
+    def __init__(self, combatant_id: int, data: dict):
+        self.id = combatant_id
+        self.name = data["name"]
+        self.initiative = data["initiative"]
+        self.dexterity = data.get("dexterity", 10)
+        self.hit_points_max = data["hit_points_max"]
+        current = data.get("hit_points_current")
+        self.hit_points_current = self.hit_points_max if current is None else current
+        self.hit_points_temp = data.get("hit_points_temp", 0)
+        self.armor_class = data.get("armor_class", 10)
+        self.character_id = data.get("character_id")
+        self.is_player = data.get("is_player", False)
+        self.conditions = list(data.get("conditions", []))
+
+    def sort_key(self):
+        # Highest initiative first, dexterity breaks ties, then insertion order
+        return (-self.initiative, -self.dexterity, self.id)
+
+    def to_dict(self) -> dict:
+        return {slot: getattr(self, slot) for slot in self.__slots__}
+
+
+class EncounterState:
+    """In-memory initiative order and turn pointer for one campaign."""
+    __slots__ = (
+        "campaign_id", "dm_id", "round", "turn_index",
+        "next_combatant_id", "combatants", "by_id", "lock",
+    )
+
+    def __init__(self, campaign_id: int, dm_id: int):
+        self.campaign_id = campaign_id
+        self.dm_id = dm_id
+        self.round = 1
+        self.turn_index = 0
+        self.next_combatant_id = 1
+        self.combatants: List[Combatant] = []
+        self.by_id: Dict[int, Combatant] = {}
+        self.lock = threading.Lock()
+
+    @classmethod
+    def from_row(cls, campaign: Campaign, row: Encounter) -> "EncounterState":
+        state = cls(campaign.id, campaign.dm_id)
+        state.round = row.round
+        state.turn_index = row.turn_index
+        state.next_combatant_id = row.next_combatant_id
+        # Rows are stored already sorted, so no re-sort is needed on load
+        for data in row.combatants or []:
+            combatant = Combatant(data["id"], data)
+            state.combatants.append(combatant)
+            state.by_id[combatant.id] = combatant
+        return state
+
+    def add(self, data: dict) -> Combatant:
+        combatant = Combatant(self.next_combatant_id, data)
+        self.next_combatant_id += 1
+        insort(self.combatants, combatant, key=Combatant.sort_key)
+        self.by_id[combatant.id] = combatant
+
+        # Keep the pointer on whoever is currently acting
+        if len(self.combatants) > 1 and self.combatants.index(combatant) <= self.turn_index:
+            self.turn_index += 1
+        return combatant
+
+    def remove(self, combatant_id: int) -> None:
+        combatant = self.get(combatant_id)
+        index = self.combatants.index(combatant)
+        del self.combatants[index]
+        del self.by_id[combatant_id]
+
+        if index < self.turn_index:
+            self.turn_index -= 1
+        elif self.turn_index >= len(self.combatants):
+            # Removed the last combatant while it was their turn; wrap to the next round
+            self.turn_index = 0
+            if self.combatants:
+                self.round += 1
+
+    def get(self, combatant_id: int) -> Combatant:
+        combatant = self.by_id.get(combatant_id)
+        if combatant is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Combatant not found"
+            )
+        return combatant
+
+    def next_turn(self) -> None:
+        if not self.combatants:
+            return
+        self.turn_index += 1
+        if self.turn_index >= len(self.combatants):
+            self.turn_index = 0
+            self.round += 1
+
+    def apply_damage(self, combatant_id: int, amount: int) -> Combatant:
+        combatant = self.get(combatant_id)
+        # Temporary hit points absorb damage first
+        absorbed = min(combatant.hit_points_temp, amount)
+        combatant.hit_points_temp -= absorbed
+        combatant.hit_points_current = max(0, combatant.hit_points_current - (amount - absorbed))
+        return combatant
+
+    def heal(self, combatant_id: int, amount: int) -> Combatant:
+        combatant = self.get(combatant_id)
+        combatant.hit_points_current = min(
+            combatant.hit_points_max, combatant.hit_points_current + amount
+        )
+        return combatant
+
+    def snapshot(self) -> dict:
+        """Column values for the `encounters` row."""
+        return {
+            "round": self.round,
+            "turn_index": self.turn_index,
+            "next_combatant_id": self.next_combatant_id,
+            "combatants": [c.to_dict() for c in self.combatants],
+        }
+
+    def to_response(self) -> dict:
+        current = self.combatants[self.turn_index] if self.combatants else None
+        return {
+            "campaign_id": self.campaign_id,
+            "round": self.round,
+            "turn_index": self.turn_index,
+            "current_combatant_id": current.id if current else None,
+            "combatants": [c.to_dict() for c in self.combatants],
+        }
+
+
+# Live encounters keyed by campaign_id, plus the set awaiting write-behind
+_encounters: Dict[int, EncounterState] = {}
+_dirty: set = set()
+_registry_lock = threading.Lock()
+# Serializes flushes against encounter deletion so a flush can't resurrect a row
+_flush_lock = threading.Lock()
+
+
+def _mark_dirty(campaign_id: int) -> None:
+    with _registry_lock:
+        _dirty.add(campaign_id)
+
+
+def _load_state(campaign_id: int, db: Session) -> Optional[EncounterState]:
+    """Return the in-memory encounter, loading it from the database on a miss."""
+    state = _encounters.get(campaign_id)
+    if state is not None:
+        return state
+
+    campaign = db.query(Campaign).filter(Campaign.id == campaign_id).first()
+    if not campaign:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Campaign not found"
+        )
+    if campaign.encounter is None:
+        return None
+
+    with _registry_lock:
+        return _encounters.setdefault(campaign_id, EncounterState.from_row(campaign, campaign.encounter))
+
+
+def _get_state(campaign_id: int, db: Session) -> EncounterState:
+    state = _load_state(campaign_id, db)
+    if state is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="No encounter for this campaign"
+        )
+    return state
+
+
+def _require_dm(state: EncounterState, current_user: CurrentUser) -> None:
+    if state.dm_id != current_user.id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only the campaign DM can run this encounter"
+        )
+
+
+@contextmanager
+def forget_encounter(campaign_id: int):
+    """
+    Drop in-memory state for a campaign and hold off write-behind flushes until
+    the block exits, so the caller can delete the row (or the campaign) without
+    a flush that already snapshotted the encounter writing it back.
+    """
+    with _flush_lock:
+        with _registry_lock:
+            _encounters.pop(campaign_id, None)
+            _dirty.discard(campaign_id)
+        yield
+
+
+def flush_dirty_encounters() -> int:
+    """
+    Write every dirty encounter to the database in a single transaction.
+    Returns the number of encounters written. Runs in a worker thread.
+    """
+    with _flush_lock:
+        with _registry_lock:
+            dirty = list(_dirty)
+            _dirty.clear()
+        if not dirty:
+            return 0
+
+        snapshots = {}
+        for campaign_id in dirty:
+            state = _encounters.get(campaign_id)
+            if state is not None:
+                with state.lock:
+                    snapshots[campaign_id] = state.snapshot()
+
+        db = SessionLocal()
+        try:
+            # Skip campaigns deleted since their state was loaded, so one stale
+            # encounter can't fail the whole batch on the campaign foreign key
+            live = {
+                campaign_id for (campaign_id,) in
+                db.query(Campaign.id).filter(Campaign.id.in_(list(snapshots)))
+            }
+            for campaign_id in set(snapshots) - live:
+                del snapshots[campaign_id]
+                with _registry_lock:
+                    _encounters.pop(campaign_id, None)
+
+            rows = {
+                row.campaign_id: row
+                for row in db.query(Encounter).filter(Encounter.campaign_id.in_(list(snapshots)))
+            }
+            for campaign_id, values in snapshots.items():
+                row = rows.get(campaign_id)
+                if row is None:
+                    row = Encounter(campaign_id=campaign_id)
+                    db.add(row)
+                for field, value in values.items():
+                    setattr(row, field, value)
+            db.commit()
+        except Exception:
+            db.rollback()
+            # Retry on the next tick
+            with _registry_lock:
+                _dirty.update(dirty)
+            raise
+        finally:
+            db.close()
+
+        return len(snapshots)
+
+
+async def write_behind_loop(interval_seconds: float) -> None:
+    """Periodically flush dirty encounters until cancelled."""
+    while True:
+        await asyncio.sleep(interval_seconds)
+        try:
+            await run_in_threadpool(flush_dirty_encounters)
+        except Exception as e:
+            print(f"⚠️  Failed to flush encounters: {e}")
+
+
+@router.post("/{campaign_id}", response_model=EncounterResponse, status_code=status.HTTP_201_CREATED)
+def start_encounter(
+    campaign_id: int,
+    encounter_data: EncounterStart,
+    current_user: CurrentUser = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    campaign = db.query(Campaign).filter(Campaign.id == campaign_id).first()
+
+    if not campaign:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Campaign not found"
+        )
+
+    if campaign.dm_id != current_user.id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only the campaign DM can run this encounter"
+        )
+
+    # Starting replaces any existing encounter for the campaign
+    state = EncounterState(campaign.id, campaign.dm_id)
+    for combatant_data in encounter_data.combatants:
+        state.add(combatant_data.model_dump())
+    state.turn_index = 0
+
+    with _registry_lock:
+        _encounters[campaign_id] = state
+        _dirty.add(campaign_id)
+
+    return state.to_response()
+
+
+@router.get("/{campaign_id}", response_model=EncounterResponse)
+def get_encounter(
+    campaign_id: int,
+    current_user: CurrentUser = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    state = _get_state(campaign_id, db)
+
+    # DM can always view, players can view if they have a character in the campaign
+    if state.dm_id != current_user.id:
+        has_character = db.query(Character).filter(
+            Character.campaign_id == campaign_id,
+            Character.owner_id == current_user.id
+        ).first()
+
+        if not has_character:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Not authorized to access this encounter"
+            )
+
+    with state.lock:
+        return state.to_response()
+
+
+@router.post("/{campaign_id}/combatants", response_model=EncounterResponse, status_code=status.HTTP_201_CREATED)
+def add_combatant(
+    campaign_id: int,
+    combatant_data: CombatantCreate,
+    current_user: CurrentUser = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    state = _get_state(campaign_id, db)
+    _require_dm(state, current_user)
+
+    with state.lock:
+        state.add(combatant_data.model_dump())
+        response = state.to_response()
+    _mark_dirty(campaign_id)
+
+    return response
+
+
+@router.delete("/{campaign_id}/combatants/{combatant_id}", response_model=EncounterResponse)
+def remove_combatant(
+    campaign_id: int,
+    combatant_id: int,
+    current_user: CurrentUser = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    state = _get_state(campaign_id, db)
+    _require_dm(state, current_user)
+
+    with state.lock:
+        state.remove(combatant_id)
+        response = state.to_response()
+    _mark_dirty(campaign_id)
+
+    return response
+
+
+@router.post("/{campaign_id}/next-turn", response_model=EncounterResponse)
+def next_turn(
+    campaign_id: int,
+    current_user: CurrentUser = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    state = _get_state(campaign_id, db)
+    _require_dm(state, current_user)
+
+    with state.lock:
+        state.next_turn()
+        response = state.to_response()
+    _mark_dirty(campaign_id)
+
+    return response
+
+
+@router.post("/{campaign_id}/combatants/{combatant_id}/damage", response_model=EncounterResponse)
+def apply_damage(
+    campaign_id: int,
+    combatant_id: int,
+    change: HitPointChange,
+    current_user: CurrentUser = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    state = _get_state(campaign_id, db)
+    _require_dm(state, current_user)
+
+    with state.lock:
+        state.apply_damage(combatant_id, change.amount)
+        response = state.to_response()
+    _mark_dirty(campaign_id)
+
+    return response
+
+
+@router.post("/{campaign_id}/combatants/{combatant_id}/heal", response_model=EncounterResponse)
+def heal_combatant(
+    campaign_id: int,
+    combatant_id: int,
+    change: HitPointChange,
+    current_user: CurrentUser = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    state = _get_state(campaign_id, db)
+    _require_dm(state, current_user)
+
+    with state.lock:
+        state.heal(combatant_id, change.amount)
+        response = state.to_response()
+    _mark_dirty(campaign_id)
+
+    return response
+
+
+@router.delete("/{campaign_id}", status_code=status.HTTP_204_NO_CONTENT)
+def end_encounter(
+    campaign_id: int,
+    current_user: CurrentUser = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    state = _get_state(campaign_id, db)
+    _require_dm(state, current_user)
+
+    # Ending is rare, so delete the row straight away instead of writing behind
+    with forget_encounter(campaign_id):
+        db.query(Encounter).filter(Encounter.campaign_id == campaign_id).delete()
+        db.commit()
+
+    return None
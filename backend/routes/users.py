@@ -2,17 +2,30 @@ from typing import List
 
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 
 from database.database import get_db
 from models.user import User, UserRole
 from schemas.user import UserCreate, UserResponse, UserUpdate
-from utils.auth import get_current_active_user, get_password_hash
+from utils.auth import (
+    find_conflicting_user,
+    find_user_by_email,
+    find_user_by_username,
+    get_current_active_user,
+    get_password_hash_async,
+    record_token_version,
+    revoke_user_tokens,
+    save_user,
+    token_versions,
+    user_cache,
+    CurrentUser,
+)
 
 
 router = APIRouter(prefix="/users", tags=["users"])
 
 
-def require_dm(current_user: User = Depends(get_current_active_user)) -> User:
+def require_dm(current_user: CurrentUser = Depends(get_current_active_user)) -> CurrentUser:
     """
     Restrict access to Dungeon Masters (DMs).
 
@@ -29,7 +42,7 @@ def require_dm(current_user: User = Depends(get_current_active_user)) -> User:
 @router.get("/", response_model=List[UserResponse])
 def list_users(
     db: Session = Depends(get_db),
-    _: User = Depends(require_dm),
+    _: CurrentUser = Depends(require_dm),
 ) -> List[User]:
     """
     List all users.
@@ -40,20 +53,18 @@ def list_users(
 
 
 @router.post("/", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
-def create_user(
+async def create_user(
     user_data: UserCreate,
     db: Session = Depends(get_db),
-    _: User = Depends(require_dm),
+    _: CurrentUser = Depends(require_dm),
 ) -> User:
     """
     Create a new user as an admin/DM.
 
     This mirrors registration but does not log the user in or return a token.
     """
-    existing_user = (
-        db.query(User)
-        .filter((User.email == user_data.email) | (User.username == user_data.username))
-        .first()
+    existing_user = await run_in_threadpool(
+        find_conflicting_user, db, user_data.email, user_data.username
     )
 
     if existing_user:
@@ -62,7 +73,7 @@ def create_user(
             detail="User with this email or username already exists",
         )
 
-    hashed_password = get_password_hash(user_data.password)
+    hashed_password = await get_password_hash_async(user_data.password)
     new_user = User(
         email=user_data.email,
         username=user_data.username,
@@ -70,9 +81,8 @@ def create_user(
         role=user_data.role,
     )
 
-    db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+    await run_in_threadpool(save_user, db, new_user)
+    record_token_version(new_user)
 
     return new_user
 
@@ -81,7 +91,7 @@ def create_user(
 def get_user_detail(
     user_id: int,
     db: Session = Depends(get_db),
-    _: User = Depends(require_dm),
+    _: CurrentUser = Depends(require_dm),
 ) -> User:
     """
     Get a single user's details.
@@ -96,11 +106,11 @@ def get_user_detail(
 
 
 @router.patch("/{user_id}", response_model=UserResponse)
-def update_user(
+async def update_user(
     user_id: int,
     update_data: UserUpdate,
     db: Session = Depends(get_db),
-    _: User = Depends(require_dm),
+    _: CurrentUser = Depends(require_dm),
 ) -> User:
     """
     Update a user's basic information.
@@ -109,6 +119,20 @@ def update_user(
     - Role can be changed between player and DM.
     - Password can be reset by providing a new password.
     """
+    # Hash on the bounded bcrypt pool first; the rest is plain DB work
+    hashed_password = None
+    if update_data.password:
+        hashed_password = await get_password_hash_async(update_data.password)
+
+    return await run_in_threadpool(_apply_user_update, db, user_id, update_data, hashed_password)
+
+
+def _apply_user_update(
+    db: Session,
+    user_id: int,
+    update_data: UserUpdate,
+    hashed_password: str | None,
+) -> User:
     user = db.query(User).filter(User.id == user_id).first()
     if not user:
         raise HTTPException(
@@ -118,7 +142,7 @@ def update_user(
 
     # Email / username uniqueness checks (if changed)
     if update_data.email and update_data.email != user.email:
-        existing_email = db.query(User).filter(User.email == update_data.email).first()
+        existing_email = find_user_by_email(db, update_data.email)
         if existing_email and existing_email.id != user.id:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -127,9 +151,7 @@ def update_user(
         user.email = update_data.email
 
     if update_data.username and update_data.username != user.username:
-        existing_username = (
-            db.query(User).filter(User.username == update_data.username).first()
-        )
+        existing_username = find_user_by_username(db, update_data.username)
         if existing_username and existing_username.id != user.id:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -137,15 +159,17 @@ def update_user(
             )
         user.username = update_data.username
 
-    if update_data.role is not None:
+    # A role change or password reset revokes the user's existing tokens
+    if update_data.role is not None and update_data.role != user.role:
         user.role = update_data.role
+        revoke_user_tokens(user)
 
-    if update_data.password:
-        user.hashed_password = get_password_hash(update_data.password)
+    if hashed_password:
+        user.hashed_password = hashed_password
+        revoke_user_tokens(user)
 
-    db.add(user)
-    db.commit()
-    db.refresh(user)
+    save_user(db, user, "Another user already uses this email or username")
+    record_token_version(user)
 
     return user
 
@@ -154,7 +178,7 @@ def update_user(
 def delete_user(
     user_id: int,
     db: Session = Depends(get_db),
-    current_dm: User = Depends(require_dm),
+    current_dm: CurrentUser = Depends(require_dm),
 ) -> None:
     """
     Delete a user.
@@ -176,6 +200,8 @@ def delete_user(
 
     db.delete(user)
     db.commit()
+    token_versions.discard(user_id)
+    user_cache.invalidate(user_id)
 
     return None
 
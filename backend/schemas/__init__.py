@@ -1,11 +1,13 @@
 from .user import UserCreate, UserLogin, UserResponse, Token, TokenData
 from .character import CharacterCreate, CharacterUpdate, CharacterResponse
 from .campaign import CampaignCreate, CampaignUpdate, CampaignResponse, CampaignWithCharacters
+from .encounter import CombatantCreate, CombatantResponse, EncounterStart, EncounterResponse
 
 __all__ = [
     "UserCreate", "UserLogin", "UserResponse", "Token", "TokenData",
     "CharacterCreate", "CharacterUpdate", "CharacterResponse",
-    "CampaignCreate", "CampaignUpdate", "CampaignResponse", "CampaignWithCharacters"
+    "CampaignCreate", "CampaignUpdate", "CampaignResponse", "CampaignWithCharacters",
+    "CombatantCreate", "CombatantResponse", "EncounterStart", "EncounterResponse"
 ]
 
 
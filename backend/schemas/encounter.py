@@ -0,0 +1,35 @@
+from pydantic import BaseModel, Field
+from typing import List, Optional
+
+class CombatantBase(BaseModel):
+    name: str = Field(..., min_length=1, max_length=100)
+    initiative: int
+    # Dexterity score breaks initiative ties (higher goes first)
+    dexterity: int = 10
+    hit_points_max: int = Field(..., ge=0)
+    hit_points_current: Optional[int] = None
+    hit_points_temp: int = Field(0, ge=0)
+    armor_class: int = 10
+    character_id: Optional[int] = None
+    is_player: bool = False
+    conditions: List[str] = []
+
+class CombatantCreate(CombatantBase):
+    pass
+
+class CombatantResponse(CombatantBase):
+    id: int
+    hit_points_current: int
+
+class EncounterStart(BaseModel):
+    combatants: List[CombatantCreate] = []
+
+class HitPointChange(BaseModel):
+    amount: int = Field(..., ge=0)
+
+class EncounterResponse(BaseModel):
+    campaign_id: int
+    round: int
+    turn_index: int
+    current_combatant_id: Optional[int] = None
+    combatants: List[CombatantResponse] = []
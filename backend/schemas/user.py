@@ -39,6 +39,8 @@ class Token(BaseModel):
 
 class TokenData(BaseModel):
     user_id: int | None = None
+    role: UserRole | None = None
+    token_version: int = 0
 
 
 class PasswordResetRequest(BaseModel):
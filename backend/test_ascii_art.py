@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Test script for the ASCII art dithering
+Checks that the wavefront-vectorized utils.ascii_art.floyd_steinberg_levels
+gives exactly the same levels as the classic per-pixel Floyd-Steinberg loop,
+on random images of several shapes. No server needed.
+
+Run from the backend directory:
+  python test_ascii_art.py
+"""
+
+import sys
+
+import numpy as np
+
+from utils.ascii_art import ASCII_CHARS, floyd_steinberg_levels
+
+LEVELS = len(ASCII_CHARS)
+
+# (height, width): the default portrait size plus narrow and degenerate shapes
+SHAPES = [(80, 160), (37, 53), (1, 40), (40, 1), (2, 2), (1, 1)]
+
+
+def scalar_levels(pixels, levels):
+    """Row-by-row Floyd-Steinberg in float32, one pixel at a time"""
+    height, width = pixels.shape
+    output = pixels.astype(np.float32).copy()
+    indices = np.zeros((height, width), dtype=np.intp)
+    step = 255 / (levels - 1)
+
+    for y in range(height):
+        for x in range(width):
+            old = output[y, x]
+            level = np.round(old * (levels - 1) / 255)
+            new = np.float32(float(level) * step)
+            error = old - new
+            indices[y, x] = int(level)
+
+            if x + 1 < width:
+                output[y, x + 1] += error * 7 / 16
+            if y + 1 < height:
+                if x > 0:
+                    output[y + 1, x - 1] += error * 3 / 16
+                output[y + 1, x] += error * 5 / 16
+                if x + 1 < width:
+                    output[y + 1, x + 1] += error * 1 / 16
+
+    return np.clip(indices, 0, levels - 1)
+
+
+def test_matches_scalar_loop():
+    """The vectorized dither is bit-for-bit the scalar one"""
+    print("=" * 80)
+    print("🧪 Vectorized vs. scalar Floyd-Steinberg")
+    print("=" * 80)
+
+    failures = []
+    rng = np.random.default_rng(1234)
+    images = [rng.integers(0, 256, shape).astype(np.float32) for shape in SHAPES]
+    # Smooth gradients and flat areas, where dithering has the most error to carry
+    images.append(np.tile(np.linspace(0, 255, 160, dtype=np.float32), (80, 1)))
+    images.append(np.full((20, 30), 127.5, dtype=np.float32))
+    images.append(np.zeros((10, 10), dtype=np.float32))
+    images.append(np.full((10, 10), 255, dtype=np.float32))
+
+    for pixels in images:
+        for levels in (2, 5, LEVELS):
+            expected = scalar_levels(pixels, levels)
+            actual = floyd_steinberg_levels(pixels, levels)
+            differing = int(np.count_nonzero(actual != expected))
+            if actual.shape != expected.shape or differing:
+                failures.append(
+                    f"{pixels.shape} at {levels} levels: {differing} of {expected.size} pixels differ"
+                )
+    print(f"compared {len(images)} images at 2, 5 and {LEVELS} levels")
+    assert not failures, failures
+
+
+if __name__ == '__main__':
+    try:
+        test_matches_scalar_loop()
+        failures = []
+    except AssertionError as error:
+        failures = error.args[0]
+
+    print("\n" + "=" * 80)
+    if failures:
+        for failure in failures:
+            print(f"❌ {failure}")
+        sys.exit(1)
+    print("✅ All ASCII art checks passed")
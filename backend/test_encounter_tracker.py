@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""
+Test script for the in-memory encounter tracker
+Checks initiative ordering and the turn pointer in routes.encounters.EncounterState,
+and the write-behind flush against a throwaway SQLite database. No server needed.
+
+Run from the backend directory:
+  python test_encounter_tracker.py
+"""
+
+import os
+import sys
+import tempfile
+
+# Point the app at a scratch database before anything imports database.database
+_db_dir = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_db_dir, 'encounters.db')}"
+
+from database.database import Base, SessionLocal, engine  # noqa: E402
+import models  # noqa: E402,F401  (registers every table)
+from models.campaign import Campaign  # noqa: E402
+from models.encounter import Encounter  # noqa: E402
+from models.user import User  # noqa: E402
+from routes import encounters  # noqa: E402
+from routes.encounters import EncounterState, flush_dirty_encounters, forget_encounter  # noqa: E402
+
+Base.metadata.create_all(bind=engine)
+
+
+def combatant(name, initiative, dexterity=10, hit_points=10):
+    return {"name": name, "initiative": initiative, "dexterity": dexterity, "hit_points_max": hit_points}
+
+
+def make_campaign(name):
+    db = SessionLocal()
+    try:
+        dm = db.query(User).filter(User.username == "dm").first()
+        if dm is None:
+            dm = User(email="dm@example.com", username="dm", hashed_password="x")
+            db.add(dm)
+            db.flush()
+        campaign = Campaign(name=name, dm_id=dm.id)
+        db.add(campaign)
+        db.commit()
+        return campaign.id, dm.id
+    finally:
+        db.close()
+
+
+def track(campaign_id, dm_id, *entries):
+    state = EncounterState(campaign_id, dm_id)
+    for entry in entries:
+        state.add(entry)
+    state.turn_index = 0
+    with encounters._registry_lock:
+        encounters._encounters[campaign_id] = state
+        encounters._dirty.add(campaign_id)
+    return state
+
+
+def stored_encounter(campaign_id):
+    db = SessionLocal()
+    try:
+        return db.query(Encounter).filter(Encounter.campaign_id == campaign_id).first()
+    finally:
+        db.close()
+
+
+def test_initiative_order():
+    """Combatants stay sorted and the turn pointer follows whoever is acting"""
+    print("=" * 80)
+    print("🧪 Initiative order and turn pointer")
+    print("=" * 80)
+
+    failures = []
+    state = EncounterState(1, 1)
+    state.add(combatant("Goblin", 12, dexterity=14))
+    state.add(combatant("Fighter", 18))
+    state.add(combatant("Wizard", 12, dexterity=16))
+    names = [c.name for c in state.combatants]
+    print(f"order: {names}")
+    if names != ["Fighter", "Wizard", "Goblin"]:
+        failures.append(f"expected initiative then dexterity order, got {names}")
+
+    state.turn_index = 0
+    state.next_turn()  # Wizard acts
+    state.add(combatant("Rogue", 20))  # sorts before the Wizard
+    current = state.combatants[state.turn_index].name
+    if current != "Wizard":
+        failures.append(f"adding ahead of the current turn moved the pointer to {current}")
+
+    state.next_turn()
+    state.next_turn()  # Goblin, the last in order
+    goblin = state.combatants[state.turn_index]
+    state.remove(goblin.id)
+    if (state.turn_index, state.round) != (0, 2):
+        failures.append(f"removing the last combatant on their turn gave turn {state.turn_index}, round {state.round}")
+
+    fighter = next(c for c in state.combatants if c.name == "Fighter")
+    fighter.hit_points_temp = 3
+    state.apply_damage(fighter.id, 5)
+    if (fighter.hit_points_temp, fighter.hit_points_current) != (0, 8):
+        failures.append(f"temp hit points should absorb damage first, got {fighter.hit_points_temp}/{fighter.hit_points_current}")
+    state.heal(fighter.id, 50)
+    if fighter.hit_points_current != fighter.hit_points_max:
+        failures.append("healing should stop at max hit points")
+    assert not failures, failures
+
+
+def test_write_behind_flush():
+    """Dirty encounters are written in one flush, and clean ones are not rewritten"""
+    print("\n" + "=" * 80)
+    print("🧪 Write-behind flush")
+    print("=" * 80)
+
+    failures = []
+    campaign_id, dm_id = make_campaign("Flush")
+    state = track(campaign_id, dm_id, combatant("Goblin", 12), combatant("Fighter", 18))
+
+    written = flush_dirty_encounters()
+    row = stored_encounter(campaign_id)
+    print(f"first flush wrote {written}, stored: {row and [c['name'] for c in row.combatants]}")
+    if written != 1 or row is None or [c["name"] for c in row.combatants] != ["Fighter", "Goblin"]:
+        failures.append("first flush should insert the sorted encounter")
+
+    if flush_dirty_encounters() != 0:
+        failures.append("a flush with nothing dirty should write nothing")
+
+    with state.lock:
+        state.next_turn()
+    encounters._mark_dirty(campaign_id)
+    flush_dirty_encounters()
+    row = stored_encounter(campaign_id)
+    if row is None or row.turn_index != 1:
+        failures.append("next flush should update the stored turn pointer")
+
+    # A fresh process loads the stored row back into the same order
+    with encounters._registry_lock:
+        encounters._encounters.pop(campaign_id, None)
+    db = SessionLocal()
+    try:
+        reloaded = encounters._load_state(campaign_id, db)
+        if [c.name for c in reloaded.combatants] != ["Fighter", "Goblin"] or reloaded.turn_index != 1:
+            failures.append("reloaded encounter does not match what was flushed")
+    finally:
+        db.close()
+    assert not failures, failures
+
+
+def test_deleted_campaign():
+    """Deleting a campaign can't be undone by a pending flush, and doesn't fail other encounters"""
+    print("\n" + "=" * 80)
+    print("🧪 Campaign deletion vs. write-behind")
+    print("=" * 80)
+
+    failures = []
+    doomed_id, dm_id = make_campaign("Doomed")
+    kept_id, _ = make_campaign("Kept")
+    track(doomed_id, dm_id, combatant("Ogre", 8))
+    flush_dirty_encounters()
+
+    # Same order as routes.campaigns.delete_campaign
+    track(doomed_id, dm_id, combatant("Ogre", 8), combatant("Troll", 6))
+    db = SessionLocal()
+    try:
+        with forget_encounter(doomed_id):
+            db.delete(db.get(Campaign, doomed_id))
+            db.commit()
+    finally:
+        db.close()
+    flush_dirty_encounters()
+    if stored_encounter(doomed_id) is not None:
+        failures.append("flush after deleting the campaign wrote its encounter back")
+
+    # State loaded before the delete and still marked dirty is dropped, not inserted
+    stale_id, _ = make_campaign("Stale")
+    track(stale_id, dm_id, combatant("Bandit", 11))
+    track(kept_id, dm_id, combatant("Cleric", 9))
+    db = SessionLocal()
+    try:
+        db.delete(db.get(Campaign, stale_id))
+        db.commit()
+    finally:
+        db.close()
+    written = flush_dirty_encounters()
+    print(f"flush with one deleted campaign wrote {written}")
+    if stored_encounter(stale_id) is not None:
+        failures.append("flush inserted an orphan encounter for a deleted campaign")
+    if stored_encounter(kept_id) is None:
+        failures.append("a deleted campaign in the batch kept other encounters from being written")
+    if stale_id in encounters._encounters:
+        failures.append("in-memory state for a deleted campaign was not dropped")
+    assert not failures, failures
+
+
+if __name__ == '__main__':
+    failures = []
+    for test in (test_initiative_order, test_write_behind_flush, test_deleted_campaign):
+        try:
+            test()
+        except AssertionError as error:
+            failures.extend(error.args[0])
+
+    print("\n" + "=" * 80)
+    if failures:
+        for failure in failures:
+            print(f"❌ {failure}")
+        sys.exit(1)
+    print("✅ All encounter tracker checks passed")
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Test script for narrator prompt size
+Compares the old dict-repr character context with utils.prompts.compact_character
+across typical character builder states. No server or API key needed.
+
+Run from the backend directory:
+  python test_prompt_size.py
+"""
+
+import sys
+
+from utils.prompts import compact_character, estimate_tokens
+
+TOKEN_BUDGET = 60
+
+# The questions that ask the narrator for a comment (aiPromptContext in
+# character-builder-questions.js)
+QUESTIONS = [
+    "player motivation for adventuring",
+    "player physical description",
+    "player social tendencies",
+]
+
+NEW_CHARACTER = {
+    "characterUid": "danddy_1700000000000_abc123def",
+    "name": "", "race": "", "class": "", "background": "", "alignment": "",
+    "baseAbilities": None,
+    "abilities": {"str": 10, "dex": 10, "con": 10, "int": 10, "wis": 10, "cha": 10},
+    "level": 1, "hitPoints": 0, "personalityTrait": "", "backstory": "",
+    "skillProficiencies": [], "toolProficiencies": [], "languages": [],
+    "equipment": [], "backgroundFeature": None,
+    "spellcastingAbility": None, "cantrips": [], "spellsKnown": [],
+    "spellsPrepared": [], "spellSlots": {},
+}
+
+RACE_AND_CLASS = {
+    **NEW_CHARACTER,
+    "race": "Half-Orc", "class": "Wizard", "spellStyle": "destruction", "spellElement": "fire",
+}
+
+WITH_BACKGROUND = {
+    **RACE_AND_CLASS,
+    "name": "Grumbak Ashfist",
+    "background": "Sage", "alignment": "Chaotic Good",
+    "baseAbilities": {"str": 13, "dex": 12, "con": 14, "int": 15, "wis": 10, "cha": 8},
+    "abilities": {"str": 15, "dex": 12, "con": 15, "int": 15, "wis": 10, "cha": 8},
+    "hitPoints": 8,
+    "skillProficiencies": ["Arcana", "History"],
+    "languages": ["Common", "Orc", "Draconic", "Elvish"],
+    "backgroundFeature": {"name": "Researcher", "description": "When you attempt to learn or recall a piece of lore, if you do not know that information, you often know where and from whom you can obtain it."},
+    "spellcastingAbility": "int",
+    "spellSlots": {"1": 2},
+}
+
+COMPLETE = {
+    **WITH_BACKGROUND,
+    "personalityTrait": "I use polysyllabic words that convey the impression of great erudition.",
+    "backstory": "Raised in the shadow of the Ashfist clan's forges, Grumbak surprised everyone by " * 6,
+    "equipment": ["Quarterstaff", "Component pouch", "Scholar's pack", "Spellbook", "Bottle of black ink", "Quill", "Small knife", "Letter from a dead colleague"],
+    "cantrips": ["Fire Bolt", "Prestidigitation", "Mage Hand"],
+    "spellsKnown": ["Burning Hands", "Magic Missile", "Shield", "Detect Magic", "Chromatic Orb", "Sleep"],
+    "spellsPrepared": ["Burning Hands", "Magic Missile", "Shield", "Chromatic Orb"],
+}
+
+STATES = [
+    ("new character", NEW_CHARACTER),
+    ("race + class", RACE_AND_CLASS),
+    ("with background", WITH_BACKGROUND),
+    ("complete", COMPLETE),
+]
+
+
+def test_prompt_sizes():
+    """Compact context stays within budget and is never larger than the dict repr"""
+    print("=" * 80)
+    print("🧪 Narrator prompt size (estimated tokens of character context)")
+    print("=" * 80)
+    print(f"{'state':<18}{'question':<36}{'repr':>8}{'compact':>9}")
+
+    failures = []
+    for state_name, character in STATES:
+        for question in QUESTIONS:
+            old = estimate_tokens(str(character))
+            compact = compact_character(character, question, TOKEN_BUDGET)
+            new = estimate_tokens(compact)
+            print(f"{state_name:<18}{question:<36}{old:>8}{new:>9}")
+            if new > TOKEN_BUDGET:
+                failures.append(f"{state_name} / {question}: {new} tokens > budget {TOKEN_BUDGET}")
+            if new >= old:
+                failures.append(f"{state_name} / {question}: compact ({new}) not smaller than repr ({old})")
+    assert not failures, failures
+
+
+def test_relevant_fields():
+    """Each question keeps the fields it is about and drops the rest"""
+    print("\n" + "=" * 80)
+    print("🧪 Field selection")
+    print("=" * 80)
+
+    failures = []
+    for question in QUESTIONS:
+        print(f"{question}:\n   {compact_character(COMPLETE, question, TOKEN_BUDGET)}")
+
+    social = compact_character(COMPLETE, "player social tendencies", 0)
+    if "personality:" not in social or "spells:" in social:
+        failures.append(f"social question context: {social}")
+    if "nothing chosen yet" != compact_character(NEW_CHARACTER, "player social tendencies", TOKEN_BUDGET):
+        failures.append("empty character should serialize as 'nothing chosen yet'")
+    if "…" not in compact_character(COMPLETE, "player motivation for adventuring", TOKEN_BUDGET):
+        failures.append("long backstory should be truncated to fit the budget")
+    assert not failures, failures
+
+
+if __name__ == '__main__':
+    failures = []
+    for test in (test_prompt_sizes, test_relevant_fields):
+        try:
+            test()
+        except AssertionError as error:
+            failures.extend(error.args[0])
+
+    print("\n" + "=" * 80)
+    if failures:
+        for failure in failures:
+            print(f"❌ {failure}")
+        sys.exit(1)
+    print("✅ All prompt size checks passed")
@@ -0,0 +1,230 @@
+"""
+Response cache for the text-generation AI routes
+
+Identical requests (same character for a backstory, same choice for a narrator
+quip) are answered from memory instead of calling OpenAI again. Entries expire
+after a per-endpoint TTL and the least recently used entry is evicted once the
+cache is full.
+
+An optional SQLite file (AI_CACHE_SQLITE_PATH) backs the memory layer so hot
+entries survive restarts and are shared by every worker on the host. Disk
+reads and writes run on the threadpool; memory hits never leave the event loop.
+"""
+import hashlib
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from starlette.concurrency import run_in_threadpool
+
+
+class CachePolicy:
+    """
+    How one endpoint uses the cache.
+
+    variants == 1 caches a single response per key. variants > 1 keeps up to
+    that many responses per key, generating a new one on each request
+    until the set is full and then picking one at random, so repeated requests
+    still get some variety.
+    """
+
+    __slots__ = ("ttl_seconds", "variants")
+
+    def __init__(self, ttl_seconds: float, variants: int = 1):
+        self.ttl_seconds = ttl_seconds
+        self.variants = variants
+
+
+def _hash_key(namespace: str, fields: Dict[str, Any]) -> str:
+    payload = json.dumps(fields, sort_keys=True, default=str)
+    return f"{namespace}:{hashlib.sha256(payload.encode()).hexdigest()}"
+
+
+def make_key(namespace: str, **fields: Any) -> str:
+    """Stable key for a request: strings are case- and whitespace-normalized."""
+
+    def normalize(value):
+        if isinstance(value, str):
+            return " ".join(value.lower().split())
+        if isinstance(value, dict):
+            return {k: normalize(v) for k, v in value.items()}
+        if isinstance(value, (list, tuple)):
+            return [normalize(v) for v in value]
+        return value
+
+    return _hash_key(namespace, normalize(fields))
+
+
+def exact_key(namespace: str, **fields: Any) -> str:
+    """
+    Key for a request whose strings are used verbatim.
+
+    For free-text fields (chat prompts, image prompts), where a difference in
+    case or formatting can change the answer, so requests must match exactly.
+    """
+    return _hash_key(namespace, fields)
+
+
+class _DiskCache:
+    """SQLite key/value store with expiry; every method is blocking."""
+
+    def __init__(self, path: str, max_entries: int):
+        self.max_entries = max_entries
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(
+            path, timeout=5.0, isolation_level=None, check_same_thread=False
+        )
+        self._lock = threading.Lock()
+        self._writes = 0
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS ai_cache ("
+                " key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS ix_ai_cache_expires_at ON ai_cache (expires_at)"
+            )
+
+    def get(self, key: str, now: float):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM ai_cache WHERE key = ? AND expires_at > ?",
+                (key, now),
+            ).fetchone()
+        if row is None:
+            return None
+        return json.loads(row[0]), row[1]
+
+    def set(self, key: str, value: Any, expires_at: float) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO ai_cache (key, value, expires_at) VALUES (?, ?, ?) "
+                "ON CONFLICT (key) DO UPDATE SET value = excluded.value, expires_at = excluded.expires_at",
+                (key, json.dumps(value), expires_at),
+            )
+            self._writes += 1
+            if self._writes % 100 == 0:
+                self._prune(time.time())
+
+    def _prune(self, now: float) -> None:
+        # Drop expired rows, then the soonest-to-expire ones beyond the cap
+        self._conn.execute("DELETE FROM ai_cache WHERE expires_at <= ?", (now,))
+        self._conn.execute(
+            "DELETE FROM ai_cache WHERE key IN ("
+            " SELECT key FROM ai_cache ORDER BY expires_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,),
+        )
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class ResponseCache:
+    """
+    In-memory TTL + LRU cache with an optional SQLite layer underneath.
+
+    Only touched from the event loop, so the memory layer needs no lock.
+    Values must be JSON-serializable when the disk layer is enabled.
+    """
+
+    def __init__(self, max_entries: int, disk_path: str = "", disk_max_entries: int = 0):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._disk = (
+            _DiskCache(disk_path, disk_max_entries or max_entries * 10) if disk_path else None
+        )
+        self._counters: Dict[str, Dict[str, int]] = {}
+
+    def _count(self, key: str, outcome: str) -> None:
+        namespace = key.split(":", 1)[0]
+        counters = self._counters.setdefault(
+            namespace, {"hits": 0, "misses": 0, "disk_hits": 0}
+        )
+        counters[outcome] += 1
+
+    def _remember(self, key: str, value: Any, expires_at: float) -> None:
+        self._entries[key] = (expires_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def _lookup(self, key: str) -> Optional[Any]:
+        now = time.time()
+        entry = self._entries.get(key)
+        if entry is not None:
+            if entry[0] > now:
+                self._entries.move_to_end(key)
+                return entry[1]
+            del self._entries[key]
+        if self._disk is not None:
+            found = await run_in_threadpool(self._disk.get, key, now)
+            if found is not None:
+                value, expires_at = found
+                self._remember(key, value, expires_at)
+                self._count(key, "disk_hits")
+                return value
+        return None
+
+    async def get(self, key: str) -> Optional[Any]:
+        """Return the cached value for `key`, counting a hit or a miss."""
+        value = await self._lookup(key)
+        self._count(key, "misses" if value is None else "hits")
+        return value
+
+    async def set(self, key: str, value: Any, ttl_seconds: float) -> None:
+        expires_at = time.time() + ttl_seconds
+        self._remember(key, value, expires_at)
+        if self._disk is not None:
+            await run_in_threadpool(self._disk.set, key, value, expires_at)
+
+    async def get_or_create(
+        self,
+        key: str,
+        policy: CachePolicy,
+        produce: Callable[[], Awaitable[Any]],
+    ) -> Any:
+        """
+        Serve `key` according to `policy`, calling `produce()` on a miss.
+
+        Exceptions from `produce()` propagate and nothing is cached.
+        """
+        if policy.variants <= 1:
+            value = await self.get(key)
+            if value is None:
+                value = await produce()
+                await self.set(key, value, policy.ttl_seconds)
+            return value
+
+        variants = await self._lookup(key) or []
+        if len(variants) >= policy.variants:
+            self._count(key, "hits")
+            return random.choice(variants)
+        self._count(key, "misses")
+        value = await produce()
+        # Re-read: concurrent misses may have added variants meanwhile, and
+        # callers coalesced onto one upstream call all return the same value,
+        # which must only take one slot
+        variants = await self._lookup(key) or []
+        if value not in variants and len(variants) < policy.variants:
+            await self.set(key, variants + [value], policy.ttl_seconds)
+        return value
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "disk": self._disk is not None,
+            "endpoints": {name: dict(counters) for name, counters in self._counters.items()},
+        }
+
+    def close(self) -> None:
+        if self._disk is not None:
+            self._disk.close()
@@ -0,0 +1,105 @@
+"""
+Image -> ASCII art conversion with Floyd-Steinberg dithering
+
+Shared by the /api/ascii endpoint (routes/ascii_art.py, which runs it on a
+process pool) and the offline scripts in scripts/. Only depends on NumPy and
+Pillow so the scripts can import it without the rest of the backend.
+
+Floyd-Steinberg pushes each pixel's error to its right neighbour and the three
+pixels below it, so the classic version is a Python loop over every pixel.
+Pixel (y, x) only depends on pixels with a smaller x + 2y, so every pixel on
+the line x + 2y = t can be quantized at once: width + 2 * height vectorized
+steps instead of width * height scalar ones, with the same result.
+"""
+import os
+import warnings
+from io import BytesIO
+from typing import Union
+
+import numpy as np
+from PIL import Image
+
+# From lightest to densest: black pixels become spaces, white pixels '$'
+ASCII_CHARS = '  .`\'",;:Il!i><~+_-?][}{1)(|/\\trjxnuvczXYUJCLQ0OZmwqpdbkha*o#MW&8%B@$'
+ASCII_WIDTH = 160
+ASCII_HEIGHT = 80
+
+_CHARS = np.array(list(ASCII_CHARS))
+
+ImageSource = Union[bytes, str, os.PathLike, Image.Image]
+
+
+def floyd_steinberg_levels(pixels: np.ndarray, levels: int) -> np.ndarray:
+    """
+    Dither a 2-D grayscale array (0-255) down to `levels` gray levels.
+
+    Returns the level index (0 .. levels - 1) of every pixel.
+    """
+    height, width = pixels.shape
+    steps = width + 2 * (height - 1)
+    rows = np.arange(height)
+    cols = np.arange(width)
+    # Sheared copy: wave[t, y] is pixel (y, t - 2y), so each wavefront is one
+    # contiguous row and every neighbour is a fixed offset away. The padding
+    # cells have no error to pass on, so they never affect real pixels.
+    wave = np.zeros((steps + 3, height), dtype=np.float32)
+    wave[cols[None, :] + 2 * rows[:, None], rows[:, None]] = pixels
+    in_image = np.zeros((steps, height), dtype=bool)
+    in_image[cols[None, :] + 2 * rows[:, None], rows[:, None]] = True
+    step = 255 / (levels - 1)
+
+    for t in range(steps):
+        old = wave[t]
+        level = np.round(old * (levels - 1) / 255)
+        new = (level.astype(np.float64) * step).astype(np.float32)
+        error = np.where(in_image[t], old - new, np.float32(0))
+        wave[t] = level
+
+        # Same accumulation order as the scalar loop: a pixel gets the error
+        # from above-right before the error from its left neighbour
+        below = error[:-1]
+        wave[t + 1, 1:] += below * 3 / 16
+        wave[t + 2, 1:] += below * 5 / 16
+        wave[t + 3, 1:] += below * 1 / 16
+        wave[t + 1] += error * 7 / 16
+
+    indices = wave[cols[None, :] + 2 * rows[:, None], rows[:, None]].astype(np.intp)
+    # Error pushed into a pixel can take it slightly past black or white
+    return np.clip(indices, 0, levels - 1)
+
+
+def load_grayscale(image: ImageSource, width: int, height: int) -> np.ndarray:
+    """Open an image (bytes, path or PIL image), resize it and return 0-255 luma as float32."""
+    if isinstance(image, bytes):
+        image = BytesIO(image)
+    img = image if isinstance(image, Image.Image) else Image.open(image)
+    # Palette and 1-bit images resize with nearest-neighbour only; go through RGB(A)
+    if img.mode not in ("L", "LA", "RGB", "RGBA"):
+        img = img.convert("RGBA")
+    img = img.resize((width, height), Image.Resampling.LANCZOS)
+    return np.asarray(img.convert("L"), dtype=np.float32)
+
+
+def pixels_to_ascii(pixels: np.ndarray, invert: bool = False) -> str:
+    """Dither a grayscale array and render it with ASCII_CHARS, one line per row."""
+    indices = floyd_steinberg_levels(pixels, len(ASCII_CHARS))
+    if invert:
+        # Dense characters for dark pixels (for light backgrounds)
+        indices = len(ASCII_CHARS) - 1 - indices
+    return "\n".join("".join(row) for row in _CHARS[indices])
+
+
+def limit_image_pixels(max_pixels: int) -> None:
+    """Refuse to decode images larger than `max_pixels` (decompression bombs)."""
+    Image.MAX_IMAGE_PIXELS = max_pixels
+    warnings.simplefilter("error", Image.DecompressionBombWarning)
+
+
+def image_to_ascii(
+    image: ImageSource,
+    width: int = ASCII_WIDTH,
+    height: int = ASCII_HEIGHT,
+    invert: bool = False,
+) -> str:
+    """Convert an image to width x height ASCII art with Floyd-Steinberg dithering."""
+    return pixels_to_ascii(load_grayscale(image, width, height), invert)
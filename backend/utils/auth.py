@@ -1,3 +1,8 @@
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from typing import Optional
 
@@ -5,24 +10,157 @@ from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
 from passlib.context import CryptContext
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 
-from database.database import get_db, get_settings
-from models.user import User
+from database.database import get_db, get_settings, SessionLocal
+from models.user import User, UserRole, normalize_login
 from schemas.user import TokenData
 
 settings = get_settings()
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+pwd_context = CryptContext(schemes=["bcrypt"], bcrypt__rounds=settings.bcrypt_rounds, deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
 
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+class PasswordHasher:
+    """
+    Runs bcrypt on a dedicated, bounded thread pool.
+
+    A bcrypt call takes ~250 ms of CPU; running it inline in sync handlers ties up
+    one of the shared request threads for that long. Here at most `workers` hashes
+    run at once, up to `queue_size` more wait their turn, and anything beyond that
+    is rejected with a 503 so a login burst can't starve the rest of the API.
+    """
+
+    def __init__(self, workers: int, queue_size: int):
+        self.workers = workers
+        self.queue_size = queue_size
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bcrypt")
+        # Only touched from the event loop thread, so no lock is needed
+        self._pending = 0
+        self._peak_pending = 0
+        self._completed = 0
+        self._rejected = 0
+        self._queue_wait_total = 0.0
+        self._run_time_total = 0.0
+
+    async def _run(self, func, *args):
+        if self._pending >= self.workers + self.queue_size:
+            self._rejected += 1
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Too many sign-in attempts in progress. Please try again shortly.",
+                headers={"Retry-After": "1"},
+            )
+
+        def timed():
+            started = time.perf_counter()
+            return started, func(*args), time.perf_counter() - started
+
+        self._pending += 1
+        self._peak_pending = max(self._peak_pending, self._pending)
+        submitted = time.perf_counter()
+        try:
+            started, result, elapsed = await asyncio.get_running_loop().run_in_executor(self._executor, timed)
+        finally:
+            self._pending -= 1
+
+        self._completed += 1
+        self._queue_wait_total += started - submitted
+        self._run_time_total += elapsed
+        return result
+
+    async def hash(self, password: str) -> str:
+        return await self._run(pwd_context.hash, password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await self._run(pwd_context.verify, plain_password, hashed_password)
+
+    def stats(self) -> dict:
+        completed = self._completed or 1
+        return {
+            "bcrypt_rounds": settings.bcrypt_rounds,
+            "workers": self.workers,
+            "queue_size": self.queue_size,
+            "in_flight": min(self._pending, self.workers),
+            "queued": max(0, self._pending - self.workers),
+            "peak_pending": self._peak_pending,
+            "saturated": self._pending >= self.workers,
+            "completed": self._completed,
+            "rejected": self._rejected,
+            "avg_queue_wait_ms": round(self._queue_wait_total / completed * 1000, 2),
+            "avg_hash_ms": round(self._run_time_total / completed * 1000, 2),
+        }
 
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
 
-def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
+
+password_hasher = PasswordHasher(settings.password_hash_workers, settings.password_hash_queue_size)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """Verify a password on the bounded hashing pool (use from async handlers)."""
+    return await password_hasher.verify(plain_password, hashed_password)
+
+
+async def get_password_hash_async(password: str) -> str:
+    """Hash a password on the bounded hashing pool (use from async handlers)."""
+    return await password_hasher.hash(password)
+
+
+def find_user_by_email(db: Session, email: str) -> Optional[User]:
+    return db.query(User).filter(User.email_normalized == normalize_login(email)).first()
+
+
+def find_user_by_username(db: Session, username: str) -> Optional[User]:
+    return db.query(User).filter(User.username_normalized == normalize_login(username)).first()
+
+
+def find_user_by_login(db: Session, identifier: str) -> Optional[User]:
+    """
+    Resolve a username-or-email login, case-insensitively.
+
+    Each step is a single equality seek on a normalized-column index rather
+    than an OR across both columns. Only identifiers containing "@" can be emails.
+    """
+    if "@" in identifier:
+        user = find_user_by_email(db, identifier)
+        if user:
+            return user
+    return find_user_by_username(db, identifier)
+
+
+def find_conflicting_user(db: Session, email: str, username: str) -> Optional[User]:
+    """Return a user already holding this email or username (ignoring case), if any."""
+    return find_user_by_email(db, email) or find_user_by_username(db, username)
+
+
+def save_user(
+    db: Session,
+    user: User,
+    conflict_detail: str = "User with this email or username already exists",
+) -> User:
+    """
+    Commit a new or changed user.
+
+    The find_* checks before this are only a fast path: the unique indexes on
+    the normalized email/username columns are what stop duplicates, so a
+    concurrent request that loses the race gets the same 400 here.
+    """
+    db.add(user)
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=conflict_detail,
+        )
+    db.refresh(user)
+    return user
 
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
@@ -36,6 +174,19 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     return encoded_jwt
 
 
+def create_user_access_token(user: User) -> str:
+    """
+    Issue a login token for `user`.
+
+    Besides the subject it carries the user's role and token version, so most
+    requests can be authorized from the token alone (see `get_current_user`).
+    """
+    return create_access_token(
+        data={"sub": str(user.id), "role": user.role.value, "ver": user.token_version},
+        expires_delta=timedelta(minutes=settings.access_token_expire_minutes),
+    )
+
+
 def create_password_reset_token(user_id: int, expires_delta: Optional[timedelta] = None) -> str:
     """
     Create a short‑lived JWT specifically for password reset.
@@ -85,7 +236,162 @@ def verify_password_reset_token(token: str) -> int:
         )
 
 
-async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> User:
+class CurrentUser:
+    """
+    The authenticated principal handed to routes.
+
+    Carries only what authorization needs, so it can be served from
+    `user_cache` without loading the full `User` row.
+    """
+    __slots__ = ("id", "role", "token_version")
+
+    def __init__(self, id: int, role: UserRole, token_version: int):
+        self.id = id
+        self.role = role
+        self.token_version = token_version
+
+
+class UserCache:
+    """
+    Small LRU + TTL cache of `user_id -> CurrentUser`.
+
+    Routes that change a user's role or remove a user call `invalidate`.
+    The cache is per process, so with several workers the TTL bounds how long
+    another worker can serve a stale entry.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[int, tuple]" = OrderedDict()
+        # Invalidation happens from sync routes running in worker threads
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, user_id: int) -> Optional[CurrentUser]:
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[user_id]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(user_id)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, user: CurrentUser) -> None:
+        with self._lock:
+            self._entries[user.id] = (time.monotonic() + self.ttl_seconds, user)
+            self._entries.move_to_end(user.id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id: int) -> None:
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+user_cache = UserCache(settings.user_cache_max_entries, settings.user_cache_ttl_seconds)
+
+
+class TokenVersions:
+    """
+    In-memory map of `user_id -> current token_version`.
+
+    A token whose `ver` claim matches the map is accepted without touching the
+    database; bumping a user's version (password reset, role change) revokes
+    their older tokens immediately in this process. Users missing from the map
+    (deleted, or created by another worker) fall back to a database lookup, and
+    the whole map is reloaded periodically so bumps made by other workers
+    propagate within `token_version_refresh_seconds`.
+    """
+
+    def __init__(self):
+        self._versions: dict = {}
+        self._lock = threading.Lock()
+
+    def get(self, user_id: int) -> Optional[int]:
+        return self._versions.get(user_id)
+
+    def set(self, user_id: int, version: int) -> None:
+        with self._lock:
+            self._versions[user_id] = version
+
+    def discard(self, user_id: int) -> None:
+        with self._lock:
+            self._versions.pop(user_id, None)
+
+    def load(self, db: Session) -> int:
+        versions = dict(db.query(User.id, User.token_version).all())
+        with self._lock:
+            # Versions only go up. A bump recorded after the query ran must not be
+            # replaced by the older value, or the revoked token would work again.
+            # Users missing from the query (deleted) are dropped.
+            current = self._versions
+            self._versions = {
+                user_id: max(version, current.get(user_id, version))
+                for user_id, version in versions.items()
+            }
+        return len(versions)
+
+
+token_versions = TokenVersions()
+
+
+def revoke_user_tokens(user: User) -> None:
+    """
+    Invalidate every access token previously issued to `user`.
+    Call before committing; the in-memory map is updated once the bump is visible.
+    """
+    user.token_version = (user.token_version or 0) + 1
+
+
+def record_token_version(user: User) -> None:
+    """Publish a committed user's token version to the in-process caches."""
+    token_versions.set(user.id, user.token_version)
+    user_cache.invalidate(user.id)
+
+
+def refresh_token_versions() -> int:
+    """Reload the token version map from the database. Runs in a worker thread."""
+    db = SessionLocal()
+    try:
+        return token_versions.load(db)
+    finally:
+        db.close()
+
+
+async def token_version_refresh_loop(interval_seconds: float) -> None:
+    """Periodically resync the token version map until cancelled."""
+    while True:
+        await asyncio.sleep(interval_seconds)
+        try:
+            await run_in_threadpool(refresh_token_versions)
+        except Exception as e:
+            print(f"⚠️  Failed to refresh token versions: {e}")
+
+
+def _load_current_user(db: Session, user_id: int) -> Optional[CurrentUser]:
+    row = (
+        db.query(User.id, User.role, User.token_version)
+        .filter(User.id == user_id)
+        .first()
+    )
+    return CurrentUser(*row) if row else None
+
+
+async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> CurrentUser:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -96,17 +402,54 @@ async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = De
         user_id: int = payload.get("sub")
         if user_id is None:
             raise credentials_exception
-        token_data = TokenData(user_id=user_id)
-    except JWTError:
+        token_data = TokenData(
+            user_id=user_id,
+            role=payload.get("role"),
+            token_version=payload.get("ver", 0),
+        )
+    except (JWTError, ValueError):
         raise credentials_exception
 
-    user = db.query(User).filter(User.id == token_data.user_id).first()
+    # Fast path: role and version come from the token, validated against the in-memory map
+    known_version = token_versions.get(token_data.user_id)
+    if token_data.role is not None and known_version is not None:
+        if token_data.token_version != known_version:
+            raise credentials_exception
+        return CurrentUser(token_data.user_id, token_data.role, token_data.token_version)
+
+    # Older tokens without claims, or users this process hasn't seen yet
+    user = user_cache.get(token_data.user_id)
     if user is None:
+        user = await run_in_threadpool(_load_current_user, db, token_data.user_id)
+        if user is None:
+            raise credentials_exception
+        user_cache.put(user)
+        token_versions.set(user.id, user.token_version)
+    if token_data.token_version != user.token_version:
         raise credentials_exception
     return user
 
 
-def get_current_active_user(current_user: User = Depends(get_current_user)) -> User:
+def user_id_from_token(token: str) -> Optional[int]:
+    """
+    Identify the user behind a bearer token without touching the DB.
+
+    For attribution only (e.g. AI rate limits and usage), not authorization:
+    returns None for invalid tokens and for tokens the in-memory version map
+    knows to be revoked.
+    """
+    try:
+        payload = jwt.decode(token, settings.secret_key, algorithms=[settings.algorithm])
+        user_id = int(payload.get("sub"))
+    except (JWTError, TypeError, ValueError):
+        return None
+    known_version = token_versions.get(user_id)
+    if known_version is not None and payload.get("ver", 0) != known_version:
+        return None
+    return user_id
+
+
+def get_current_active_user(current_user: CurrentUser = Depends(get_current_user)) -> CurrentUser:
     return current_user
 
 
@@ -0,0 +1,126 @@
+"""
+Prompt-level cache for generated portraits
+
+The character builder asks for the same race/class portrait prompts over and
+over, and every DALL-E call costs seconds and money. This maps a normalized
+(prompt, size, quality) to the R2 URL of an image already generated for it,
+in the image_cache table, so it survives restarts and is shared by workers.
+The table is capped at `max_entries` rows; the least recently used go first.
+Recency is kept to RECENCY_RESOLUTION: a hit on a row used less than that ago
+writes nothing, so the read-mostly cache doesn't serialize on SQLite writes.
+
+A reroll (see ImageGenerationRequest) skips the shared entry and stores its
+image under a key of the requesting client's own, so it never replaces the
+portrait everyone else gets for that prompt; that client's later requests
+for the prompt get their reroll back.
+"""
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+
+from sqlalchemy.exc import IntegrityError
+
+from database.database import SessionLocal
+from models.image_cache import ImageCacheEntry
+from utils.ai_cache import make_key
+
+# Hits within this long of a row's last_used_at don't update it; they are
+# counted in memory and added to `hits` with the next update
+RECENCY_RESOLUTION = timedelta(minutes=1)
+
+
+def image_cache_key(prompt: str, size: str, quality: str, owner: Optional[str] = None) -> str:
+    """Shared key for a prompt, or with `owner` (a client id) that client's own key for it."""
+    if owner is None:
+        return make_key("image", prompt=prompt, size=size, quality=quality)
+    return make_key("image", prompt=prompt, size=size, quality=quality, owner=owner)
+
+
+class ImagePromptCache:
+    """DB-backed LRU from prompt key to image URL; every method is blocking (use the threadpool)."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._stats = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0, "recency_writes": 0}
+        # key -> hits not yet written to its row
+        self._unwritten_hits: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def get(self, *keys: str) -> Optional[dict]:
+        """The cached image for the first of `keys` that has one (and mark it recently used), or None."""
+        db = SessionLocal()
+        try:
+            entry = next(filter(None, (db.get(ImageCacheEntry, key) for key in keys)), None)
+            if entry is None:
+                self._stats["misses"] += 1
+                return None
+            self._stats["hits"] += 1
+            result = {"url": entry.url, "revised_prompt": entry.revised_prompt}
+            now = datetime.utcnow()
+            with self._lock:
+                hits = self._unwritten_hits.pop(entry.key, 0) + 1
+                if now - entry.last_used_at < RECENCY_RESOLUTION:
+                    self._unwritten_hits[entry.key] = hits
+                    return result
+            # Additive, so hits counted by other workers aren't overwritten
+            entry.hits = ImageCacheEntry.hits + hits
+            entry.last_used_at = now
+            db.commit()
+            self._stats["recency_writes"] += 1
+            return result
+        finally:
+            db.close()
+
+    def put(self, key: str, prompt: str, size: str, quality: str, url: str, revised_prompt: Optional[str]) -> None:
+        """Store (or replace) the image for `key`, then evict beyond the cap."""
+        now = datetime.utcnow()
+        db = SessionLocal()
+        try:
+            entry = db.get(ImageCacheEntry, key)
+            if entry is None:
+                db.add(ImageCacheEntry(
+                    key=key, prompt=prompt, size=size, quality=quality,
+                    url=url, revised_prompt=revised_prompt,
+                    hits=0, created_at=now, last_used_at=now,
+                ))
+            else:
+                entry.url = url
+                entry.revised_prompt = revised_prompt
+                entry.last_used_at = now
+            try:
+                db.commit()
+            except IntegrityError:
+                # Another worker stored the same prompt first; keep theirs
+                db.rollback()
+                return
+            self._stats["stores"] += 1
+            self._evict(db)
+        finally:
+            db.close()
+
+    def _evict(self, db) -> None:
+        excess = db.query(ImageCacheEntry).count() - self.max_entries
+        if excess <= 0:
+            return
+        oldest = [
+            key for (key,) in db.query(ImageCacheEntry.key)
+            .order_by(ImageCacheEntry.last_used_at)
+            .limit(excess)
+        ]
+        evicted = (
+            db.query(ImageCacheEntry)
+            .filter(ImageCacheEntry.key.in_(oldest))
+            .delete(synchronize_session=False)
+        )
+        db.commit()
+        with self._lock:
+            for key in oldest:
+                self._unwritten_hits.pop(key, None)
+        self._stats["evictions"] += evicted
+
+    def stats(self) -> dict:
+        return {"max_entries": self.max_entries, **self._stats}
@@ -0,0 +1,148 @@
+"""
+Pre-generated character name pools
+
+The character builder asks for names on its critical path, and a GPT call takes
+about a second. Instead, each (race, class) pair keeps a pool of names that is
+filled in the background: requests pop names off the pool, and once a pool
+drops below the low watermark a refill task tops it back up.
+
+Only the standard RACES x CLASSES pairs are pooled. Race and class are free
+text from the client, so anything else is answered with a direct call instead
+of growing a new pool (and a background refill) per novel string.
+"""
+import asyncio
+from collections import deque
+from typing import Awaitable, Callable, Deque, Dict, List, Optional, Set, Tuple
+
+# Mirrors RACES / CLASSES in scripts/generate_all_portraits.py. The backend is
+# deployed on its own (rootDir: backend), so it cannot import from scripts/.
+RACES = [
+    "Dwarf", "Elf", "Halfling", "Human",
+    "Dragonborn", "Gnome", "Half-Elf", "Half-Orc", "Tiefling"
+]
+
+CLASSES = [
+    "Barbarian", "Bard", "Cleric", "Druid",
+    "Fighter", "Monk", "Paladin", "Ranger",
+    "Rogue", "Sorcerer", "Warlock", "Wizard"
+]
+
+PoolKey = Tuple[str, str]
+NameGenerator = Callable[[str, str, int], Awaitable[List[str]]]
+
+
+def pool_key(race: str, class_type: str) -> PoolKey:
+    return (" ".join(race.lower().split()), " ".join(class_type.lower().split()))
+
+
+POOLED_KEYS = frozenset(pool_key(race, class_type) for race in RACES for class_type in CLASSES)
+
+
+class NamePools:
+    """
+    Per-(race, class) name pools with asynchronous low-watermark refills.
+
+    Only touched from the event loop. `generate(race, class_type, count)` is
+    the upstream call that produces fresh names.
+    """
+
+    def __init__(
+        self,
+        generate: NameGenerator,
+        target_size: int,
+        low_watermark: int,
+        refill_concurrency: int,
+    ):
+        self.generate = generate
+        self.target_size = target_size
+        self.low_watermark = low_watermark
+        self._pools: Dict[PoolKey, Deque[str]] = {}
+        self._refilling: Set[PoolKey] = set()
+        self._tasks: Set[asyncio.Task] = set()
+        self._refill_slots = asyncio.Semaphore(refill_concurrency)
+        self._stats = {"served": 0, "misses": 0, "unpooled": 0, "refills": 0, "refill_failures": 0}
+
+    def take(self, race: str, class_type: str, count: int) -> Optional[List[str]]:
+        """
+        Pop `count` names from the pool, or return None if it has too few.
+
+        Either way a refill is scheduled when the pool is below the watermark.
+        Pairs outside RACES x CLASSES always return None and are never pooled.
+        """
+        key = pool_key(race, class_type)
+        if key not in POOLED_KEYS:
+            self._stats["unpooled"] += 1
+            return None
+        pool = self._pools.get(key)
+        names = None
+        if pool is not None and len(pool) >= count:
+            names = [pool.popleft() for _ in range(count)]
+            self._stats["served"] += 1
+        else:
+            self._stats["misses"] += 1
+        if pool is None or len(pool) < self.low_watermark:
+            self.schedule_refill(race, class_type)
+        return names
+
+    def add(self, race: str, class_type: str, names: List[str]) -> None:
+        """Add names to a pool, skipping ones it already holds, up to the target size."""
+        key = pool_key(race, class_type)
+        if key not in POOLED_KEYS:
+            return
+        pool = self._pools.setdefault(key, deque())
+        for name in names:
+            if len(pool) >= self.target_size:
+                break
+            if name not in pool:
+                pool.append(name)
+
+    def schedule_refill(self, race: str, class_type: str) -> None:
+        key = pool_key(race, class_type)
+        if key not in POOLED_KEYS or key in self._refilling:
+            return
+        self._refilling.add(key)
+        task = asyncio.create_task(self._refill(key, race, class_type))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _refill(self, key: PoolKey, race: str, class_type: str) -> None:
+        try:
+            async with self._refill_slots:
+                missing = self.target_size - len(self._pools.get(key, ()))
+                if missing <= 0:
+                    return
+                names = await self.generate(race, class_type, missing)
+            self.add(race, class_type, names)
+            self._stats["refills"] += 1
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self._stats["refill_failures"] += 1
+            print(f"⚠️  Name pool refill failed for {race} {class_type}: {e}")
+        finally:
+            self._refilling.discard(key)
+
+    def warm(self) -> None:
+        """
+        Schedule a fill of every RACES x CLASSES pool (bounded by refill_concurrency).
+
+        That is one upstream call per pair (108) in every worker, so it only runs
+        when NAME_POOL_WARM_ON_STARTUP is set; otherwise pools fill lazily on
+        their first request.
+        """
+        for race in RACES:
+            for class_type in CLASSES:
+                self.schedule_refill(race, class_type)
+
+    async def close(self) -> None:
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def stats(self) -> dict:
+        return {
+            "pools": len(self._pools),
+            "names": sum(len(pool) for pool in self._pools.values()),
+            "refilling": len(self._refilling),
+            **self._stats,
+        }
@@ -0,0 +1,61 @@
+"""
+Local narrator comments, used when OpenAI is slow or unavailable
+
+One template list per personality in NARRATOR_PROMPTS (routes/ai.py). A
+template may mention the player's {choice}; the builder shows the comment
+right away instead of waiting on the upstream call.
+"""
+import random
+
+NARRATOR_TEMPLATES = {
+    'deadpan': [
+        'Interesting choice. ( ._. )',
+        "Well, that tracks.",
+        "Bold move. We'll see how that works out.",
+        'Sure. Why not.',
+        '{choice}. Noted. Moving on.',
+        '{choice}, huh. ( ._.) I have no further questions.',
+    ],
+    'enthusiastic': [
+        '{choice}?! YES! This is going to be legendary!',
+        'Oh, I LOVE that! {choice} is such a great pick!',
+        'What a choice! The bards will sing of this one!',
+        '{choice}! Your party is going to be so lucky to have you!',
+    ],
+    'mysterious': [
+        '{choice}... the threads of fate tighten.',
+        'So the path of {choice} opens before you. Others close, quietly.',
+        'Destiny remembers every choice. It will remember this one.',
+        'Hm. {choice}. The stars have seen this pattern before.',
+    ],
+    'grumpy': [
+        '{choice}. Of course. Back in my day we picked sensibly.',
+        'Kids these days. {choice}, really?',
+        "Fine. {choice}. Don't come crying to me later.",
+        "I've seen a hundred adventurers pick that. Most of them are dead.",
+    ],
+    'chaotic': [
+        '{choice}! Ooh, this is going to go SO wrong. I love it.',
+        'Hehehe. {choice}. Chaos approves.',
+        'Excellent. {choice} has exactly the right amount of bad idea in it.',
+        "Sure, {choice}! What's the worst that could happen? (Lots. Lots could happen.)",
+    ],
+    'scholarly': [
+        '{choice}: a well-documented option, with ample precedent in the lore.',
+        'Fascinating. Historically, {choice} has produced some notable adventurers.',
+        'A defensible choice. The rules support {choice} rather elegantly.',
+        'Noted for the record: {choice}. The archives will be updated.',
+    ],
+    'dude': [
+        '{choice}, man. That really ties the party together.',
+        "Yeah, {choice}. That's cool. Just take it easy, dude.",
+        "The Dude abides. And so does {choice}.",
+        "{choice}? That's just, like, a solid choice, man.",
+    ],
+}
+
+
+def local_narrator_comment(narrator_id: str, choice: str) -> str:
+    """A personality-specific comment on `choice`, without calling OpenAI."""
+    templates = NARRATOR_TEMPLATES.get(narrator_id, NARRATOR_TEMPLATES['deadpan'])
+    return random.choice(templates).format(choice=choice.strip())
@@ -0,0 +1,345 @@
+"""
+Background portrait generation jobs
+
+A portrait takes 10-30 seconds (DALL-E, then the R2 re-upload), which is longer
+than some proxies keep a request open. Instead, POST /images/jobs records a
+job in the portrait_jobs table and returns its id at once; a small pool of
+worker tasks runs the jobs, and clients poll GET /jobs/{id} or subscribe to
+GET /jobs/{id}/events.
+
+The table is the source of truth, and several processes (uvicorn workers, or
+old and new instances during a rolling deploy) may share it. Every process
+queues the jobs it finds waiting; the conditional queued -> running update
+decides which one runs each job. A "running" job is only taken back when its
+lease has expired (started_at older than `lease_seconds`), so a job another
+process is still running is never started twice. Jobs a process is running
+when it shuts down are handed back at once.
+"""
+import asyncio
+import uuid
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, List, Optional, Set
+
+from fastapi import HTTPException, status
+from starlette.concurrency import run_in_threadpool
+
+from database.database import SessionLocal
+from models.portrait_job import PortraitJob
+
+TERMINAL_STATES = ("succeeded", "failed", "cancelled")
+
+# run(job) -> {"url": ..., "revised_prompt": ...}; raises on failure
+JobRunner = Callable[[dict], Awaitable[dict]]
+
+
+class JobFailed(Exception):
+    """Raised by a JobRunner with the message to store on the job."""
+
+
+def job_to_dict(job: PortraitJob) -> dict:
+    def iso(value: Optional[datetime]) -> Optional[str]:
+        return value.isoformat() + "Z" if value else None
+
+    return {
+        "id": job.id,
+        "status": job.status,
+        "client_id": job.client_id,
+        "prompt": job.prompt,
+        "size": job.size,
+        "quality": job.quality,
+        "reroll": job.reroll,
+        "url": job.url,
+        "revised_prompt": job.revised_prompt,
+        "error": job.error,
+        "created_at": iso(job.created_at),
+        "started_at": iso(job.started_at),
+        "finished_at": iso(job.finished_at),
+    }
+
+
+class PortraitJobQueue:
+    """
+    Runs portrait jobs on `workers` worker tasks.
+
+    Only touched from the event loop; every DB access goes through the
+    threadpool. Status changes use conditional UPDATEs (e.g. queued ->
+    running only if still queued), so a cancel can't race a worker.
+    """
+
+    def __init__(
+        self,
+        run: JobRunner,
+        workers: int,
+        max_queued: int,
+        retention_days: int,
+        lease_seconds: float = 600.0,
+        poll_seconds: float = 2.0,
+    ):
+        self.run = run
+        self.workers = workers
+        self.max_queued = max_queued
+        self.retention_days = retention_days
+        self.lease_seconds = lease_seconds
+        self.poll_seconds = poll_seconds
+        self._queue: "asyncio.Queue[str]" = asyncio.Queue()
+        # Ids in _queue, so the periodic recovery doesn't queue a job twice
+        self._queued_ids: Set[str] = set()
+        self._workers: List[asyncio.Task] = []
+        self._running: Dict[str, asyncio.Task] = {}
+        # Per-job subscriber queues for GET /jobs/{id}/events
+        self._watchers: Dict[str, Set[asyncio.Queue]] = {}
+        self._stats = {"submitted": 0, "succeeded": 0, "failed": 0, "cancelled": 0, "requeued": 0, "rejected": 0}
+
+    # -- DB helpers (run in the threadpool) -------------------------------
+
+    @staticmethod
+    def _insert(job: PortraitJob) -> dict:
+        db = SessionLocal()
+        try:
+            db.add(job)
+            db.commit()
+            return job_to_dict(job)
+        finally:
+            db.close()
+
+    @staticmethod
+    def _load(job_id: str) -> Optional[dict]:
+        db = SessionLocal()
+        try:
+            job = db.get(PortraitJob, job_id)
+            return job_to_dict(job) if job else None
+        finally:
+            db.close()
+
+    @staticmethod
+    def _transition(job_id: str, from_states: tuple, **values) -> Optional[dict]:
+        """Apply `values` if the job is in one of `from_states`; return the updated job or None."""
+        db = SessionLocal()
+        try:
+            updated = (
+                db.query(PortraitJob)
+                .filter(PortraitJob.id == job_id, PortraitJob.status.in_(from_states))
+                .update(values, synchronize_session=False)
+            )
+            db.commit()
+            if not updated:
+                return None
+            return job_to_dict(db.get(PortraitJob, job_id))
+        finally:
+            db.close()
+
+    def _recover(self, everything: bool) -> List[str]:
+        """
+        Requeue jobs whose lease expired and prune old finished ones.
+
+        Returns the ids waiting to run, oldest first: all of them at startup
+        (`everything`), otherwise only those created more than a lease period
+        ago. That covers the jobs just requeued and ones left queued by a
+        process that went away; fresher ones are still in their process's queue.
+        """
+        now = datetime.utcnow()
+        lease_cutoff = now - timedelta(seconds=self.lease_seconds)
+        db = SessionLocal()
+        try:
+            requeued = (
+                db.query(PortraitJob)
+                .filter(PortraitJob.status == "running", PortraitJob.started_at < lease_cutoff)
+                .update({"status": "queued", "started_at": None}, synchronize_session=False)
+            )
+            if self.retention_days:
+                cutoff = now - timedelta(days=self.retention_days)
+                db.query(PortraitJob).filter(
+                    PortraitJob.status.in_(TERMINAL_STATES), PortraitJob.finished_at < cutoff
+                ).delete(synchronize_session=False)
+            db.commit()
+            self._stats["requeued"] += requeued
+            query = db.query(PortraitJob.id).filter(PortraitJob.status == "queued")
+            if not everything:
+                query = query.filter(PortraitJob.created_at < lease_cutoff)
+            return [job_id for (job_id,) in query.order_by(PortraitJob.created_at)]
+        finally:
+            db.close()
+
+    def _enqueue(self, job_id: str) -> None:
+        if job_id not in self._queued_ids:
+            self._queued_ids.add(job_id)
+            self._queue.put_nowait(job_id)
+
+    async def _recovery_loop(self) -> None:
+        """Periodically pick up jobs orphaned by a process that died."""
+        while True:
+            await asyncio.sleep(self.lease_seconds / 2)
+            try:
+                for job_id in await run_in_threadpool(self._recover, False):
+                    self._enqueue(job_id)
+            except Exception as e:
+                print(f"⚠️  Failed to recover portrait jobs: {e}")
+
+    # -- Public API --------------------------------------------------------
+
+    async def start(self) -> None:
+        for job_id in await run_in_threadpool(self._recover, True):
+            self._enqueue(job_id)
+        if self._queue.qsize():
+            print(f"🔁 Resuming {self._queue.qsize()} portrait job(s)")
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        self._workers.append(asyncio.create_task(self._recovery_loop()))
+
+    async def close(self) -> None:
+        interrupted = list(self._running)
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        # Hand back what we were running so any process can pick it up without
+        # waiting for the lease to expire
+        for job_id in interrupted:
+            try:
+                await run_in_threadpool(
+                    self._transition, job_id, ("running",), status="queued", started_at=None
+                )
+            except Exception as e:
+                print(f"⚠️  Failed to requeue portrait job {job_id}: {e}")
+
+    async def submit(self, client_id: str, prompt: str, size: str, quality: str, reroll: bool = False) -> dict:
+        if self._queue.qsize() >= self.max_queued:
+            self._stats["rejected"] += 1
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Too many portraits are queued. Please try again shortly.",
+                headers={"Retry-After": "10"},
+            )
+        job = PortraitJob(
+            id=uuid.uuid4().hex,
+            status="queued",
+            client_id=client_id,
+            prompt=prompt,
+            size=size,
+            quality=quality,
+            reroll=reroll,
+            created_at=datetime.utcnow(),
+        )
+        data = await run_in_threadpool(self._insert, job)
+        self._enqueue(data["id"])
+        self._stats["submitted"] += 1
+        return data
+
+    async def get(self, job_id: str) -> Optional[dict]:
+        return await run_in_threadpool(self._load, job_id)
+
+    async def cancel(self, job_id: str) -> Optional[dict]:
+        """Cancel a queued or running job; returns the job as it now stands (None if unknown)."""
+        values = {"status": "cancelled", "finished_at": datetime.utcnow()}
+        job = await run_in_threadpool(self._transition, job_id, ("queued",), **values)
+        if job is not None:
+            self._finished(job)
+            return job
+        task = self._running.get(job_id)
+        if task is not None:
+            task.cancel()
+            await asyncio.wait({task})
+            if task.cancelled():
+                # Whichever of us and the worker records it first wins; the other is a no-op
+                job = await run_in_threadpool(self._transition, job_id, ("running",), **values)
+                if job is not None:
+                    self._finished(job)
+                    return job
+        return await self.get(job_id)
+
+    async def watch(self, job_id: str):
+        """
+        Yield the job now and after every status change, until it finishes.
+
+        Changes made in this process arrive at once; the job may be run by
+        another worker process, so the table is also re-read every
+        `poll_seconds` while nothing arrives.
+        """
+        updates: asyncio.Queue = asyncio.Queue()
+        self._watchers.setdefault(job_id, set()).add(updates)
+        try:
+            job = await self.get(job_id)
+            while job is not None:
+                yield job
+                if job["status"] in TERMINAL_STATES:
+                    return
+                previous = job
+                while job == previous:
+                    try:
+                        job = await asyncio.wait_for(updates.get(), self.poll_seconds)
+                    except asyncio.TimeoutError:
+                        job = await self.get(job_id)
+                        if job is None:
+                            return
+        finally:
+            watchers = self._watchers.get(job_id)
+            if watchers is not None:
+                watchers.discard(updates)
+                if not watchers:
+                    del self._watchers[job_id]
+
+    def _publish(self, job: dict) -> None:
+        for updates in self._watchers.get(job["id"], ()):
+            updates.put_nowait(job)
+
+    def _finished(self, job: dict) -> None:
+        self._stats[job["status"]] += 1
+        self._publish(job)
+
+    # -- Workers -----------------------------------------------------------
+
+    async def _worker(self) -> None:
+        while True:
+            job_id = await self._queue.get()
+            self._queued_ids.discard(job_id)
+            try:
+                await self._run_one(job_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"⚠️  Portrait job {job_id} crashed the worker step: {e}")
+
+    async def _run_one(self, job_id: str) -> None:
+        job = await run_in_threadpool(
+            self._transition, job_id, ("queued",), status="running", started_at=datetime.utcnow()
+        )
+        if job is None:
+            # Cancelled while it waited in the queue
+            return
+        self._publish(job)
+
+        task = asyncio.create_task(self.run(job))
+        self._running[job_id] = task
+        try:
+            # wait() rather than await: a cancelled job must not cancel this worker
+            await asyncio.wait({task})
+        except asyncio.CancelledError:
+            # Shutting down: close() hands the job back to the queue
+            task.cancel()
+            raise
+        finally:
+            self._running.pop(job_id, None)
+
+        finished_at = datetime.utcnow()
+        if task.cancelled():
+            values = {"status": "cancelled"}
+        elif task.exception() is not None:
+            error = task.exception()
+            message = str(error) if isinstance(error, JobFailed) else f"Failed to generate image: {error}"
+            values = {"status": "failed", "error": message}
+        else:
+            values = {"status": "succeeded", **task.result()}
+        job = await run_in_threadpool(
+            self._transition, job_id, ("running",), finished_at=finished_at, **values
+        )
+        if job is not None:
+            self._finished(job)
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "queued": self._queue.qsize(),
+            "running": len(self._running),
+            "max_queued": self.max_queued,
+            "watchers": sum(len(watchers) for watchers in self._watchers.values()),
+            **self._stats,
+        }
@@ -0,0 +1,136 @@
+"""
+Compact prompt construction for the AI routes
+
+The character builder sends its whole state with every narrator call. Dumping
+that dict into the prompt costs tokens (and upstream latency) for fields the
+narrator never uses, so only the fields relevant to the question are kept, in
+a short "label: value" form, up to a token budget.
+"""
+import re
+from typing import Any, Dict, List, Optional
+
+# Rough OpenAI tokenizer ratio for English text
+CHARS_PER_TOKEN = 4
+
+# Builder state keys (camelCase, see character-builder-state.js) -> prompt labels
+FIELD_LABELS = {
+    "name": "name",
+    "race": "race",
+    "class": "class",
+    "level": "level",
+    "background": "background",
+    "alignment": "alignment",
+    "personalityTrait": "personality",
+    "backstory": "backstory",
+    "abilities": "abilities",
+    "skillProficiencies": "skills",
+    "toolProficiencies": "tools",
+    "languages": "languages",
+    "equipment": "equipment",
+    "spellStyle": "spell style",
+    "spellElement": "element",
+    "cantrips": "cantrips",
+    "spellsKnown": "spells",
+}
+
+# Always useful to the narrator, in priority order
+CORE_FIELDS = ("name", "race", "class")
+
+# Question keywords -> extra fields worth mentioning, in priority order
+QUESTION_FIELDS = [
+    (("motivation", "adventur", "goal"), ("background", "alignment", "personalityTrait", "backstory")),
+    (("physical", "appearance", "look"), ("abilities",)),
+    (("social", "personality"), ("personalityTrait", "alignment", "background", "languages")),
+    (("spell", "magic", "element"), ("spellStyle", "spellElement", "cantrips", "spellsKnown")),
+    (("background",), ("background", "skillProficiencies", "toolProficiencies")),
+    (("alignment", "moral"), ("alignment", "personalityTrait")),
+    (("skill", "proficien"), ("skillProficiencies", "toolProficiencies")),
+    (("equipment", "gear", "weapon"), ("equipment",)),
+    (("abilit", "stat", "score"), ("abilities",)),
+]
+DEFAULT_FIELDS = ("background", "alignment")
+
+MAX_LIST_ITEMS = 4
+MIN_TRUNCATED_CHARS = 12
+DEFAULT_ABILITY_SCORE = 10
+
+
+def estimate_tokens(text: str) -> int:
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def relevant_fields(question: str) -> List[str]:
+    """CORE_FIELDS plus the fields the question is about (DEFAULT_FIELDS if none match)."""
+    question = question.lower()
+    extra = [
+        field
+        for keywords, fields in QUESTION_FIELDS
+        if any(keyword in question for keyword in keywords)
+        for field in fields
+    ]
+    return list(dict.fromkeys([*CORE_FIELDS, *(extra or DEFAULT_FIELDS)]))
+
+
+def _format_item(item: Any) -> str:
+    if isinstance(item, dict):
+        item = item.get("name") or item.get("text") or ""
+    return " ".join(str(item).split())
+
+
+def format_value(field: str, value: Any) -> Optional[str]:
+    """One field as short text, or None if it is empty / still at its default."""
+    if value is None or value == "" or isinstance(value, bool):
+        return None
+    if field == "abilities" and isinstance(value, dict):
+        # Untouched scores are all 10 and tell the narrator nothing
+        if all(score == DEFAULT_ABILITY_SCORE for score in value.values()):
+            return None
+        return " ".join(f"{key.upper()} {score}" for key, score in value.items())
+    if isinstance(value, (list, tuple)):
+        items = [text for text in map(_format_item, value) if text]
+        if not items:
+            return None
+        text = ", ".join(items[:MAX_LIST_ITEMS])
+        if len(items) > MAX_LIST_ITEMS:
+            text += f" +{len(items) - MAX_LIST_ITEMS} more"
+        return text
+    if isinstance(value, dict):
+        return _format_item(value) or None
+    return " ".join(str(value).split()) or None
+
+
+def truncate(text: str, max_chars: int) -> str:
+    if len(text) <= max_chars:
+        return text
+    # Cut on a word boundary where possible
+    cut = text[:max_chars - 1]
+    cut = re.sub(r"\s+\S*$", "", cut) or cut
+    return cut.rstrip(" ,;") + "…"
+
+
+def compact_character(character: Dict[str, Any], question: str, token_budget: int) -> str:
+    """
+    Summarize the builder state for a narrator prompt.
+
+    Fields are added in priority order until `token_budget` (estimated) tokens
+    are used; the field that crosses the budget is truncated if enough of it
+    fits, and everything after it is dropped. A budget of 0 means no limit.
+    """
+    parts: List[str] = []
+    used = 0
+    for field in relevant_fields(question):
+        text = format_value(field, character.get(field))
+        if text is None:
+            continue
+        label = FIELD_LABELS.get(field, field)
+        part = f"{label}: {text}"
+        # +1 for the "; " separator
+        cost = estimate_tokens(part) + 1
+        if token_budget and used + cost > token_budget:
+            room = (token_budget - used - 1) * CHARS_PER_TOKEN - len(label) - 2
+            if room >= MIN_TRUNCATED_CHARS:
+                parts.append(f"{label}: {truncate(text, room)}")
+            break
+        parts.append(part)
+        used += cost
+    return "; ".join(parts) or "nothing chosen yet"
@@ -0,0 +1,252 @@
+"""
+Rate limiting for the AI proxy routes
+
+Each client gets two fixed-window counters (current minute and current day),
+so a check is O(1) time and constant space per client no matter how many
+requests it has made. Clients idle for longer than a day window are evicted
+by a periodic sweep so state tracks active clients, not every IP ever seen.
+
+Backends (selected with the RATE_LIMIT_BACKEND setting):
+- "memory": counters live in the process. Fastest, but every uvicorn worker
+  keeps its own copy, so N workers effectively allow N times the quota.
+- "sqlite": counters live in a small SQLite file shared by all workers on
+  the host; each check is a single atomic upsert.
+"""
+import os
+import sqlite3
+from abc import ABC, abstractmethod
+import threading
+import time
+from typing import Dict, Optional
+
+MINUTE = 60
+DAY = 24 * 60 * 60
+
+
+class _ClientWindow:
+    __slots__ = ("minute_window", "minute_count", "day_window", "day_count", "last_seen")
+
+    def __init__(self, minute_window: int, day_window: int):
+        self.minute_window = minute_window
+        self.minute_count = 0
+        self.day_window = day_window
+        self.day_count = 0
+        self.last_seen = 0.0
+
+
+class RateLimitBackend(ABC):
+    """
+    Interface for per-client minute and day quotas.
+
+    Implementations count a request only when it is allowed, and must make the
+    check-and-increment atomic for every process that shares their state.
+    """
+
+    name = "base"
+    # True when hit() does I/O and should be kept off the event loop
+    blocking = False
+
+    def __init__(self, per_minute: int, per_day: int, sweep_interval: float = 300.0):
+        self.per_minute = per_minute
+        self.per_day = per_day
+        self.sweep_interval = sweep_interval
+        self._next_sweep = time.time() + sweep_interval
+
+    @abstractmethod
+    def hit(self, client_id: str, now: Optional[float] = None) -> Optional[str]:
+        """
+        Record a request for `client_id` if it is within quota.
+
+        Returns None when allowed, otherwise the exceeded period ("minute" or
+        "day"). Rejected requests are not counted.
+        """
+
+    @abstractmethod
+    def sweep(self, now: Optional[float] = None) -> int:
+        """Evict clients whose day window has expired. Returns the number evicted."""
+
+    @abstractmethod
+    def tracked_clients(self) -> int:
+        """Number of clients currently holding counters."""
+
+    def close(self) -> None:
+        pass
+
+    def stats(self) -> dict:
+        return {
+            "backend": self.name,
+            "tracked_clients": self.tracked_clients(),
+            "max_per_minute": self.per_minute,
+            "max_per_day": self.per_day,
+        }
+
+
+class MemoryRateLimiter(RateLimitBackend):
+    """
+    Fixed-window counters in a dict, private to this process.
+
+    Not thread-safe: call it from the event loop (the AI routes are async).
+    """
+
+    name = "memory"
+
+    def __init__(self, per_minute: int, per_day: int, sweep_interval: float = 300.0):
+        super().__init__(per_minute, per_day, sweep_interval)
+        self._clients: Dict[str, _ClientWindow] = {}
+
+    def hit(self, client_id: str, now: Optional[float] = None) -> Optional[str]:
+        now = time.time() if now is None else now
+        if now >= self._next_sweep:
+            self.sweep(now)
+
+        minute_window = int(now // MINUTE)
+        day_window = int(now // DAY)
+
+        entry = self._clients.get(client_id)
+        if entry is None:
+            entry = self._clients[client_id] = _ClientWindow(minute_window, day_window)
+        if entry.minute_window != minute_window:
+            entry.minute_window = minute_window
+            entry.minute_count = 0
+        if entry.day_window != day_window:
+            entry.day_window = day_window
+            entry.day_count = 0
+        entry.last_seen = now
+
+        if entry.minute_count >= self.per_minute:
+            return "minute"
+        if entry.day_count >= self.per_day:
+            return "day"
+
+        entry.minute_count += 1
+        entry.day_count += 1
+        return None
+
+    def sweep(self, now: Optional[float] = None) -> int:
+        now = time.time() if now is None else now
+        self._next_sweep = now + self.sweep_interval
+        day_window = int(now // DAY)
+        idle = [
+            client_id for client_id, entry in self._clients.items()
+            if entry.day_window != day_window
+        ]
+        for client_id in idle:
+            del self._clients[client_id]
+        return len(idle)
+
+    def tracked_clients(self) -> int:
+        return len(self._clients)
+
+
+class SQLiteRateLimiter(RateLimitBackend):
+    """
+    Fixed-window counters in a SQLite file shared by every worker on the host.
+
+    A check is one INSERT ... ON CONFLICT DO UPDATE statement whose WHERE
+    clause refuses the increment once a quota is reached, so concurrent
+    workers can never push a client past its limit. WAL mode keeps readers
+    and the single writer from blocking each other; each call holds the write
+    lock for well under a millisecond.
+    """
+
+    name = "sqlite"
+    blocking = True
+
+    _SCHEMA = """
+        CREATE TABLE IF NOT EXISTS rate_limits (
+            client_id TEXT PRIMARY KEY,
+            minute_window INTEGER NOT NULL,
+            minute_count INTEGER NOT NULL,
+            day_window INTEGER NOT NULL,
+            day_count INTEGER NOT NULL
+        )
+    """
+
+    # Starts a new window at 1, otherwise increments. The WHERE clause makes
+    # the update a no-op (no row returned) when the request is over quota.
+    _HIT = """
+        INSERT INTO rate_limits (client_id, minute_window, minute_count, day_window, day_count)
+        VALUES (:client_id, :minute_window, 1, :day_window, 1)
+        ON CONFLICT (client_id) DO UPDATE SET
+            minute_count = CASE WHEN minute_window = excluded.minute_window
+                                THEN minute_count + 1 ELSE 1 END,
+            minute_window = excluded.minute_window,
+            day_count = CASE WHEN day_window = excluded.day_window
+                             THEN day_count + 1 ELSE 1 END,
+            day_window = excluded.day_window
+        WHERE NOT (minute_window = excluded.minute_window AND minute_count >= :per_minute)
+          AND NOT (day_window = excluded.day_window AND day_count >= :per_day)
+        RETURNING minute_count
+    """
+
+    def __init__(self, per_minute: int, per_day: int, path: str, sweep_interval: float = 300.0):
+        super().__init__(per_minute, per_day, sweep_interval)
+        self.path = path
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        # One connection per process, shared by the threads that may call it
+        self._conn = sqlite3.connect(
+            path, timeout=5.0, isolation_level=None, check_same_thread=False
+        )
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(self._SCHEMA)
+
+    def hit(self, client_id: str, now: Optional[float] = None) -> Optional[str]:
+        now = time.time() if now is None else now
+        if now >= self._next_sweep:
+            self.sweep(now)
+
+        minute_window = int(now // MINUTE)
+        day_window = int(now // DAY)
+        params = {
+            "client_id": client_id,
+            "minute_window": minute_window,
+            "day_window": day_window,
+            "per_minute": self.per_minute,
+            "per_day": self.per_day,
+        }
+        with self._lock:
+            if self._conn.execute(self._HIT, params).fetchone() is not None:
+                return None
+            row = self._conn.execute(
+                "SELECT minute_window, minute_count FROM rate_limits WHERE client_id = ?",
+                (client_id,),
+            ).fetchone()
+
+        if row and row[0] == minute_window and row[1] >= self.per_minute:
+            return "minute"
+        return "day"
+
+    def sweep(self, now: Optional[float] = None) -> int:
+        now = time.time() if now is None else now
+        self._next_sweep = now + self.sweep_interval
+        with self._lock:
+            cursor = self._conn.execute(
+                "DELETE FROM rate_limits WHERE day_window < ?", (int(now // DAY),)
+            )
+        return cursor.rowcount
+
+    def tracked_clients(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM rate_limits").fetchone()[0]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+def create_rate_limiter(settings) -> RateLimitBackend:
+    """Build the backend named by `settings.rate_limit_backend`."""
+    per_minute = settings.max_requests_per_user_per_minute
+    per_day = settings.max_requests_per_user_per_day
+    backend = settings.rate_limit_backend.lower()
+    if backend == "memory":
+        return MemoryRateLimiter(per_minute, per_day)
+    if backend == "sqlite":
+        return SQLiteRateLimiter(per_minute, per_day, settings.rate_limit_sqlite_path)
+    raise ValueError(
+        f"Unknown RATE_LIMIT_BACKEND {settings.rate_limit_backend!r} (expected 'memory' or 'sqlite')"
+    )
@@ -0,0 +1,297 @@
+"""
+Cloudflare R2 storage for generated portraits (optional)
+
+R2 speaks the S3 API, so this wraps a single boto3 client that is built once
+per process. boto3 calls are blocking, so uploads run on a small dedicated
+thread pool instead of the event loop.
+
+Portraits are stored under content-addressed keys (the SHA-256 of the image),
+so regenerations and retries that produce an identical image reuse the object
+that is already in the bucket instead of storing another copy.
+"""
+import asyncio
+import hashlib
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from functools import lru_cache, partial
+from tempfile import SpooledTemporaryFile
+from typing import AsyncIterator, BinaryIO, Tuple
+
+import boto3
+from botocore.config import Config as BotoConfig
+from botocore.exceptions import ClientError
+from starlette.concurrency import run_in_threadpool
+
+from database.database import get_settings
+
+settings = get_settings()
+
+# Cloudflare R2 configuration (optional)
+R2_ACCOUNT_ID = settings.r2_account_id
+R2_ACCESS_KEY_ID = settings.r2_access_key_id
+R2_SECRET_ACCESS_KEY = settings.r2_secret_access_key
+R2_BUCKET_NAME = settings.r2_bucket_name
+R2_PUBLIC_BASE_URL = settings.r2_public_base_url
+R2_ENDPOINT_URL = settings.r2_endpoint_url or (
+    f"https://{R2_ACCOUNT_ID}.r2.cloudflarestorage.com" if R2_ACCOUNT_ID else ""
+)
+
+# Light debug to confirm whether R2 looks configured (does NOT print secrets).
+print(
+    "☁️  R2 config summary:",
+    {
+        "has_account_id": bool(R2_ACCOUNT_ID),
+        "endpoint_override": bool(settings.r2_endpoint_url),
+        "has_access_key": bool(R2_ACCESS_KEY_ID),
+        "has_secret_key": bool(R2_SECRET_ACCESS_KEY),
+        "bucket_name": R2_BUCKET_NAME or "(empty)",
+        "public_base_url": R2_PUBLIC_BASE_URL or "(empty)",
+    },
+)
+
+# S3 multipart parts must be at least 5 MiB (except the last one), so this is
+# also the most image data a single streamed upload holds in memory at once.
+# DALL-E PNGs (~3 MB) are below it, so each one is still fully buffered and
+# sent with one put_object; streaming only changes anything for larger bodies.
+UPLOAD_PART_SIZE = 5 * 1024 * 1024
+# Worst case per content-addressed upload: the in-memory spool plus the part buffer
+UPLOAD_MEMORY_PER_UPLOAD = 2 * UPLOAD_PART_SIZE
+
+# Process-wide cap on buffered image data: uploads past it wait for a slot
+# before reading their stream, so memory stays bounded however many run at once
+_upload_memory_slots = max(1, settings.r2_upload_memory_budget_bytes // UPLOAD_MEMORY_PER_UPLOAD)
+_upload_memory = asyncio.Semaphore(_upload_memory_slots)
+
+# Blocking boto3 calls run here; the worker count bounds concurrent uploads
+_upload_executor = ThreadPoolExecutor(
+    max_workers=settings.r2_upload_workers, thread_name_prefix="r2-upload"
+)
+
+_upload_stats = {
+    "uploads": 0,
+    "failures": 0,
+    "dedup_hits": 0,
+    "dedup_bytes_saved": 0,
+    "buffered_uploads": 0,
+    "peak_buffered_uploads": 0,
+    "total_ms": 0.0,
+    "max_ms": 0.0,
+    "last_ms": 0.0,
+}
+
+
+@lru_cache()
+def get_r2_client():
+    """
+    Return the process-wide S3-compatible client for Cloudflare R2.
+    Returns None when R2 is not configured so callers can gracefully fall back.
+
+    Building a client loads botocore's service data and creates a connection
+    pool, so it is done once and cached (boto3 clients are thread-safe).
+    """
+    if not (R2_ENDPOINT_URL and R2_ACCESS_KEY_ID and R2_SECRET_ACCESS_KEY and R2_BUCKET_NAME):
+        return None
+
+    return boto3.client(
+        "s3",
+        endpoint_url=R2_ENDPOINT_URL,
+        aws_access_key_id=R2_ACCESS_KEY_ID,
+        aws_secret_access_key=R2_SECRET_ACCESS_KEY,
+        region_name="auto",
+        config=BotoConfig(
+            max_pool_connections=settings.r2_upload_workers,
+            # Bucket in the path, so an endpoint override can be a plain host:port
+            s3={"addressing_style": "path"},
+        ),
+    )
+
+
+def public_url(key: str) -> str:
+    """Public URL for an object key in the portrait bucket."""
+    # Prefer explicit public base URL when provided (recommended for R2 dev/public buckets),
+    # otherwise fall back to the S3-style endpoint.
+    if R2_PUBLIC_BASE_URL:
+        base = R2_PUBLIC_BASE_URL.rstrip("/")
+        return f"{base}/{key}"
+    return f"{R2_ENDPOINT_URL.rstrip('/')}/{R2_BUCKET_NAME}/{key}"
+
+
+async def run_in_upload_pool(func, *args, **kwargs):
+    """Run a blocking boto3 call on the bounded upload pool."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_upload_executor, partial(func, *args, **kwargs))
+
+
+def record_upload(elapsed_ms: float, ok: bool = True) -> None:
+    if not ok:
+        _upload_stats["failures"] += 1
+        return
+    _upload_stats["uploads"] += 1
+    _upload_stats["total_ms"] += elapsed_ms
+    _upload_stats["last_ms"] = elapsed_ms
+    _upload_stats["max_ms"] = max(_upload_stats["max_ms"], elapsed_ms)
+
+
+@asynccontextmanager
+async def _memory_slot():
+    """Hold one of the process-wide upload memory slots."""
+    async with _upload_memory:
+        _upload_stats["buffered_uploads"] += 1
+        _upload_stats["peak_buffered_uploads"] = max(
+            _upload_stats["peak_buffered_uploads"], _upload_stats["buffered_uploads"]
+        )
+        try:
+            yield
+        finally:
+            _upload_stats["buffered_uploads"] -= 1
+
+
+async def _upload_stream(key: str, chunks: AsyncIterator[bytes], content_type: str) -> float:
+    """
+    Upload an async byte stream under `key` using a fixed-size buffer.
+
+    Bodies that fit in one part go up with a single put_object, so anything
+    under UPLOAD_PART_SIZE (every DALL-E portrait) is buffered whole, as
+    before; larger ones become a multipart upload, sending each part as soon
+    as it is full. Memory per upload is bounded by UPLOAD_PART_SIZE plus one
+    chunk; the caller holds a process-wide memory slot to bound it across
+    uploads. Returns the total upload latency in milliseconds.
+    """
+    client = get_r2_client()
+    buffer = bytearray()
+    upload_id = None
+    parts = []
+    upload_seconds = 0.0
+
+    async def timed(func, **kwargs):
+        nonlocal upload_seconds
+        started = time.perf_counter()
+        result = await run_in_upload_pool(func, Bucket=R2_BUCKET_NAME, Key=key, **kwargs)
+        upload_seconds += time.perf_counter() - started
+        return result
+
+    async def send_part(body):
+        part_number = len(parts) + 1
+        response = await timed(
+            client.upload_part, UploadId=upload_id, PartNumber=part_number, Body=body
+        )
+        parts.append({"ETag": response["ETag"], "PartNumber": part_number})
+
+    try:
+        async for chunk in chunks:
+            buffer += chunk
+            while len(buffer) >= UPLOAD_PART_SIZE:
+                if upload_id is None:
+                    response = await timed(client.create_multipart_upload, ContentType=content_type)
+                    upload_id = response["UploadId"]
+                part = buffer[:UPLOAD_PART_SIZE]
+                del buffer[:UPLOAD_PART_SIZE]
+                await send_part(part)
+
+        if upload_id is None:
+            await timed(client.put_object, Body=bytes(buffer), ContentType=content_type)
+        else:
+            if buffer:
+                await send_part(buffer)
+            await timed(
+                client.complete_multipart_upload,
+                UploadId=upload_id,
+                MultipartUpload={"Parts": parts},
+            )
+    except Exception:
+        record_upload(0.0, ok=False)
+        if upload_id is not None:
+            try:
+                await run_in_upload_pool(
+                    client.abort_multipart_upload,
+                    Bucket=R2_BUCKET_NAME, Key=key, UploadId=upload_id,
+                )
+            except Exception as abort_error:
+                print(f"⚠️  Failed to abort R2 multipart upload {key}: {abort_error}")
+        raise
+
+    elapsed_ms = upload_seconds * 1000
+    record_upload(elapsed_ms)
+    return elapsed_ms
+
+
+async def object_exists(key: str) -> bool:
+    """HEAD the object; False if the bucket has no such key."""
+    try:
+        await run_in_upload_pool(get_r2_client().head_object, Bucket=R2_BUCKET_NAME, Key=key)
+    except ClientError as e:
+        if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+            return False
+        raise
+    return True
+
+
+async def _file_chunks(
+    file: BinaryIO, on_disk: bool, chunk_size: int = 64 * 1024
+) -> AsyncIterator[bytes]:
+    # Reads from a spool that rolled over to disk are disk I/O: keep them off the loop
+    while chunk := (await run_in_threadpool(file.read, chunk_size) if on_disk else file.read(chunk_size)):
+        yield chunk
+
+
+async def upload_content_addressed(
+    prefix: str, chunks: AsyncIterator[bytes], content_type: str, ext: str
+) -> Tuple[str, bool, float]:
+    """
+    Store an async byte stream under `{prefix}/{sha256}.{ext}`.
+
+    The stream is hashed while it is spooled (in memory up to UPLOAD_PART_SIZE,
+    then on local disk), so memory stays bounded whatever the image size. Once
+    the spool is on disk its writes and reads run in the threadpool. The
+    upload holds a process-wide memory slot from the first byte read, so
+    concurrent uploads wait rather than buffer without limit. If the bucket
+    already has that key, nothing is uploaded.
+
+    Returns (key, reused, upload latency in milliseconds).
+    """
+    digest = hashlib.sha256()
+    size = 0
+    async with _memory_slot():
+        with SpooledTemporaryFile(max_size=UPLOAD_PART_SIZE) as spool:
+            async for chunk in chunks:
+                digest.update(chunk)
+                size += len(chunk)
+                # The write that passes max_size rolls the spool over to disk
+                if size > UPLOAD_PART_SIZE:
+                    await run_in_threadpool(spool.write, chunk)
+                else:
+                    spool.write(chunk)
+            key = f"{prefix}/{digest.hexdigest()}.{ext}"
+
+            if await object_exists(key):
+                _upload_stats["dedup_hits"] += 1
+                _upload_stats["dedup_bytes_saved"] += size
+                return key, True, 0.0
+
+            on_disk = size > UPLOAD_PART_SIZE
+            spool.seek(0)
+            upload_ms = await _upload_stream(key, _file_chunks(spool, on_disk), content_type)
+        return key, False, upload_ms
+
+
+def upload_stats() -> dict:
+    uploads = _upload_stats["uploads"]
+    return {
+        "configured": get_r2_client() is not None,
+        "upload_workers": settings.r2_upload_workers,
+        "uploads": uploads,
+        "failures": _upload_stats["failures"],
+        "dedup_hits": _upload_stats["dedup_hits"],
+        "dedup_bytes_saved": _upload_stats["dedup_bytes_saved"],
+        "memory_slots": _upload_memory_slots,
+        "buffered_uploads": _upload_stats["buffered_uploads"],
+        "peak_buffered_uploads": _upload_stats["peak_buffered_uploads"],
+        "avg_upload_ms": round(_upload_stats["total_ms"] / uploads, 1) if uploads else 0.0,
+        "max_upload_ms": round(_upload_stats["max_ms"], 1),
+        "last_upload_ms": round(_upload_stats["last_ms"], 1),
+    }
+
+
+def shutdown() -> None:
+    _upload_executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,271 @@
+"""
+Helpers for calling upstream AI services from the async routes
+"""
+import asyncio
+import random
+import time
+from contextlib import asynccontextmanager, nullcontext
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Optional, Tuple, Type
+
+from fastapi import HTTPException, status
+
+
+class SingleFlight:
+    """
+    Coalesce identical concurrent calls into one upstream request.
+
+    The first caller for a key starts the work as its own task; callers that
+    arrive while it is running await the same task instead of starting another.
+    Because the work runs in a separate task, one caller disconnecting (which
+    cancels its request) does not cancel the call for the others. The key is
+    forgotten as soon as the call finishes, so this never serves stale results:
+    caching is a separate concern (see utils/ai_cache.py).
+    """
+
+    def __init__(self):
+        self._calls: Dict[str, asyncio.Task] = {}
+        self._stats = {"calls": 0, "coalesced": 0}
+
+    async def do(self, key: str, func: Callable[[], Awaitable[Any]]) -> Any:
+        task = self._calls.get(key)
+        if task is None:
+            self._stats["calls"] += 1
+            task = asyncio.create_task(func())
+            self._calls[key] = task
+            task.add_done_callback(lambda done: self._finished(key, done))
+        else:
+            self._stats["coalesced"] += 1
+        # shield: cancelling this caller must not cancel the shared task
+        return await asyncio.shield(task)
+
+    def _finished(self, key: str, task: asyncio.Task) -> None:
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        # Mark the exception as retrieved in case every caller went away
+        if not task.cancelled():
+            task.exception()
+
+    def stats(self) -> dict:
+        return {"in_flight": len(self._calls), **self._stats}
+
+
+class Bulkhead:
+    """
+    Caps concurrent upstream calls for one class of endpoint.
+
+    At most `limit` calls run at once and up to `queue_size` more wait for a
+    slot; beyond that requests are rejected immediately with a 503 and a
+    Retry-After header instead of piling up. Giving images and chat separate
+    bulkheads means slow image generation can't starve narrator comments.
+    """
+
+    def __init__(self, name: str, limit: int, queue_size: int, retry_after: int = 2):
+        self.name = name
+        self.limit = limit
+        self.queue_size = queue_size
+        self.retry_after = retry_after
+        self._slots = asyncio.Semaphore(limit)
+        # Only touched from the event loop thread, so no lock is needed
+        self._pending = 0
+        self._peak_pending = 0
+        self._completed = 0
+        self._rejected = 0
+        self._queue_wait_total = 0.0
+
+    def check(self) -> None:
+        """Raise the 503 now if a new call would be rejected."""
+        if self._pending >= self.limit + self.queue_size:
+            self._reject()
+
+    def _reject(self) -> None:
+        self._rejected += 1
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=f"The AI {self.name} service is busy. Please try again shortly.",
+            headers={"Retry-After": str(self.retry_after)},
+        )
+
+    @asynccontextmanager
+    async def slot(self, timeout: Optional[float] = None) -> AsyncIterator[None]:
+        """
+        Hold one upstream slot for the duration of the block.
+
+        With `timeout`, waiting longer than that for a slot is shed with the
+        same 503 as a full queue.
+        """
+        self.check()
+        self._pending += 1
+        self._peak_pending = max(self._peak_pending, self._pending)
+        try:
+            queued = time.perf_counter()
+            try:
+                async with asyncio.timeout(timeout):
+                    await self._slots.acquire()
+            except TimeoutError:
+                self._reject()
+            self._queue_wait_total += time.perf_counter() - queued
+            try:
+                yield
+            finally:
+                self._slots.release()
+            self._completed += 1
+        finally:
+            self._pending -= 1
+
+    def stats(self) -> dict:
+        completed = self._completed or 1
+        return {
+            "limit": self.limit,
+            "queue_size": self.queue_size,
+            "in_flight": min(self._pending, self.limit),
+            "queued": max(0, self._pending - self.limit),
+            "peak_pending": self._peak_pending,
+            "completed": self._completed,
+            "rejected": self._rejected,
+            "avg_queue_wait_ms": round(self._queue_wait_total / completed * 1000, 2),
+        }
+
+
+class CircuitBreaker:
+    """
+    Fails fast while an upstream service is unhealthy.
+
+    closed: calls go through; `failure_threshold` consecutive failures open it.
+    open: calls are rejected with a 503 until `reset_timeout` has passed.
+    half_open: one trial call is let through; success closes the circuit,
+    failure opens it again for another `reset_timeout`.
+    """
+
+    def __init__(self, name: str, failure_threshold: int, reset_timeout: float):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        # Only touched from the event loop thread, so no lock is needed
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._stats = {"opened": 0, "rejected": 0}
+
+    def before_call(self) -> None:
+        """Raise a 503 if the circuit does not allow a call right now."""
+        if self.state == "open":
+            remaining = self._opened_at + self.reset_timeout - time.monotonic()
+            if remaining > 0:
+                self._reject(remaining)
+            self.state = "half_open"
+        if self.state == "half_open":
+            if self._trial_in_flight:
+                self._reject(1)
+            self._trial_in_flight = True
+
+    def _reject(self, retry_after: float) -> None:
+        self._stats["rejected"] += 1
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=f"The AI {self.name} service is temporarily unavailable. Please try again shortly.",
+            headers={"Retry-After": str(max(1, round(retry_after)))},
+        )
+
+    def release_trial(self) -> None:
+        """Give up a half-open trial slot without recording an outcome."""
+        self._trial_in_flight = False
+
+    def record_success(self) -> None:
+        self._failures = 0
+        self._trial_in_flight = False
+        self.state = "closed"
+
+    def record_failure(self) -> None:
+        self._failures += 1
+        self._trial_in_flight = False
+        if self.state == "half_open" or self._failures >= self.failure_threshold:
+            if self.state != "open":
+                self._stats["opened"] += 1
+                print(f"⚠️  Circuit for AI {self.name} opened after {self._failures} failures")
+            self.state = "open"
+            self._opened_at = time.monotonic()
+
+    def stats(self) -> dict:
+        retry_in = 0.0
+        if self.state == "open":
+            retry_in = max(0.0, self._opened_at + self.reset_timeout - time.monotonic())
+        return {
+            "state": self.state,
+            "consecutive_failures": self._failures,
+            "retry_in_seconds": round(retry_in, 1),
+            **self._stats,
+        }
+
+
+class RetryPolicy:
+    """Overall deadline plus capped exponential backoff with full jitter."""
+
+    __slots__ = ("deadline", "max_attempts", "base_delay", "max_delay")
+
+    def __init__(self, deadline: float, max_attempts: int, base_delay: float, max_delay: float):
+        self.deadline = deadline
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def backoff(self, attempt: int) -> float:
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+
+
+async def call_upstream(
+    func: Callable[[], Awaitable[Any]],
+    policy: RetryPolicy,
+    breaker: CircuitBreaker,
+    retryable: Tuple[Type[BaseException], ...],
+    bulkhead: Optional[Bulkhead] = None,
+) -> Any:
+    """
+    Run `func` under a deadline, retrying `retryable` errors with backoff.
+
+    Every attempt goes through `breaker`, so once the circuit opens the
+    remaining retries fail fast too. Errors that are not retryable (e.g. a
+    rejected prompt) mean the upstream is answering, so they don't count as
+    failures. Exceeding the deadline raises a 504.
+
+    With `bulkhead`, each attempt first waits for a slot in it (released
+    during backoff). That wait is local queueing, not upstream latency: it
+    happens before the breaker is consulted, and running out of deadline
+    while queued is shed with the bulkhead's 503 rather than counted as an
+    upstream failure.
+    """
+    deadline_at = time.monotonic() + policy.deadline
+    attempt = 0
+    while True:
+        attempt += 1
+        slot = bulkhead.slot(timeout=max(0.0, deadline_at - time.monotonic())) if bulkhead else nullcontext()
+        async with slot:
+            breaker.before_call()
+            try:
+                async with asyncio.timeout(deadline_at - time.monotonic()):
+                    result = await func()
+            except TimeoutError:
+                breaker.record_failure()
+                raise HTTPException(
+                    status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+                    detail=f"The AI {breaker.name} service did not respond in time. Please try again.",
+                )
+            except retryable as e:
+                breaker.record_failure()
+                error = e
+            except (HTTPException, asyncio.CancelledError):
+                # Abandoned by the client, or shed locally inside `func`:
+                # says nothing about upstream health
+                breaker.release_trial()
+                raise
+            except Exception:
+                breaker.record_success()
+                raise
+            else:
+                breaker.record_success()
+                return result
+
+        delay = policy.backoff(attempt)
+        if attempt >= policy.max_attempts or time.monotonic() + delay >= deadline_at:
+            raise error
+        await asyncio.sleep(delay)
@@ -0,0 +1,295 @@
+"""
+AI usage accounting and daily token budgets
+
+Every upstream AI call records its tokens (and an estimated cost) against the
+calling client and feature. Records are aggregated in memory and written to
+the ai_usage ledger in one batch every few seconds, so no AI call pays for a
+DB write. Daily token budgets are enforced from the same in-memory totals;
+each flush also re-reads today's totals from the ledger so that restarts and
+other workers' spend are taken into account.
+"""
+import asyncio
+import threading
+from contextvars import ContextVar
+from datetime import date, timedelta
+from typing import Dict, Optional, Tuple
+
+from fastapi import HTTPException, status
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+from starlette.concurrency import run_in_threadpool
+
+from database.database import SessionLocal, get_settings
+from models.ai_usage import AIUsage
+from models.user import User
+
+settings = get_settings()
+
+# USD per 1K tokens (prompt, completion) and per image, from OpenAI list prices
+TOKEN_PRICES = {
+    "gpt-3.5-turbo": (0.0005, 0.0015),
+}
+IMAGE_PRICES = {
+    ("standard", "1024x1024"): 0.04,
+    ("standard", "1792x1024"): 0.08,
+    ("standard", "1024x1792"): 0.08,
+    ("hd", "1024x1024"): 0.08,
+    ("hd", "1792x1024"): 0.12,
+    ("hd", "1024x1792"): 0.12,
+}
+DEFAULT_IMAGE_PRICE = 0.04
+
+# Who is spending, set by each AI route and inherited by the tasks it starts
+# (a coalesced call is charged once, to the request that started it)
+usage_context: ContextVar[Optional[Tuple[str, str]]] = ContextVar("usage_context", default=None)
+
+UsageKey = Tuple[date, str, str]
+
+
+def set_usage_context(client_id: str, feature: str) -> None:
+    usage_context.set((client_id, feature))
+
+
+def user_id_for_client(client_id: str) -> Optional[int]:
+    if client_id.startswith("user:"):
+        return int(client_id[len("user:"):])
+    return None
+
+
+def image_cost(quality: str, size: str) -> float:
+    return IMAGE_PRICES.get((quality, size), DEFAULT_IMAGE_PRICE)
+
+
+def token_cost(model: str, prompt_tokens: int, completion_tokens: int) -> float:
+    prompt_price, completion_price = TOKEN_PRICES.get(model, TOKEN_PRICES["gpt-3.5-turbo"])
+    return (prompt_tokens * prompt_price + completion_tokens * completion_price) / 1000
+
+
+class UsageLedger:
+    """
+    In-memory usage aggregation with batched writes to the ai_usage table.
+
+    record() and check_budget() run on the event loop; flush() runs in a
+    worker thread, so the shared dicts are guarded by a lock.
+    """
+
+    def __init__(self, daily_token_budget: int):
+        self.daily_token_budget = daily_token_budget
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        # Deltas not yet written: key -> [requests, prompt, completion, cost]
+        self._pending: Dict[UsageKey, list] = {}
+        # Tokens used today per client: ledger total at the last flush + pending
+        self._day = date.today()
+        self._flushed_tokens: Dict[str, int] = {}
+        self._pending_tokens: Dict[str, int] = {}
+        self._stats = {"flushes": 0, "rows_written": 0, "budget_rejections": 0}
+
+    def _roll_day(self, today: date) -> None:
+        if today != self._day:
+            self._day = today
+            self._flushed_tokens = {}
+            self._pending_tokens = {}
+
+    def record(
+        self,
+        prompt_tokens: int = 0,
+        completion_tokens: int = 0,
+        cost_usd: float = 0.0,
+        context: Optional[Tuple[str, str]] = None,
+    ) -> None:
+        """Add one upstream call to the pending batch, charged to the current usage context."""
+        client_id, feature = context or usage_context.get() or ("system", "unknown")
+        today = date.today()
+        tokens = prompt_tokens + completion_tokens
+        with self._lock:
+            self._roll_day(today)
+            delta = self._pending.setdefault((today, client_id, feature), [0, 0, 0, 0.0])
+            delta[0] += 1
+            delta[1] += prompt_tokens
+            delta[2] += completion_tokens
+            delta[3] += cost_usd
+            self._pending_tokens[client_id] = self._pending_tokens.get(client_id, 0) + tokens
+
+    def tokens_today(self, client_id: str) -> int:
+        with self._lock:
+            self._roll_day(date.today())
+            return self._flushed_tokens.get(client_id, 0) + self._pending_tokens.get(client_id, 0)
+
+    def check_budget(self, client_id: str) -> None:
+        """Raise a 429 once `client_id` has used its daily token budget."""
+        if not self.daily_token_budget:
+            return
+        if self.tokens_today(client_id) >= self.daily_token_budget:
+            self._stats["budget_rejections"] += 1
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail=f"Daily AI token budget exceeded. Max {self.daily_token_budget} tokens per day.",
+            )
+
+    def flush(self) -> int:
+        """
+        Write pending deltas to the ledger and refresh today's totals.
+        Returns the number of rows touched. Runs in a worker thread.
+        """
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, {}
+                flushed_tokens = dict(self._pending_tokens)
+            db = SessionLocal()
+            try:
+                for (day, client_id, feature), (requests, prompt, completion, cost) in pending.items():
+                    self._add_to_row(db, day, client_id, feature, requests, prompt, completion, cost)
+                db.commit()
+
+                today = date.today()
+                totals = dict(
+                    db.query(
+                        AIUsage.client_id,
+                        func.sum(AIUsage.prompt_tokens + AIUsage.completion_tokens),
+                    )
+                    .filter(AIUsage.day == today)
+                    .group_by(AIUsage.client_id)
+                    .all()
+                )
+            except Exception:
+                db.rollback()
+                # Keep the deltas for the next attempt
+                with self._lock:
+                    for key, values in pending.items():
+                        delta = self._pending.setdefault(key, [0, 0, 0, 0.0])
+                        for i, value in enumerate(values):
+                            delta[i] += value
+                raise
+            finally:
+                db.close()
+
+            with self._lock:
+                self._roll_day(today)
+                self._flushed_tokens = {client_id: int(total or 0) for client_id, total in totals.items()}
+                # Tokens recorded while this flush ran are still pending
+                for client_id, tokens in flushed_tokens.items():
+                    remaining = self._pending_tokens.get(client_id, 0) - tokens
+                    if remaining > 0:
+                        self._pending_tokens[client_id] = remaining
+                    else:
+                        self._pending_tokens.pop(client_id, None)
+            self._stats["flushes"] += 1
+            self._stats["rows_written"] += len(pending)
+            return len(pending)
+
+    @staticmethod
+    def _add_to_row(db, day, client_id, feature, requests, prompt, completion, cost) -> None:
+        # Additive UPDATE so several workers can flush into the same row safely
+        match = (AIUsage.day == day, AIUsage.client_id == client_id, AIUsage.feature == feature)
+        values = {
+            AIUsage.requests: AIUsage.requests + requests,
+            AIUsage.prompt_tokens: AIUsage.prompt_tokens + prompt,
+            AIUsage.completion_tokens: AIUsage.completion_tokens + completion,
+            AIUsage.cost_usd: AIUsage.cost_usd + cost,
+        }
+        def update() -> bool:
+            return bool(db.query(AIUsage).filter(*match).update(values, synchronize_session=False))
+
+        def insert(user_id: Optional[int]) -> bool:
+            try:
+                with db.begin_nested():
+                    db.add(AIUsage(
+                        day=day,
+                        client_id=client_id,
+                        user_id=user_id,
+                        feature=feature,
+                        requests=requests,
+                        prompt_tokens=prompt,
+                        completion_tokens=completion,
+                        cost_usd=cost,
+                    ))
+            except IntegrityError:
+                return False
+            return True
+
+        if update() or insert(user_id_for_client(client_id)):
+            return
+        # Usually another worker inserted the row first
+        if update():
+            return
+        # Otherwise the user_id foreign key failed: the user was deleted after
+        # the request. Keep the usage, unattributed, like rows of deleted users
+        if insert(None) or update():
+            return
+        print(f"⚠️  Dropped AI usage for {client_id}/{feature} on {day}: could not write its row")
+
+    def summary(self, days: int) -> dict:
+        """Usage for the last `days` days, by feature, user and day. Runs in a worker thread."""
+        since = date.today() - timedelta(days=days - 1)
+        columns = (
+            func.sum(AIUsage.requests),
+            func.sum(AIUsage.prompt_tokens),
+            func.sum(AIUsage.completion_tokens),
+            func.sum(AIUsage.cost_usd),
+        )
+
+        def row_totals(requests, prompt, completion, cost) -> dict:
+            return {
+                "requests": int(requests or 0),
+                "prompt_tokens": int(prompt or 0),
+                "completion_tokens": int(completion or 0),
+                "cost_usd": round(float(cost or 0), 4),
+            }
+
+        db = SessionLocal()
+        try:
+            base = db.query(*columns).filter(AIUsage.day >= since)
+            totals = row_totals(*base.one())
+            by_feature = {
+                feature: row_totals(*values)
+                for feature, *values in db.query(AIUsage.feature, *columns)
+                .filter(AIUsage.day >= since)
+                .group_by(AIUsage.feature)
+            }
+            by_day = {
+                day.isoformat(): row_totals(*values)
+                for day, *values in db.query(AIUsage.day, *columns)
+                .filter(AIUsage.day >= since)
+                .group_by(AIUsage.day)
+                .order_by(AIUsage.day)
+            }
+            top_clients = [
+                {"client_id": client_id, "username": username, **row_totals(*values)}
+                for client_id, username, *values in db.query(AIUsage.client_id, User.username, *columns)
+                .outerjoin(User, User.id == AIUsage.user_id)
+                .filter(AIUsage.day >= since)
+                .group_by(AIUsage.client_id, User.username)
+                .order_by(func.sum(AIUsage.cost_usd).desc())
+                .limit(20)
+            ]
+        finally:
+            db.close()
+
+        return {
+            "since": since.isoformat(),
+            "days": days,
+            "daily_token_budget": self.daily_token_budget,
+            "totals": totals,
+            "by_feature": by_feature,
+            "by_day": by_day,
+            "top_clients": top_clients,
+        }
+
+    def stats(self) -> dict:
+        with self._lock:
+            pending = len(self._pending)
+        return {"daily_token_budget": self.daily_token_budget, "pending_rows": pending, **self._stats}
+
+
+usage_ledger = UsageLedger(settings.ai_daily_token_budget)
+
+
+async def usage_flush_loop(interval_seconds: float) -> None:
+    """Periodically flush the usage ledger until cancelled."""
+    while True:
+        await asyncio.sleep(interval_seconds)
+        try:
+            await run_in_threadpool(usage_ledger.flush)
+        except Exception as e:
+            print(f"⚠️  Failed to flush AI usage: {e}")
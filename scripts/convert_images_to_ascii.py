@@ -7,13 +7,12 @@ Re-processes images in generated_portraits/images/ to ASCII files
 import os
 import sys
 from pathlib import Path
-from PIL import Image
+
 import numpy as np
 
-# ASCII character sets (reversed so black=light, white=dense)
-ASCII_CHARS = '  .`\'",;:Il!i><~+_-?][}{1)(|/\\trjxnuvczXYUJCLQ0OZmwqpdbkha*o#MW&8%B@$'
-ASCII_WIDTH = 160
-ASCII_HEIGHT = 80
+# The dithering core is shared with the backend's /api/ascii endpoint
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+from utils.ascii_art import ASCII_CHARS, ASCII_WIDTH, ASCII_HEIGHT, floyd_steinberg_levels, load_grayscale
 
 # Directories
 SCRIPT_DIR = Path(__file__).parent
@@ -21,55 +20,17 @@ OUTPUT_DIR = SCRIPT_DIR.parent / "generated_portraits"
 IMAGES_DIR = OUTPUT_DIR / "images"
 ASCII_DIR = OUTPUT_DIR / "ascii"
 
-def floyd_steinberg_dither(pixels, width, height, levels):
-    """Apply Floyd-Steinberg dithering to grayscale image"""
-    output = np.copy(pixels)
-    
-    for y in range(height):
-        for x in range(width):
-            old_pixel = output[y, x]
-            new_pixel = round(old_pixel * (levels - 1) / 255) * (255 / (levels - 1))
-            output[y, x] = new_pixel
-            quant_error = old_pixel - new_pixel
-            
-            if x + 1 < width:
-                output[y, x + 1] += quant_error * 7 / 16
-            if y + 1 < height:
-                if x > 0:
-                    output[y + 1, x - 1] += quant_error * 3 / 16
-                output[y + 1, x] += quant_error * 5 / 16
-                if x + 1 < width:
-                    output[y + 1, x + 1] += quant_error * 1 / 16
-    
-    return output
-
 def convert_to_ascii(image_path: Path, width: int = ASCII_WIDTH, height: int = ASCII_HEIGHT) -> str:
     """Convert image to ASCII art with Floyd-Steinberg dithering"""
     try:
-        # Load image
-        img = Image.open(image_path)
-        
-        # Resize and convert to grayscale
-        img = img.resize((width, height), Image.Resampling.LANCZOS)
-        img = img.convert('L')
-        pixels = np.array(img, dtype=np.float32)
-        
-        # Apply Floyd-Steinberg dithering
-        dithered = floyd_steinberg_dither(pixels, width, height, len(ASCII_CHARS))
-        
-        # Convert to ASCII
-        ascii_art = []
-        for y in range(height):
-            line = ""
-            for x in range(width):
-                brightness = int(dithered[y, x])
-                char_index = int(brightness / 256 * len(ASCII_CHARS))
-                char_index = max(0, min(len(ASCII_CHARS) - 1, char_index))
-                line += ASCII_CHARS[char_index]
-            ascii_art.append(line)
-        
-        return '\n'.join(ascii_art)
-        
+        levels = len(ASCII_CHARS)
+        indices = floyd_steinberg_levels(load_grayscale(image_path, width, height), levels)
+        # The files in generated_portraits/ascii map each dithered gray value to
+        # a character with int(gray / 256 * levels), not by its level as the
+        # backend does; keep that so regenerated files match the committed ones
+        gray = (indices * (255 / (levels - 1))).astype(np.float32).astype(int)
+        chars = np.array(list(ASCII_CHARS))[np.clip(gray * levels // 256, 0, levels - 1)]
+        return '\n'.join(''.join(row) for row in chars)
     except Exception as e:
         print(f"  ❌ Error converting to ASCII: {e}")
         return None
@@ -9,12 +9,13 @@ import sys
 import json
 import time
 import base64
-from io import BytesIO
 from pathlib import Path
 from typing import Dict, List, Tuple, Optional
 import requests
-from PIL import Image
-import numpy as np
+
+# The ASCII conversion core is shared with the backend's /api/ascii endpoint
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+from utils.ascii_art import ASCII_WIDTH, ASCII_HEIGHT, image_to_ascii
 
 # Configuration
 RACES = [
@@ -28,11 +29,6 @@ CLASSES = [
     "Rogue", "Sorcerer", "Warlock", "Wizard"
 ]
 
-# ASCII character sets (reversed so black=light, white=dense)
-ASCII_CHARS = '  .`\'",;:Il!i><~+_-?][}{1)(|/\\trjxnuvczXYUJCLQ0OZmwqpdbkha*o#MW&8%B@$'
-ASCII_WIDTH = 160
-ASCII_HEIGHT = 80
-
 # Output directories
 OUTPUT_DIR = Path(__file__).parent.parent / "generated_portraits"
 IMAGES_DIR = OUTPUT_DIR / "images"
@@ -147,64 +143,12 @@ class PortraitGenerator:
             print(f"  ❌ Error generating image: {e}")
             return None
     
-    def floyd_steinberg_dither(self, grayscale: np.ndarray, width: int, height: int, levels: int) -> np.ndarray:
-        """Apply Floyd-Steinberg dithering algorithm"""
-        output = grayscale.astype(float).copy()
-        
-        for y in range(height):
-            for x in range(width):
-                old_pixel = output[y, x]
-                
-                # Quantize
-                new_pixel = round((old_pixel / 255) * (levels - 1)) * (255 / (levels - 1))
-                output[y, x] = new_pixel
-                
-                # Calculate error
-                error = old_pixel - new_pixel
-                
-                # Distribute error to neighboring pixels
-                if x + 1 < width:
-                    output[y, x + 1] += error * 7 / 16
-                if y + 1 < height:
-                    if x > 0:
-                        output[y + 1, x - 1] += error * 3 / 16
-                    output[y + 1, x] += error * 5 / 16
-                    if x + 1 < width:
-                        output[y + 1, x + 1] += error * 1 / 16
-        
-        return output
-    
     def convert_to_ascii(self, image_bytes: bytes, width: int = ASCII_WIDTH, height: int = ASCII_HEIGHT) -> str:
         """Convert image to ASCII art with Floyd-Steinberg dithering"""
         try:
             print(f"  🎨 Converting to ASCII art ({width}x{height})...")
-            
-            # Load image
-            img = Image.open(BytesIO(image_bytes))
-            
-            # Resize
-            img = img.resize((width, height), Image.Resampling.LANCZOS)
-            
-            # Convert to grayscale
-            img_gray = img.convert('L')
-            pixels = np.array(img_gray)
-            
-            # Apply Floyd-Steinberg dithering
-            dithered = self.floyd_steinberg_dither(pixels, width, height, len(ASCII_CHARS))
-            
-            # Convert to ASCII
-            ascii_art = []
-            for y in range(height):
-                line = ""
-                for x in range(width):
-                    brightness = dithered[y, x]
-                    char_index = int((brightness / 255) * (len(ASCII_CHARS) - 1))
-                    char_index = max(0, min(len(ASCII_CHARS) - 1, char_index))
-                    # Reverse the charset so darker pixels use denser characters
-                    line += ASCII_CHARS[len(ASCII_CHARS) - 1 - char_index]
-                ascii_art.append(line)
-            
-            return '\n'.join(ascii_art)
+            # invert: darker pixels use denser characters
+            return image_to_ascii(image_bytes, width, height, invert=True)
             
         except Exception as e:
             print(f"  ❌ Error converting to ASCII: {e}")